@@ -4,31 +4,51 @@
 """
 
 from fastapi import APIRouter, HTTPException, Query
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 from collections import Counter
-import re
+import asyncio
+import heapq
 
-from app.db.mongodb import mongodb
+from app.db.repositories import get_product_repository
 from app.services.mongodb_reader import ProductResponse
 from app.services.ai_analysis import analyze_with_ai
+from app.services.product_metrics import parse_review_count
+from app.services.data_quality import build_quality_report
+from app.services.analytics_rollups import (
+    DAY_FORMAT,
+    PRICE_BUCKET_LABELS,
+    merge_rollup_rows,
+    read_rollups,
+    rollup_average,
+)
 
 router = APIRouter(prefix="/api/analysis", tags=["analysis"])
 
 
-def parse_review_count(review_count_text: Optional[str]) -> Optional[int]:
-    """从 review_count_text 解析评论数"""
-    if not review_count_text:
-        return None
+def _split_half_averages(daily: List[Dict[str, Any]], avg_price: float) -> Tuple[float, float]:
+    """按时间顺序把产品分成前后两半，返回两半的平均价格
+
+    只使用按天聚合后的序列（O(天数)）：跨越中点的那一天按当天均价拆分
+    """
+    total_count = sum(day["count"] for day in daily)
+    mid_point = total_count // 2
+    if mid_point == 0:
+        return avg_price, avg_price
+    
+    total_sum = sum(day["sum"] for day in daily)
+    first_sum = 0.0
+    remaining = mid_point
+    for day in daily:
+        if remaining <= 0:
+            break
+        taken = min(day["count"], remaining)
+        first_sum += day["sum"] if taken == day["count"] else taken * day["avg"]
+        remaining -= taken
     
-    # 移除逗号和其他字符，只保留数字
-    numbers = re.findall(r'\d+', review_count_text.replace(',', ''))
-    if numbers:
-        try:
-            return int(numbers[0])
-        except:
-            pass
-    return None
+    first_half_avg = first_sum / mid_point
+    second_half_avg = (total_sum - first_sum) / max(total_count - mid_point, 1)
+    return first_half_avg, second_half_avg
 
 
 @router.get("/price-trend")
@@ -37,107 +57,62 @@ async def get_price_trend(
     category: Optional[str] = Query(None, description="分类筛选"),
     platform: Optional[str] = Query(None, description="平台筛选")
 ) -> Dict[str, Any]:
-    """获取价格趋势分析"""
-    db = mongodb.connect()
-    if db is None:
+    """获取价格趋势分析（读取按天汇总，O(天数 × 平台数)）"""
+    products_repo = get_product_repository()
+    if products_repo is None:
         raise HTTPException(status_code=500, detail="MongoDB not configured")
     
     try:
-        products_collection = db["products"]
-        
-        # 构建查询条件
-        query = {}
+        # 按天读取平台 × 日期汇总（按分类筛选时汇总无法表达，回退到实时聚合）
+        start_day = (datetime.utcnow() - timedelta(days=days)).strftime(DAY_FORMAT)
+        rollup_filter: Dict[str, Any] = {"day": {"$gte": start_day}}
+        product_match: Dict[str, Any] = {"created_at": {"$gte": datetime.strptime(start_day, DAY_FORMAT)}}
         if category:
-            query["categories"] = {"$in": [category]}
+            product_match["categories"] = {"$in": [category]}
         if platform:
-            query["platform"] = platform
+            rollup_filter["platform"] = platform
+            product_match["platform"] = platform
         
-        # 获取时间范围（如果 created_at 字段存在）
-        # 注意：如果数据库中没有 created_at 字段，不添加时间过滤
-        start_date = datetime.utcnow() - timedelta(days=days)
-        # 先检查是否有带 created_at 的产品
-        sample_product = products_collection.find_one(query)
-        if sample_product and "created_at" in sample_product:
-            query["created_at"] = {"$gte": start_date}
+        rows, freshness = await read_rollups(
+            "platform_day", rollup_filter, product_match, force_live=bool(category)
+        )
         
-        # 获取产品数据
-        products = list(products_collection.find(query))
+        rows_by_day: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            rows_by_day.setdefault(row["day"], []).append(row)
         
-        # 解析价格
-        price_data = []
-        for product in products:
-            price = product.get("price")
-            # 处理价格：可能是字符串或数字
-            if isinstance(price, str):
-                # 移除 $ 和逗号
-                price_clean = re.sub(r'[$,]', '', price)
-                try:
-                    price = float(price_clean)
-                except:
-                    continue
-            elif isinstance(price, (int, float)):
-                price = float(price)
-            else:
-                continue
-            
-            # 只添加有效价格
-            if price > 0:
-                price_data.append({
-                    "price": price,
-                    "date": product.get("created_at"),
-                    "product_id": str(product.get("_id", "")),
-                    "name": product.get("name", "") or product.get("title", "")
-                })
-        
-        if not price_data:
+        stats = merge_rollup_rows(rows)
+        if not stats["price_count"]:
             return {
                 "period": days,
                 "average_price": 0,
                 "min_price": 0,
                 "max_price": 0,
                 "price_distribution": [],
-                "trend": "stable"
+                "trend": "stable",
+                "freshness": freshness
             }
         
-        prices = [d["price"] for d in price_data]
-        avg_price = sum(prices) / len(prices)
-        min_price = min(prices)
-        max_price = max(prices)
-        
-        # 价格分布（按区间）
-        price_ranges = {
-            "0-20": 0,
-            "20-50": 0,
-            "50-100": 0,
-            "100-200": 0,
-            "200+": 0
-        }
-        for price in prices:
-            if price < 20:
-                price_ranges["0-20"] += 1
-            elif price < 50:
-                price_ranges["20-50"] += 1
-            elif price < 100:
-                price_ranges["50-100"] += 1
-            elif price < 200:
-                price_ranges["100-200"] += 1
-            else:
-                price_ranges["200+"] += 1
+        avg_price = rollup_average(stats, "price")
         
-        # 趋势分析（简单：比较前半段和后半段）
-        # 如果有日期，按日期排序；否则按产品 ID 排序
-        if any(d.get("date") for d in price_data):
-            sorted_data = sorted(price_data, key=lambda x: x.get("date") or datetime.min)
-        else:
-            sorted_data = price_data  # 没有日期，保持原顺序
+        # 价格分布（按区间，没有产品的区间补 0）
+        price_distribution = [
+            {"range": label, "count": stats["price_buckets"].get(label, 0)}
+            for label in PRICE_BUCKET_LABELS.values()
+        ]
         
-        mid_point = len(sorted_data) // 2
-        if mid_point > 0:
-            first_half_avg = sum([d["price"] for d in sorted_data[:mid_point]]) / mid_point
-            second_half_avg = sum([d["price"] for d in sorted_data[mid_point:]]) / max(len(sorted_data) - mid_point, 1)
-        else:
-            first_half_avg = avg_price
-            second_half_avg = avg_price
+        # 趋势分析（比较按时间排序后的前半段和后半段）
+        daily = []
+        for day in sorted(rows_by_day):
+            merged = merge_rollup_rows(rows_by_day[day])
+            if merged["price_count"]:
+                daily.append({
+                    "date": day,
+                    "count": merged["price_count"],
+                    "sum": merged["price_sum"],
+                    "avg": rollup_average(merged, "price")
+                })
+        first_half_avg, second_half_avg = _split_half_averages(daily, avg_price)
         
         if second_half_avg > first_half_avg * 1.05:
             trend = "increasing"
@@ -149,18 +124,23 @@ async def get_price_trend(
         return {
             "period": days,
             "average_price": round(avg_price, 2),
-            "min_price": round(min_price, 2),
-            "max_price": round(max_price, 2),
-            "price_distribution": [
-                {"range": k, "count": v} for k, v in price_ranges.items()
-            ],
+            "min_price": round(stats["price_min"], 2),
+            "max_price": round(stats["price_max"], 2),
+            "price_distribution": price_distribution,
             "trend": trend,
-            "trend_percentage": round(((second_half_avg - first_half_avg) / first_half_avg * 100) if first_half_avg > 0 else 0, 2)
+            "trend_percentage": round(((second_half_avg - first_half_avg) / first_half_avg * 100) if first_half_avg > 0 else 0, 2),
+            "daily_prices": [
+                {
+                    "date": day["date"],
+                    "average_price": round(day["avg"], 2),
+                    "count": day["count"]
+                }
+                for day in daily
+            ],
+            "freshness": freshness
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to analyze price trend: {str(e)}")
-    finally:
-        mongodb.close()
 
 
 @router.get("/category-distribution")
@@ -168,46 +148,34 @@ async def get_category_distribution(
     platform: Optional[str] = Query(None, description="平台筛选")
 ) -> Dict[str, Any]:
     """获取分类分布分析"""
-    db = mongodb.connect()
-    if db is None:
+    products_repo = get_product_repository()
+    if products_repo is None:
         raise HTTPException(status_code=500, detail="MongoDB not configured")
     
     try:
-        products_collection = db["products"]
-        
-        query = {}
+        rollup_filter: Dict[str, Any] = {}
         if platform:
-            query["platform"] = platform
+            rollup_filter["platform"] = platform
         
-        # 聚合统计分类
-        pipeline = [
-            {"$match": query},
-            {"$unwind": "$categories"},
-            {"$group": {
-                "_id": "$categories",
-                "count": {"$sum": 1},
-                "avg_price": {"$avg": {"$toDouble": {"$replaceAll": {"input": {"$toString": "$price"}, "find": "$", "replacement": ""}}}},
-                "avg_rating": {"$avg": "$rating"}
-            }},
-            {"$sort": {"count": -1}}
-        ]
-        
-        results = list(products_collection.aggregate(pipeline))
+        # 读取平台 × 分类汇总，跨平台时按分类合并
+        rows, freshness = await read_rollups("platform_category", rollup_filter, rollup_filter)
+        rows_by_category: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            rows_by_category.setdefault(row.get("category") or "Unknown", []).append(row)
         
         categories = []
-        for result in results:
-            category_name = result.get("_id", "Unknown")
-            # 处理价格
-            avg_price = result.get("avg_price", 0)
-            if avg_price is None:
-                avg_price = 0
+        for category_name, category_rows in rows_by_category.items():
+            merged = merge_rollup_rows(category_rows)
+            avg_price = rollup_average(merged, "price") or 0
+            avg_rating = rollup_average(merged, "rating")
             
             categories.append({
                 "name": category_name,
-                "count": result.get("count", 0),
+                "count": merged["count"],
                 "average_price": round(avg_price, 2),
-                "average_rating": round(result.get("avg_rating", 0), 2) if result.get("avg_rating") else None
+                "average_rating": round(avg_rating, 2) if avg_rating else None
             })
+        categories.sort(key=lambda c: c["count"], reverse=True)
         
         total_products = sum(c["count"] for c in categories)
         
@@ -215,141 +183,98 @@ async def get_category_distribution(
             "total_products": total_products,
             "total_categories": len(categories),
             "categories": categories,
-            "platform": platform or "all"
+            "platform": platform or "all",
+            "freshness": freshness
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to analyze category distribution: {str(e)}")
-    finally:
-        mongodb.close()
+
+
+def _quality_report_from_rollup(row: Dict[str, Any]) -> Dict[str, Any]:
+    return build_quality_report(row.get("count", 0), row.get("quality") or {})
 
 
 @router.get("/data-quality")
-async def get_data_quality() -> Dict[str, Any]:
-    """获取数据质量分析"""
-    db = mongodb.connect()
-    if db is None:
+async def get_data_quality(
+    run_limit: int = Query(20, ge=1, le=200, description="按批次细分时返回最近 N 个批次")
+) -> Dict[str, Any]:
+    """获取数据质量分析（读取平台 / 批次汇总，同时按批次和平台细分）"""
+    products_repo = get_product_repository()
+    if products_repo is None:
         raise HTTPException(status_code=500, detail="MongoDB not configured")
     
     try:
-        products_collection = db["products"]
-        total_products = products_collection.count_documents({})
-        
-        if total_products == 0:
-            return {
-                "total_products": 0,
-                "quality_score": 0,
-                "issues": []
-            }
-        
-        # 检查各种数据质量问题
-        issues = []
-        
-        # 检查缺失字段
-        missing_price = products_collection.count_documents({"price": {"$in": [None, ""]}})
-        missing_name = products_collection.count_documents({"name": {"$in": [None, ""]}})
-        missing_image = products_collection.count_documents({"image_url": {"$in": [None, ""]}})
-        missing_url = products_collection.count_documents({"product_url": {"$in": [None, ""]}})
-        missing_rating = products_collection.count_documents({"rating": None})
-        missing_review_count = products_collection.count_documents({"review_count": None, "review_count_text": {"$in": [None, ""]}})
-        
-        if missing_price > 0:
-            issues.append({
-                "type": "missing_price",
-                "count": missing_price,
-                "percentage": round(missing_price / total_products * 100, 2),
-                "severity": "high"
-            })
-        
-        if missing_name > 0:
-            issues.append({
-                "type": "missing_name",
-                "count": missing_name,
-                "percentage": round(missing_name / total_products * 100, 2),
-                "severity": "critical"
-            })
-        
-        if missing_image > 0:
-            issues.append({
-                "type": "missing_image",
-                "count": missing_image,
-                "percentage": round(missing_image / total_products * 100, 2),
-                "severity": "medium"
-            })
-        
-        if missing_url > 0:
-            issues.append({
-                "type": "missing_url",
-                "count": missing_url,
-                "percentage": round(missing_url / total_products * 100, 2),
-                "severity": "medium"
-            })
-        
-        if missing_rating > 0:
-            issues.append({
-                "type": "missing_rating",
-                "count": missing_rating,
-                "percentage": round(missing_rating / total_products * 100, 2),
-                "severity": "low"
-            })
-        
-        if missing_review_count > 0:
-            issues.append({
-                "type": "missing_review_count",
-                "count": missing_review_count,
-                "percentage": round(missing_review_count / total_products * 100, 2),
-                "severity": "low"
-            })
-        
-        # 计算质量分数（100分制，每个问题扣分）
-        quality_score = 100
-        for issue in issues:
-            if issue["severity"] == "critical":
-                quality_score -= issue["percentage"] * 2
-            elif issue["severity"] == "high":
-                quality_score -= issue["percentage"] * 1.5
-            elif issue["severity"] == "medium":
-                quality_score -= issue["percentage"] * 1
-            else:
-                quality_score -= issue["percentage"] * 0.5
-        
-        quality_score = max(0, min(100, quality_score))
-        
-        return {
-            "total_products": total_products,
-            "quality_score": round(quality_score, 2),
-            "issues": issues,
-            "completeness": round((total_products - len([i for i in issues if i["count"] > 0])) / total_products * 100, 2) if total_products > 0 else 0
-        }
+        (platform_rows, freshness), (run_rows, _) = await asyncio.gather(
+            read_rollups("platform", sort=[("count", -1)]),
+            read_rollups("run", sort=[("last_created", -1)], limit=run_limit),
+        )
+        
+        report = _quality_report_from_rollup(merge_rollup_rows(platform_rows))
+        report["freshness"] = freshness
+        if report["total_products"] == 0:
+            return report
+        
+        report["by_run"] = [
+            {"run_id": row.get("run_id"), **_quality_report_from_rollup(row)}
+            for row in run_rows
+        ]
+        report["by_platform"] = [
+            {"platform": row.get("platform") or "unknown", **_quality_report_from_rollup(row)}
+            for row in platform_rows
+        ]
+        return report
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to analyze data quality: {str(e)}")
-    finally:
-        mongodb.close()
+
+
+# 竞争度分析只需要的字段（流式遍历时减少传输量）
+COMPETITION_PROJECTION = {"name": 1, "price": 1, "rating": 1, "review_count": 1, "review_count_text": 1}
+
+
+def _competition_level(score: float) -> str:
+    return "high" if score > 60 else ("medium" if score > 30 else "low")
+
+
+def _push_top_k(heap: List[Tuple[float, int, Dict[str, Any]]], key: float, seq: int, item: Dict[str, Any], k: int) -> None:
+    """维护大小为 k 的堆，保留 key 最大的 k 项（堆顶为当前最小）"""
+    entry = (key, seq, item)
+    if len(heap) < k:
+        heapq.heappush(heap, entry)
+    elif entry[:2] > heap[0][:2]:
+        heapq.heapreplace(heap, entry)
 
 
 @router.get("/competition-analysis")
 async def get_competition_analysis(
     category: Optional[str] = Query(None, description="分类筛选"),
-    platform: Optional[str] = Query(None, description="平台筛选")
+    platform: Optional[str] = Query(None, description="平台筛选"),
+    top_k: int = Query(10, ge=1, le=100, description="蓝海 / 高竞争产品各返回的数量")
 ) -> Dict[str, Any]:
-    """获取竞争度分析"""
-    db = mongodb.connect()
-    if db is None:
+    """获取竞争度分析
+
+    流式遍历游标（只投影所需字段），用计数器累计分布，用固定大小的堆保留
+    竞争度最低 / 最高的 top_k 个产品，内存占用与产品总数无关
+    """
+    products_repo = get_product_repository()
+    if products_repo is None:
         raise HTTPException(status_code=500, detail="MongoDB not configured")
     
     try:
-        products_collection = db["products"]
-        
-        query = {}
+        # 没有评分的产品不参与竞争度计算，直接在数据库端过滤
+        query: Dict[str, Any] = {"rating": {"$gt": 0}}
         if category:
             query["categories"] = {"$in": [category]}
         if platform:
             query["platform"] = platform
         
-        products = list(products_collection.find(query))
+        total = 0
+        score_sum = 0.0
+        distribution = {"low": 0, "medium": 0, "high": 0}
+        lowest: List[Tuple[float, int, Dict[str, Any]]] = []   # 以 -score 为键，保留分数最低的 top_k
+        highest: List[Tuple[float, int, Dict[str, Any]]] = []  # 以 score 为键，保留分数最高的 top_k
         
-        # 计算竞争度分数
-        competition_scores = []
-        for product in products:
+        cursor = products_repo.iterate(query, projection=COMPETITION_PROJECTION, batch_size=1000)
+        async for product in cursor:
             review_count = product.get("review_count")
             if review_count is None:
                 review_count = parse_review_count(product.get("review_count_text"))
@@ -357,148 +282,143 @@ async def get_competition_analysis(
             rating = product.get("rating", 0) or 0
             
             # 竞争度计算：基于评论数和评分
-            if review_count and rating:
-                # 评论数权重 0.6，评分权重 0.4
-                score = (min(review_count / 1000, 1) * 60) + (rating / 5 * 40)
-                competition_scores.append({
-                    "score": score,
-                    "level": "high" if score > 60 else ("medium" if score > 30 else "low"),
-                    "product_id": str(product.get("_id", "")),
-                    "name": product.get("name", "")
-                })
+            if not (review_count and rating):
+                continue
+            
+            # 评论数权重 0.6，评分权重 0.4
+            score = (min(review_count / 1000, 1) * 60) + (rating / 5 * 40)
+            level = _competition_level(score)
+            
+            total += 1
+            score_sum += score
+            distribution[level] += 1
+            
+            item = {
+                "score": score,
+                "level": level,
+                "product_id": str(product.get("_id", "")),
+                "name": product.get("name", "")
+            }
+            # total 作为次级键：同分时保留先遍历到的产品
+            if level == "low":
+                _push_top_k(lowest, -score, -total, item, top_k)
+            if level == "high":
+                _push_top_k(highest, score, -total, item, top_k)
         
-        if not competition_scores:
+        if total == 0:
             return {
                 "total_products": 0,
                 "average_competition_score": 0,
                 "competition_distribution": {"low": 0, "medium": 0, "high": 0},
-                "blue_ocean_products": []
+                "blue_ocean_products": [],
+                "high_competition_products": []
             }
         
-        avg_score = sum(c["score"] for c in competition_scores) / len(competition_scores)
-        
-        # 竞争度分布
-        distribution = {"low": 0, "medium": 0, "high": 0}
-        for c in competition_scores:
-            distribution[c["level"]] += 1
-        
-        # 蓝海产品（低竞争度）
-        blue_ocean = [c for c in competition_scores if c["level"] == "low"][:10]
+        # 蓝海产品（竞争度最低的 top_k 个）、高竞争产品（竞争度最高的 top_k 个）
+        blue_ocean = [entry[2] for entry in sorted(lowest, reverse=True)]
+        high_competition = [entry[2] for entry in sorted(highest, reverse=True)]
         
         return {
-            "total_products": len(competition_scores),
-            "average_competition_score": round(avg_score, 2),
+            "total_products": total,
+            "average_competition_score": round(score_sum / total, 2),
             "competition_distribution": distribution,
             "blue_ocean_products": blue_ocean,
+            "high_competition_products": high_competition,
             "category": category or "all",
             "platform": platform or "all"
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to analyze competition: {str(e)}")
-    finally:
-        mongodb.close()
+
+
+# 每个批次返回的样本产品数
+BATCH_SAMPLE_SIZE = 5
+
+
+async def _batch_sample_names(products_repo, run_ids: List[str]) -> Dict[str, List[str]]:
+    """指定批次最新的若干个产品名称（只扫描这些批次：run_id + created_at 索引）
+
+    用 $sort + $push + $slice 取每组前 N 个，兼容 MongoDB 5.2 以前的版本（不使用 $topN）
+    """
+    if not run_ids:
+        return {}
+    rows = await products_repo.aggregate([
+        {"$match": {"run_id": {"$in": run_ids}}},
+        {"$sort": {"run_id": 1, "created_at": -1}},
+        {"$group": {
+            "_id": "$run_id",
+            "names": {"$push": "$name"}
+        }},
+        {"$project": {"names": {"$slice": ["$names", BATCH_SAMPLE_SIZE]}}}
+    ])
+    return {row["_id"]: [(name or "")[:50] for name in row["names"]] for row in rows}
 
 
 @router.get("/batch-analysis")
 async def get_batch_analysis(
-    limit: int = Query(10, description="分析最近 N 个批次")
+    limit: int = Query(10, ge=1, le=100, description="分析最近 N 个批次")
 ) -> Dict[str, Any]:
     """获取爬取批次分析"""
-    db = mongodb.connect()
-    if db is None:
+    products_repo = get_product_repository()
+    if products_repo is None:
         raise HTTPException(status_code=500, detail="MongoDB not configured")
     
     try:
-        products_collection = db["products"]
-        
-        # 按 run_id 分组统计
-        pipeline = [
-            {"$group": {
-                "_id": "$run_id",
-                "count": {"$sum": 1},
-                "first_created": {"$min": "$created_at"},
-                "last_updated": {"$max": "$updated_at"}
-            }},
-            {"$sort": {"first_created": -1}},
-            {"$limit": limit}
-        ]
+        # 批次统计读取 run 汇总（O(批次数)，不扫描整个 products），只为返回的批次取样本名称
+        batches, freshness = await read_rollups("run", sort=[("first_created", -1)], limit=limit)
+        samples = await _batch_sample_names(products_repo, [batch.get("run_id") for batch in batches])
         
-        batches = list(products_collection.aggregate(pipeline))
-        
-        batch_details = []
-        for batch in batches:
-            run_id = batch.get("_id", "unknown")
-            if not run_id:
-                continue
-            
-            # 获取该批次的产品详情
-            batch_products = list(products_collection.find({"run_id": run_id}).limit(5))
-            
-            batch_details.append({
-                "run_id": run_id,
+        batch_details = [
+            {
+                "run_id": batch.get("run_id"),
                 "product_count": batch.get("count", 0),
                 "first_created": batch.get("first_created").isoformat() if batch.get("first_created") else None,
                 "last_updated": batch.get("last_updated").isoformat() if batch.get("last_updated") else None,
-                "sample_products": [p.get("name", "")[:50] for p in batch_products]
-            })
+                "sample_products": samples.get(batch.get("run_id"), [])
+            }
+            for batch in batches
+        ]
         
         return {
             "total_batches": len(batch_details),
-            "batches": batch_details
+            "batches": batch_details,
+            "freshness": freshness
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to analyze batches: {str(e)}")
-    finally:
-        mongodb.close()
 
 
 @router.get("/platform-comparison")
 async def get_platform_comparison() -> Dict[str, Any]:
     """获取平台对比分析"""
-    db = mongodb.connect()
-    if db is None:
+    products_repo = get_product_repository()
+    if products_repo is None:
         raise HTTPException(status_code=500, detail="MongoDB not configured")
     
     try:
-        products_collection = db["products"]
-        
-        # 按平台聚合
-        pipeline = [
-            {"$group": {
-                "_id": "$platform",
-                "count": {"$sum": 1},
-                "avg_price": {"$avg": {"$toDouble": {"$replaceAll": {"input": {"$toString": "$price"}, "find": "$", "replacement": ""}}}},
-                "avg_rating": {"$avg": "$rating"},
-                "total_reviews": {"$sum": {"$ifNull": ["$review_count", 0]}}
-            }},
-            {"$sort": {"count": -1}}
-        ]
-        
-        platforms = list(products_collection.aggregate(pipeline))
+        # 读取平台汇总
+        platforms, freshness = await read_rollups("platform", sort=[("count", -1)])
         
         platform_data = []
         for platform in platforms:
-            platform_name = platform.get("_id", "unknown")
-            avg_price = platform.get("avg_price", 0)
-            if avg_price is None:
-                avg_price = 0
+            avg_price = rollup_average(platform, "price") or 0
+            avg_rating = rollup_average(platform, "rating")
             
             platform_data.append({
-                "platform": platform_name,
+                "platform": platform.get("platform") or "unknown",
                 "product_count": platform.get("count", 0),
                 "average_price": round(avg_price, 2),
-                "average_rating": round(platform.get("avg_rating", 0), 2) if platform.get("avg_rating") else None,
-                "total_reviews": platform.get("total_reviews", 0)
+                "average_rating": round(avg_rating, 2) if avg_rating else None,
+                "total_reviews": platform.get("review_sum", 0)
             })
         
         return {
             "platforms": platform_data,
-            "total_platforms": len(platform_data)
+            "total_platforms": len(platform_data),
+            "freshness": freshness
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to compare platforms: {str(e)}")
-    finally:
-        mongodb.close()
 
 
 @router.get("/ai-insights")
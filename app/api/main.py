@@ -2,19 +2,70 @@
 FastAPI 應用主入口
 """
 
+import asyncio
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from app.api import products, scrape, analysis, seed
+from app.config import settings
+from app.db.mongodb import mongodb
+from app.db.indexes import ensure_indexes, IndexBootstrapError
+from app.services.analytics_rollups import ensure_rollups
+from app.services.response_cache import response_cache
+from app.services.retention import run_retention_schedule
+from app.services.scrape_jobs import scrape_jobs
+from app.api.middleware import ConditionalGetMiddleware, ResponseCacheMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """應用生命週期：啟動時建立共享 MongoDB 連線池、初始化索引和分析匯總，啟動爬取任務線程池和數據保留任務，關閉時釋放"""
+    db = mongodb.connect()
+    mongodb.connect_async()
+    if db is not None and settings.mongodb_ensure_indexes:
+        try:
+            await asyncio.to_thread(ensure_indexes, db)
+        except IndexBootstrapError:
+            # upsert 鍵沒有索引時拒絕啟動，避免每次寫入都全表掃描
+            raise
+        except Exception as e:
+            print(f"[Startup] 索引初始化失敗: {e}")
+    if db is not None:
+        try:
+            # 首次啟動或匯總過期時全量重建；之後由寫入端增量更新
+            await asyncio.to_thread(ensure_rollups, db)
+        except Exception as e:
+            print(f"[Startup] 分析匯總初始化失敗: {e}")
+    if db is not None:
+        try:
+            await asyncio.to_thread(scrape_jobs.recover_interrupted)
+        except Exception as e:
+            print(f"[Startup] 恢復爬取任務狀態失敗: {e}")
+    scrape_jobs.start(asyncio.get_running_loop())
+    # 後台定期清理舊的爬取批次（不在爬取請求路徑上）
+    retention_task = asyncio.create_task(run_retention_schedule()) if db is not None and settings.retention_enabled else None
+    yield
+    if retention_task is not None:
+        retention_task.cancel()
+    scrape_jobs.shutdown()
+    mongodb.close()
+
 
 app = FastAPI(
     title="Amazon Products API",
     description="產品數據 API",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+# 只讀端點響應緩存與條件 GET（需在 CORS 之前註冊，使 CORS 位於外層，
+# 命中緩存 / 304 的響應同樣帶上 CORS 頭；後註冊的 ETag 位於緩存外層，304 不需要查緩存）
+app.add_middleware(ResponseCacheMiddleware)
+app.add_middleware(ConditionalGetMiddleware)
+
 # 获取环境变量，判断是否为生产环境
 # Railway 环境：如果 PORT 已设置（Railway 自动设置），则认为是生产环境
 # 或者 ENV 明确设置为 "production"
@@ -68,6 +119,12 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/api/cache/metrics")
+def cache_metrics():
+    """響應緩存命中統計"""
+    return response_cache.metrics()
+
+
 @app.get("/favicon.ico")
 def favicon():
     """处理 favicon 请求，避免 404 错误"""
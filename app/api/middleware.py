@@ -0,0 +1,133 @@
+"""
+API 中間件
+- ConditionalGetMiddleware：按數據版本號生成強 ETag，If-None-Match 命中時直接返回 304
+- ResponseCacheMiddleware：緩存只讀 GET 端點的 200 響應（見 app/services/response_cache.py）
+"""
+
+import hashlib
+from typing import List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.services.data_version import data_version
+from app.services.response_cache import CachedResponse, cache_key, normalize_query, response_cache
+
+
+# 只在數據寫入時變化的只讀端點
+CACHEABLE_PREFIXES = ("/api/products", "/api/analysis")
+
+# 響應內容不只由數據決定（AI 生成文本，調用失敗時返回錯誤信息），不使用 ETag，也不緩存響應
+UNCACHEABLE_PATHS = ("/api/analysis/ai-insights",)
+
+
+def _header(scope, name: bytes) -> Optional[bytes]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value
+    return None
+
+
+def build_etag(path: str, query_string: str, version: int) -> str:
+    """強 ETag：同一數據版本下，同一路徑和（規範化後的）查詢參數的響應保持不變"""
+    digest = hashlib.sha1(f"{version}:{path}?{normalize_query(query_string)}".encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def _etag_matches(if_none_match: bytes, etag: str) -> bool:
+    """If-None-Match 使用弱比較（忽略 W/ 前綴），支持多個值和 *"""
+    for candidate in if_none_match.decode("latin-1").split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ConditionalGetMiddleware:
+    """純 ASGI 中間件：為只讀 GET 響應加上 ETag，數據未變化時返回 304 且不執行端點"""
+
+    def __init__(self, app, prefixes: Sequence[str] = CACHEABLE_PREFIXES):
+        self.app = app
+        self.prefixes = tuple(prefixes)
+
+    def _applies(self, scope) -> bool:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            return False
+        return scope["path"].startswith(self.prefixes) and scope["path"] not in UNCACHEABLE_PATHS
+
+    async def __call__(self, scope, receive, send):
+        if not self._applies(scope):
+            await self.app(scope, receive, send)
+            return
+
+        version = await data_version.current()
+        etag = build_etag(scope["path"], scope.get("query_string", b"").decode("latin-1"), version)
+
+        if_none_match = _header(scope, b"if-none-match")
+        if if_none_match and _etag_matches(if_none_match, etag):
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                "headers": [(b"etag", etag.encode("latin-1")), (b"cache-control", b"no-cache")],
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = [(k, v) for k, v in message.get("headers", []) if k not in (b"etag", b"cache-control")]
+                headers += [(b"etag", etag.encode("latin-1")), (b"cache-control", b"no-cache")]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class ResponseCacheMiddleware:
+    """純 ASGI 中間件：命中時直接返回緩存，未命中時邊轉發邊記錄響應"""
+
+    def __init__(self, app, prefixes: Sequence[str] = CACHEABLE_PREFIXES):
+        self.app = app
+        self.prefixes = tuple(prefixes)
+
+    def _cacheable(self, scope) -> bool:
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return False
+        if not settings.response_cache_enabled:
+            return False
+        for name, value in scope.get("headers", []):
+            if name == b"cache-control" and b"no-cache" in value:
+                return False
+        return scope["path"].startswith(self.prefixes) and scope["path"] not in UNCACHEABLE_PATHS
+
+    async def __call__(self, scope, receive, send):
+        if not self._cacheable(scope):
+            await self.app(scope, receive, send)
+            return
+
+        version = await data_version.current()
+        response_cache.observe_version(version)
+        path = scope["path"]
+        key = cache_key(path, scope.get("query_string", b"").decode("latin-1"), version)
+
+        cached = response_cache.get(path, key)
+        if cached is not None:
+            await send({"type": "http.response.start", "status": 200, "headers": cached.headers + [(b"x-cache", b"HIT")]})
+            await send({"type": "http.response.body", "body": cached.body})
+            return
+
+        status = 0
+        headers: List[Tuple[bytes, bytes]] = []
+        chunks: List[bytes] = []
+
+        async def send_wrapper(message):
+            nonlocal status, headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                message = {**message, "headers": headers + [(b"x-cache", b"MISS")]}
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if status == 200 and not message.get("more_body", False):
+                    response_cache.set(key, CachedResponse(headers, b"".join(chunks)))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
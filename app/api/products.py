@@ -7,9 +7,11 @@ from fastapi import APIRouter, Query, HTTPException
 from typing import Optional, List, Dict, Any
 from app.services.mongodb_reader import (
     get_products_from_mongodb,
+    get_products_page_from_mongodb,
     get_product_by_id_from_mongodb,
     get_products_stats_from_mongodb,
-    ProductResponse
+    ProductResponse,
+    ProductPage
 )
 
 router = APIRouter(prefix="/api/products", tags=["products"])
@@ -17,7 +19,7 @@ router = APIRouter(prefix="/api/products", tags=["products"])
 # ProductResponse 定义在 app/services/mongodb_reader.py 中，避免循环导入
 
 @router.get("/", response_model=List[ProductResponse])
-def get_products(
+async def get_products(
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
     platform: Optional[str] = None,
@@ -38,7 +40,7 @@ def get_products(
     """
     try:
         # 從 MongoDB 讀取數據
-        products = get_products_from_mongodb(
+        products = await get_products_from_mongodb(
             skip=skip,
             limit=limit,
             platform=platform,
@@ -54,8 +56,45 @@ def get_products(
         raise HTTPException(status_code=500, detail=f"Failed to get products list: {str(e)}")
 
 
+@router.get("/page", response_model=ProductPage)
+async def get_products_page(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="上一頁返回的 next_cursor，不傳表示第一頁"),
+    platform: Optional[str] = None,
+    category: Optional[str] = None,
+    search: Optional[str] = None,
+):
+    """
+    游標分頁獲取產品列表（從 MongoDB 讀取）
+    
+    按創建時間倒序，深翻頁成本不隨頁數增加；返回的 next_cursor 為 None 時表示沒有下一頁
+    
+    Args:
+        limit: 每頁記錄數
+        cursor: 不透明游標
+        platform: 平台過濾
+        category: 分類過濾
+        search: 搜索關鍵詞
+    """
+    try:
+        return await get_products_page_from_mongodb(
+            limit=limit,
+            cursor=cursor,
+            platform=platform,
+            category=category,
+            search=search
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        import traceback
+        print(f"Error in get_products_page: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Failed to get products page: {str(e)}")
+
+
 @router.get("/{product_id}", response_model=ProductResponse)
-def get_product(product_id: str):
+async def get_product(product_id: str):
     """
     獲取單個產品詳情（從 MongoDB 讀取）
     
@@ -63,7 +102,7 @@ def get_product(product_id: str):
         product_id: 產品 ID（格式: prod-{hash} 或 MongoDB _id）
     """
     try:
-        product = get_product_by_id_from_mongodb(product_id)
+        product = await get_product_by_id_from_mongodb(product_id)
         
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
@@ -79,10 +118,10 @@ def get_product(product_id: str):
 
 
 @router.get("/stats/summary")
-def get_stats():
+async def get_stats():
     """獲取產品統計信息（從 MongoDB 讀取）"""
     try:
-        stats = get_products_stats_from_mongodb()
+        stats = await get_products_stats_from_mongodb()
         return stats
     except Exception as e:
         import traceback
@@ -3,25 +3,42 @@
 接收搜索關鍵詞，使用 BeautifulSoup 爬取數據並存儲到 MongoDB
 """
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import AsyncIterator, List, Optional, Dict, Any, Tuple
+import asyncio
+import json
 import uuid
 from datetime import datetime
 
-from app.scrapers.beautifulsoup_scraper import BeautifulSoupScraper
-from app.services.mongodb_writer import bulk_upsert_products_mongodb
-from app.services.query_history import save_query_history, cleanup_old_queries, get_query_by_keyword, get_products_by_query_keyword
+from app.config import settings
+
+from app.schemas.product import ProductWithCategories
+from app.services.query_history import STALE, get_cached_terms, get_products_by_run_id, normalize_term
 from app.services.mongodb_reader import ProductResponse
+from app.services.product_metrics import compute_derived_fields
+from app.services.scrape_jobs import (
+    QUEUED,
+    SUCCEEDED,
+    JobNotFoundError,
+    JobNotResumableError,
+    JobQueueFullError,
+    scrape_jobs,
+)
 
 router = APIRouter(prefix="/api/scrape", tags=["scrape"])
 
+# 流式響應不緩存、不經反向代理緩衝
+_STREAM_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
 
 class ScrapeRequest(BaseModel):
     """爬取請求模型"""
     search_terms: List[str]  # 搜索關鍵詞列表
     fetch_details: bool = False  # 是否獲取商品詳情頁面
-    max_products: int = 20  # 最大爬取商品數量
+    max_products: int = Field(20, ge=1)  # 最大爬取商品數量（至少 1 個）
+    wait: bool = True  # 是否等待任務完成；False 時立即返回 run_id，通過 /status/{run_id} 查詢進度
 
 
 class ScrapeResponse(BaseModel):
@@ -30,234 +47,244 @@ class ScrapeResponse(BaseModel):
     message: str
     products_count: int
     run_id: str
+    status: str = SUCCEEDED  # 後台任務狀態
     products: List[ProductResponse] = []
 
 
-def _beautifulsoup_to_product_with_categories(products: List[Dict[str, Any]], source_url: str = "https://www.amazon.com/") -> List:
-    """將 BeautifulSoup 爬取的產品轉換為 ProductWithCategories 格式"""
-    from app.schemas.product import ProductIn, CategoryIn, ProductWithCategories
-    import hashlib
-    
-    result = []
-    
-    for p in products:
-        if not p.get('name'):
+def _to_response_products(product_with_categories: List[ProductWithCategories]) -> List[ProductResponse]:
+    """把剛爬取的產品轉換為 API 響應格式"""
+    response_products = []
+    for item in product_with_categories:
+        try:
+            # 由於我們直接從 BeautifulSoup 獲取數據，需要手動構建響應
+            product = item.product
+            
+            # 計算價格、利潤率和競爭度（與寫入端存儲的派生字段使用同一實現）
+            derived = compute_derived_fields(
+                product.price, product.review_count, product.review_count_text, product.rating
+            )
+            price = derived["price_value"] or 0.0
+            margin_rate = derived["margin_rate"]
+            competition_score = derived["competition_score"]
+            competition_level = derived["competition_level"]
+            
+            # 獲取分類
+            category = "General"
+            if item.categories:
+                category = item.categories[0].name
+            
+            response_products.append(ProductResponse(
+                id=f"prod-{product.content_hash[:12]}",
+                title=product.name,
+                platform="amazon",
+                price=price,
+                formattedPrice=product.price or f"${price:.2f}",
+                marginRate=round(margin_rate, 2),
+                competitionScore=round(competition_score, 2),
+                competitionLevel=competition_level,
+                category=category,
+                imageUrl=str(product.image_url) if product.image_url else None,
+                description=product.description,
+                rating=product.rating,
+                reviewCount=derived["review_count"],
+                productUrl=str(product.product_url) if product.product_url else None,
+                tags=[],
+                productDetails=None,
+                aboutThisItem=None,
+                colorOptions=None,
+                sizeOptions=None,
+            ))
+        except Exception as e:
+            print(f"[Scrape API] 轉換商品時出錯: {e}")
             continue
-        
-        # 計算 content_hash
-        core_values = [
-            p.get('name'),
-            p.get('price'),
-            str(p.get('rating') or ''),
-            p.get('review_count'),
-            p.get('image_url'),
-            p.get('product_url'),
-            p.get('description'),
-            source_url,
-        ]
-        hasher = hashlib.sha256()
-        for v in core_values:
-            hasher.update((str(v) or "").encode("utf-8"))
-            hasher.update(b"\x1f")
-        content_hash = hasher.hexdigest()
-        
-        # 解析 review_count
-        review_count_text = p.get('review_count') or p.get('review_count_text')
-        review_count = None
-        if review_count_text:
-            try:
-                review_count = int(str(review_count_text).replace(",", "").strip())
-            except:
-                pass
-        
-        # 創建 ProductIn
-        product_in = ProductIn(
-            name=p.get('name'),
-            price=p.get('price'),
-            rating=p.get('rating'),
-            review_count_text=review_count_text,
-            review_count=review_count,
-            image_url=p.get('image_url'),
-            product_url=p.get('product_url'),
-            description=p.get('description'),
-            source_url=source_url,
-            content_hash=content_hash,
-            platform="amazon",  # BeautifulSoup 爬蟲默認爬取 Amazon
+    return response_products
+
+
+def _new_run_id() -> str:
+    return f"scrape-{uuid.uuid4().hex[:8]}-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+
+
+def _unique_terms(search_terms: List[str]) -> List[str]:
+    """按規範形式去重的關鍵詞（保留第一次出現的寫法），最多5個（避免過度爬取）"""
+    unique: Dict[str, str] = {}
+    for term in search_terms:
+        term_key = normalize_term(term)
+        if term_key:
+            unique.setdefault(term_key, term.strip())
+    return list(unique.values())[:5]
+
+
+class _CachedTerms:
+    """結果緩存的查找結果：命中的關鍵詞的商品（按請求順序）和需要爬取的關鍵詞"""
+
+    def __init__(self, search_terms: List[str], cached: Dict[str, Dict[str, Any]], max_products: int):
+        hits = [cached[normalize_term(term)] for term in search_terms if normalize_term(term) in cached]
+        self.max_products = max_products
+        self.run_id = hits[0]["run_id"] if hits else None
+        self.missing = [term for term in search_terms if normalize_term(term) not in cached]
+        self.stale = [term for term in search_terms if cached.get(normalize_term(term), {}).get("state") == STALE]
+        self.products = _merge_products(*(_mongo_products_to_response(hit["products"]) for hit in hits))[:max_products]
+
+    @property
+    def quota(self) -> int:
+        """留給需要爬取的關鍵詞的商品數"""
+        return max(self.max_products - len(self.products), 0)
+
+
+async def _lookup_cache(request: ScrapeRequest, search_terms: List[str]) -> _CachedTerms:
+    """按關鍵詞讀取結果緩存；過期但仍可使用的關鍵詞在後台重新爬取（stale-while-revalidate）"""
+    if not search_terms:
+        raise HTTPException(status_code=400, detail="search_terms must contain at least one non-empty term")
+    lookup = _CachedTerms(search_terms, await get_cached_terms(search_terms), request.max_products)
+    if lookup.stale:
+        print(f"[Scrape API] 關鍵詞 {lookup.stale} 的緩存已過期，返回舊結果並在後台重新爬取")
+        try:
+            await asyncio.to_thread(
+                scrape_jobs.submit,
+                search_terms=lookup.stale,
+                fetch_details=request.fetch_details,
+                max_products=request.max_products,
+                run_id=_new_run_id(),
+            )
+        except JobQueueFullError as e:
+            print(f"[Scrape API] 後台重新爬取未提交: {e}")
+    return lookup
+
+
+def _merge_products(*groups: List[ProductResponse]) -> List[ProductResponse]:
+    """合併多組商品，按商品鏈接和標題去重（保留先出現的）"""
+    seen = set()
+    merged = []
+    for group in groups:
+        for product in group:
+            key = (product.productUrl, product.title)
+            if key not in seen:
+                seen.add(key)
+                merged.append(product)
+    return merged
+
+
+async def _stored_products(run_id: str) -> List[ProductResponse]:
+    """讀取爬取任務已寫入 MongoDB 的商品（附加到其他請求的任務）"""
+    try:
+        mongo_products = await get_products_by_run_id(run_id)
+    except Exception as e:
+        print(f"[Scrape API] 獲取產品失敗: {e}")
+        return []
+    return _mongo_products_to_response(mongo_products)
+
+
+def _mongo_products_to_response(mongo_products: List[Dict[str, Any]]) -> List[ProductResponse]:
+    """把 MongoDB 中的商品轉換為響應格式"""
+    from app.services.mongodb_reader import _mongo_product_to_response
+    response_products = []
+    for mongo_product in mongo_products:
+        try:
+            # 确保 mongo_product 是字典格式
+            if not isinstance(mongo_product, dict):
+                continue
+            response = _mongo_product_to_response(mongo_product)
+            response_products.append(response)
+        except Exception as e:
+            print(f"[Scrape API] 轉換產品失敗: {e}")
+            import traceback
+            traceback.print_exc()
+            continue
+    return response_products
+
+
+async def _submit_job(request: ScrapeRequest, search_terms: List[str], max_products: int, listener=None) -> Tuple[str, bool]:
+    """提交爬取任務，返回 (run_id, 是否附加到相同關鍵詞的進行中任務)
+
+    提交時同步寫入任務記錄和租約（PyMongo），放到線程中執行，不阻塞事件循環
+    """
+    run_id = _new_run_id()
+    try:
+        job_run_id = await asyncio.to_thread(
+            scrape_jobs.submit,
+            search_terms=search_terms,
+            fetch_details=request.fetch_details,
+            max_products=max_products,
+            run_id=run_id,
+            listener=listener,
         )
-        
-        # 提取分類（從 category_path 或其他字段）
-        categories = []
-        if p.get('category_path'):
-            # 從 category_path 提取分類
-            parts = [part.strip() for part in p.get('category_path', '').split('>') if part.strip()]
-            for part in parts[:3]:  # 最多取前3個分類
-                if part and part.lower() != 'home':
-                    categories.append(CategoryIn(name=part, source_url=source_url))
-        
-        # 如果沒有分類，使用默認分類
-        if not categories:
-            categories.append(CategoryIn(name="General", source_url=source_url))
-        
-        result.append(ProductWithCategories(product=product_in, categories=categories))
-    
-    return result
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return job_run_id, job_run_id != run_id
+
+
+async def _wait_for_job(run_id: str, attached: bool) -> Tuple[str, str, List[ProductResponse]]:
+    """等待爬取任務結束，返回 (狀態, 消息, 商品)；任務異常終止時拋出 500"""
+    if attached:
+        # 任務可能在其他 worker 中執行：等待結束後從 MongoDB 讀取商品
+        status = await scrape_jobs.wait_finished(run_id)
+        if status.get("error"):
+            raise HTTPException(status_code=500, detail=status.get("message") or status["error"])
+        return status["status"], status.get("message", ""), await _stored_products(run_id)
+
+    outcome = await scrape_jobs.wait(run_id)
+    if outcome.error:
+        raise HTTPException(status_code=500, detail=outcome.message)
+    return outcome.status, outcome.message, _to_response_products(outcome.products)
 
 
 @router.post("/", response_model=ScrapeResponse)
 async def scrape_products(request: ScrapeRequest):
     """
     搜索並爬取商品
-    如果該關鍵詞之前查詢過，直接返回上次的結果
+    按關鍵詞（規範化後）使用結果緩存：緩存命中的關鍵詞直接返回上次的商品，只爬取缺失的關鍵詞；
+    過期但仍可使用的緩存照常返回，同時在後台重新爬取。相同關鍵詞和參數的爬取進行中時附加到該任務，不重複爬取
     
     Args:
         request: 爬取請求，包含搜索關鍵詞列表
     """
     try:
-        # 限制搜索關鍵詞數量（避免過度爬取）
-        search_terms = request.search_terms[:5]  # 最多5個關鍵詞
+        search_terms = _unique_terms(request.search_terms)
+        cached = await _lookup_cache(request, search_terms)
         
-        # 檢查是否有該關鍵詞的歷史查詢（使用第一個關鍵詞）
-        query_keyword = search_terms[0] if search_terms else "unknown"
-        existing_query = get_query_by_keyword(query_keyword)
-        
-        if existing_query and existing_query.get("run_id"):
-            # 找到歷史查詢，直接返回上次的結果
-            print(f"[Scrape API] 找到關鍵詞 '{query_keyword}' 的歷史查詢，返回上次結果")
-            run_id = existing_query["run_id"]
-            
-            # 獲取該查詢的產品
-            mongo_products = get_products_by_query_keyword(query_keyword)
-            
-            # 轉換為響應格式
-            from app.services.mongodb_reader import _mongo_product_to_response
-            response_products = []
-            for mongo_product in mongo_products:
-                try:
-                    # 确保 mongo_product 是字典格式
-                    if not isinstance(mongo_product, dict):
-                        continue
-                    response = _mongo_product_to_response(mongo_product)
-                    response_products.append(response)
-                except Exception as e:
-                    print(f"[Scrape API] 轉換產品失敗: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    continue
-            
+        if not cached.missing or not cached.quota:
+            # 所有關鍵詞都有緩存（或緩存的商品已達上限），直接返回上次的結果
+            print(f"[Scrape API] 關鍵詞 {search_terms} 命中結果緩存，返回上次結果")
             return ScrapeResponse(
                 success=True,
-                message=f"Returned cached results for '{query_keyword}' ({len(response_products)} products)",
-                products_count=len(response_products),
-                run_id=run_id,
-                products=response_products
+                message=f"Returned cached results for {', '.join(search_terms)} ({len(cached.products)} products)",
+                products_count=len(cached.products),
+                run_id=cached.run_id,
+                products=cached.products
             )
         
-        # 沒有歷史查詢，執行爬取
-        # 生成 run_id
-        run_id = f"scrape-{uuid.uuid4().hex[:8]}-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        
-        # 初始化爬蟲
-        scraper = BeautifulSoupScraper()
-        
-        # 爬取商品
-        print(f"[Scrape API] 開始爬取，關鍵詞: {search_terms}")
-        products = scraper.scrape_products(
-            search_terms=search_terms,
-            fetch_details=request.fetch_details
-        )
-        
-        # 限制商品數量
-        if len(products) > request.max_products:
-            products = products[:request.max_products]
+        # 只爬取沒有緩存的關鍵詞（爬蟲在任務線程池中執行，不阻塞事件循環）
+        if cached.products:
+            print(f"[Scrape API] {len(search_terms) - len(cached.missing)} 個關鍵詞命中結果緩存，爬取 {cached.missing}")
+        run_id, attached = await _submit_job(request, cached.missing, cached.quota)
         
-        print(f"[Scrape API] 爬取到 {len(products)} 個商品")
-        
-        if not products:
+        if not request.wait:
+            queued = "Attached to in-flight scrape job" if attached else "Scrape job queued"
             return ScrapeResponse(
-                success=False,
-                message="No products scraped",
-                products_count=0,
+                success=True,
+                message=f"{queued}, poll /api/scrape/status/{run_id} for progress",
+                products_count=len(cached.products),
                 run_id=run_id,
-                products=[]
+                status=QUEUED,
+                products=cached.products
             )
         
-        # 轉換為標準格式
-        source_url = "https://www.amazon.com/"
-        product_with_categories = _beautifulsoup_to_product_with_categories(products, source_url)
-        
-        # 存儲到 MongoDB
-        print(f"[Scrape API] 開始寫入 MongoDB...")
-        mongo_count = bulk_upsert_products_mongodb(product_with_categories, run_id=run_id)
-        print(f"[Scrape API] 成功寫入 {mongo_count} 個商品到 MongoDB")
-        
-        # 保存查詢歷史（使用第一個關鍵詞作為查詢關鍵詞）
-        query_keyword = search_terms[0] if search_terms else "unknown"
-        save_query_history(query_keyword, run_id, mongo_count)
-        
-        # 自動清理舊數據（保留最近5次查詢）
-        cleanup_old_queries(keep_count=5)
-        
-        # 轉換為 API 響應格式
-        response_products = []
-        for item in product_with_categories:
-            try:
-                # 創建一個臨時的 Product 對象用於轉換
-                # 由於我們直接從 BeautifulSoup 獲取數據，需要手動構建響應
-                product = item.product
-                price = 0.0
-                if product.price:
-                    import re
-                    cleaned = re.sub(r'[$,]', '', str(product.price))
-                    try:
-                        price = float(cleaned)
-                    except:
-                        pass
-                
-                # 計算利潤率和競爭度（使用與 mongodb_reader.py 相同的邏輯）
-                from app.services.mongodb_reader import _calculate_margin_rate, _calculate_competition_score, _get_competition_level
-                
-                margin_rate = _calculate_margin_rate(price)
-                competition_score = _calculate_competition_score(product.review_count, product.rating)
-                competition_level = _get_competition_level(competition_score)
-                
-                # 獲取分類
-                category = "General"
-                if item.categories:
-                    category = item.categories[0].name
-                
-                response_products.append(ProductResponse(
-                    id=f"prod-{product.content_hash[:12]}",
-                    title=product.name,
-                    platform="amazon",
-                    price=price,
-                    formattedPrice=product.price or f"${price:.2f}",
-                    marginRate=round(margin_rate, 2),
-                    competitionScore=round(competition_score, 2),
-                    competitionLevel=competition_level,
-                    category=category,
-                    imageUrl=str(product.image_url) if product.image_url else None,
-                    description=product.description,
-                    rating=product.rating,
-                    reviewCount=product.review_count,
-                    productUrl=str(product.product_url) if product.product_url else None,
-                    tags=[],
-                    productDetails=None,
-                    aboutThisItem=None,
-                    colorOptions=None,
-                    sizeOptions=None,
-                ))
-            except Exception as e:
-                print(f"[Scrape API] 轉換商品時出錯: {e}")
-                continue
-        
+        status, message, scraped_products = await _wait_for_job(run_id, attached)
+        # 緩存命中的關鍵詞的商品在前
+        response_products = _merge_products(cached.products, scraped_products)
+        if cached.products:
+            message = f"{message} ({len(cached.products)} cached products)"
         return ScrapeResponse(
-            success=True,
-            message=f"Successfully scraped {len(response_products)} products and stored to MongoDB",
+            success=status == SUCCEEDED,
+            message=message,
             products_count=len(response_products),
             run_id=run_id,
+            status=status,
             products=response_products
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         error_msg = str(e)
@@ -266,13 +293,180 @@ async def scrape_products(request: ScrapeRequest):
         raise HTTPException(status_code=500, detail=f"Scraping failed: {error_msg}")
 
 
+def _format_event(event: str, data: Dict[str, Any], sse: bool) -> str:
+    """NDJSON：每行一個 {"event": ..., "data": ...}；SSE：event / data 兩行加空行"""
+    if sse:
+        return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    return json.dumps({"event": event, "data": data}, ensure_ascii=False) + "\n"
+
+
+async def _job_events(run_id: str, queue: "asyncio.Queue[Dict[str, Any]]") -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """把任務事件轉換為流式響應事件，直到任務結束（長時間沒有事件時發送心跳）"""
+    while True:
+        try:
+            event = await asyncio.wait_for(queue.get(), timeout=settings.scrape_stream_heartbeat_seconds)
+        except asyncio.TimeoutError:
+            yield "heartbeat", {"run_id": run_id}
+            continue
+
+        kind = event["event"]
+        if kind == "products":
+            for product in _to_response_products(event["products"]):
+                yield "product", product.model_dump()
+        elif kind == "done":
+            outcome = event["outcome"]
+            yield "done", {
+                "run_id": run_id,
+                "status": outcome.status,
+                "success": outcome.status == SUCCEEDED,
+                "message": outcome.message,
+                "error": outcome.error,
+                "written": outcome.written,
+            }
+            return
+        else:
+            yield kind, {key: value for key, value in event.items() if key != "event"}
+
+
+async def _attached_stream(run_id: str, cached_products: List[ProductResponse], sse: bool) -> AsyncIterator[str]:
+    """附加到進行中的任務：先推送緩存命中的商品，等待任務結束（期間發送心跳），再推送該任務寫入的商品"""
+    yield _format_event("job", {"run_id": run_id, "status": QUEUED, "attached": True}, sse)
+    for product in cached_products:
+        yield _format_event("product", product.model_dump(), sse)
+    waiter = asyncio.ensure_future(scrape_jobs.wait_finished(run_id))
+    try:
+        while not waiter.done():
+            await asyncio.wait({waiter}, timeout=settings.scrape_stream_heartbeat_seconds)
+            if not waiter.done():
+                yield _format_event("heartbeat", {"run_id": run_id}, sse)
+        status = waiter.result()
+    finally:
+        waiter.cancel()
+
+    for product in _merge_products(cached_products, await _stored_products(run_id))[len(cached_products):]:
+        yield _format_event("product", product.model_dump(), sse)
+    yield _format_event("done", {
+        "run_id": run_id,
+        "status": status["status"],
+        "success": status["status"] == SUCCEEDED,
+        "message": status.get("message", ""),
+        "error": status.get("error"),
+        "written": status.get("written", 0),
+    }, sse)
+
+
+@router.post("/stream")
+async def stream_scrape_products(
+    request: ScrapeRequest,
+    http_request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|sse)$", description="ndjson（默認）或 sse"),
+):
+    """
+    流式搜索並爬取商品
+    每個商品寫入 MongoDB 後立即推送，並推送任務和每個關鍵詞的進度：
+
+    - job: 任務開始（run_id、status）
+    - term: 關鍵詞狀態變化（term、status、products）
+    - product: 一個商品（與 /api/scrape 響應中的商品格式相同）
+    - heartbeat: 長時間沒有事件時的心跳
+    - done: 任務結束（status、message、written）
+
+    默認返回 NDJSON（application/x-ndjson）；Accept: text/event-stream 或 ?format=sse 時返回 Server-Sent Events。
+    結果緩存與 /api/scrape 相同：先推送緩存命中的關鍵詞的商品，再流式推送缺失關鍵詞的爬取結果；
+    相同關鍵詞和參數的爬取進行中時等待該任務結束後推送其結果。
+    客戶端斷開後任務繼續在後台執行，可通過 /status/{run_id} 查詢。
+    """
+    sse = format == "sse" or (format is None and "text/event-stream" in http_request.headers.get("accept", ""))
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    search_terms = _unique_terms(request.search_terms)
+    cached = await _lookup_cache(request, search_terms)
+
+    if not cached.missing or not cached.quota:
+        print(f"[Scrape API] 關鍵詞 {search_terms} 命中結果緩存，推送上次結果")
+        run_id = cached.run_id
+
+        async def cached_stream() -> AsyncIterator[str]:
+            yield _format_event("job", {"run_id": run_id, "status": SUCCEEDED, "cached": True}, sse)
+            for product in cached.products:
+                yield _format_event("product", product.model_dump(), sse)
+            yield _format_event("done", {
+                "run_id": run_id,
+                "status": SUCCEEDED,
+                "success": True,
+                "message": f"Returned cached results for {', '.join(search_terms)} ({len(cached.products)} products)",
+                "error": None,
+                "written": 0,
+            }, sse)
+
+        return StreamingResponse(cached_stream(), media_type=media_type, headers=_STREAM_HEADERS)
+
+    # 工作線程推送的事件通過 call_soon_threadsafe 轉入事件循環的隊列
+    loop = asyncio.get_running_loop()
+    queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+
+    def listener(event: Dict[str, Any]) -> None:
+        loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    run_id, attached = await _submit_job(request, cached.missing, cached.quota, listener=listener)
+    if attached:
+        return StreamingResponse(
+            _attached_stream(run_id, cached.products, sse), media_type=media_type, headers=_STREAM_HEADERS
+        )
+
+    async def job_stream() -> AsyncIterator[str]:
+        try:
+            yield _format_event("job", {"run_id": run_id, "status": QUEUED}, sse)
+            for product in cached.products:
+                yield _format_event("product", product.model_dump(), sse)
+            async for event, data in _job_events(run_id, queue):
+                yield _format_event(event, data, sse)
+        finally:
+            # 客戶端斷開時只停止推送，任務繼續執行
+            scrape_jobs.unsubscribe(run_id, listener)
+
+    return StreamingResponse(job_stream(), media_type=media_type, headers=_STREAM_HEADERS)
+
+
 @router.get("/status/{run_id}")
 async def get_scrape_status(run_id: str):
-    """獲取爬取任務狀態（未來可以實現任務隊列）"""
-    # 目前簡單實現，未來可以擴展為任務隊列
-    return {
-        "run_id": run_id,
-        "status": "completed",
-        "message": "Scraping task completed"
-    }
+    """獲取爬取任務狀態與按關鍵詞的進度"""
+    status = await scrape_jobs.get_status(run_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Scrape job {run_id} not found")
+    return status
+
+
+@router.post("/cancel/{run_id}")
+async def cancel_scrape(run_id: str):
+    """取消爬取任務（排隊中的直接取消，運行中的在下一個請求前停止；已完成的商品保留，可通過 /resume/{run_id} 繼續）"""
+    try:
+        return await asyncio.to_thread(scrape_jobs.cancel, run_id)
+    except JobNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Scrape job {run_id} not found or not running in this process")
+
+
+@router.post("/resume/{run_id}")
+async def resume_scrape(run_id: str):
+    """恢復失敗或取消的爬取任務（沿用 run_id，跳過已完成的關鍵詞和詳情頁面）"""
+    try:
+        await scrape_jobs.resume(run_id)
+    except JobNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Scrape job {run_id} not found")
+    except JobNotResumableError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return ScrapeResponse(
+        success=True,
+        message=f"Scrape job resumed, poll /api/scrape/status/{run_id} for progress",
+        products_count=0,
+        run_id=run_id,
+        status=QUEUED,
+        products=[]
+    )
+
 
+@router.get("/jobs")
+async def list_scrape_jobs(limit: int = Query(20, ge=1, le=100)):
+    """最近的爬取任務"""
+    return await scrape_jobs.list_jobs(limit=limit)
@@ -185,18 +185,18 @@ async def seed_sample_products():
         run_id = f"seed-{uuid.uuid4().hex[:8]}-{datetime.now().strftime('%Y%m%d%H%M%S')}"
         
         # 写入 MongoDB
-        affected = bulk_upsert_products_mongodb(products_with_categories, run_id=run_id)
+        write_result = bulk_upsert_products_mongodb(products_with_categories, run_id=run_id)
+        affected = write_result.written
         
         # 更新状态为 active
         from app.db.mongodb import mongodb
-        db = mongodb.connect()
-        if db:
+        db = mongodb.get_database()
+        if db is not None:
             products_collection = db["products"]
             products_collection.update_many(
                 {"run_id": run_id, "status": "draft"},
                 {"$set": {"status": "active", "updated_at": datetime.utcnow()}}
             )
-            mongodb.close()
         
         return {
             "success": True,
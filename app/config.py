@@ -7,13 +7,76 @@ class Settings(BaseSettings):
     firecrawl_api_key: str = Field(alias="FIRECRAWL_API_KEY", default="fc-temp-key")
     mongodb_url: str = Field(alias="MONGODB_URL", default="")
     mongodb_database: str = Field(alias="MONGODB_DATABASE", default="amazon_products")
+    # MongoDB 連線池設置（整個進程共用一個連線池）
+    mongodb_max_pool_size: int = Field(default=50, alias="MONGODB_MAX_POOL_SIZE")
+    mongodb_min_pool_size: int = Field(default=0, alias="MONGODB_MIN_POOL_SIZE")
+    mongodb_max_idle_time_ms: int = Field(default=60000, alias="MONGODB_MAX_IDLE_TIME_MS")
+    mongodb_server_selection_timeout_ms: int = Field(default=10000, alias="MONGODB_SERVER_SELECTION_TIMEOUT_MS")
+    # 批量寫入每批操作數
+    mongodb_bulk_chunk_size: int = Field(default=500, alias="MONGODB_BULK_CHUNK_SIZE")
+    # 啟動時冪等創建索引
+    mongodb_ensure_indexes: bool = Field(default=True, alias="MONGODB_ENSURE_INDEXES")
+    # 分析匯總表（analytics_rollups）：寫入後增量更新，儀表板端點直接讀取
+    analytics_rollups_enabled: bool = Field(default=True, alias="ANALYTICS_ROLLUPS_ENABLED")
+    # 只讀 API 響應緩存（按數據版本號失效）
+    response_cache_enabled: bool = Field(default=True, alias="RESPONSE_CACHE_ENABLED")
+    response_cache_ttl_seconds: int = Field(default=300, alias="RESPONSE_CACHE_TTL_SECONDS")
+    response_cache_max_entries: int = Field(default=512, alias="RESPONSE_CACHE_MAX_ENTRIES")
+    response_cache_shared_backend: str = Field(default="", alias="RESPONSE_CACHE_SHARED_BACKEND")  # "" 或 "memory"
+    # 多進程部署時重新讀取數據版本號的間隔（秒）
+    data_version_check_seconds: float = Field(default=2.0, alias="DATA_VERSION_CHECK_SECONDS")
+    # 數據保留：後台定期按爬取批次清理 products / query_history（0 表示不啟用該條件）
+    retention_enabled: bool = Field(default=True, alias="RETENTION_ENABLED")
+    retention_interval_seconds: int = Field(default=3600, alias="RETENTION_INTERVAL_SECONDS")
+    retention_keep_runs: int = Field(default=5, alias="RETENTION_KEEP_RUNS")
+    retention_max_age_seconds: int = Field(default=0, alias="RETENTION_MAX_AGE_SECONDS")
+    retention_max_products: int = Field(default=0, alias="RETENTION_MAX_PRODUCTS")
+    retention_batch_size: int = Field(default=100, alias="RETENTION_BATCH_SIZE")
     env: str = Field(alias="ENV", default="development")
     
     # 爬蟲設置
+    # 每個關鍵詞最多獲取的商品數（搜索結果按頁獲取直到達到此數量，超出部分不獲取詳情）
     max_products_per_search: int = Field(default=20, alias="MAX_PRODUCTS_PER_SEARCH")
+    # 每個關鍵詞最多獲取的搜索結果頁數
+    scrape_max_search_pages: int = Field(default=20, alias="SCRAPE_MAX_SEARCH_PAGES")
     delay_min: float = Field(default=2.0, alias="DELAY_MIN")
     delay_max: float = Field(default=5.0, alias="DELAY_MAX")
     output_dir: str = Field(default="data/scraped_content", alias="OUTPUT_DIR")
+    # 後台爬取任務：同時執行的任務數、最多排隊的任務數
+    scrape_max_workers: int = Field(default=2, alias="SCRAPE_MAX_WORKERS")
+    scrape_max_queued_jobs: int = Field(default=20, alias="SCRAPE_MAX_QUEUED_JOBS")
+    # 按關鍵詞的爬取結果緩存（query_history）：新鮮期（秒）；過期後仍可使用的時長（秒，期間在後台重新爬取）
+    scrape_cache_max_age_seconds: int = Field(default=21600, alias="SCRAPE_CACHE_MAX_AGE_SECONDS")
+    scrape_cache_stale_seconds: int = Field(default=86400, alias="SCRAPE_CACHE_STALE_SECONDS")
+    # 相同關鍵詞的爬取去重：租約時長（秒，持有方崩潰後多久可被接管）、其他 worker 的任務狀態輪詢間隔（秒）
+    scrape_lease_seconds: int = Field(default=120, alias="SCRAPE_LEASE_SECONDS")
+    scrape_attach_poll_seconds: float = Field(default=2.0, alias="SCRAPE_ATTACH_POLL_SECONDS")
+    # 爬取任務每完成多少個商品寫入一次 products（checkpoint 分批寫入）
+    crawl_flush_batch_size: int = Field(default=20, alias="CRAWL_FLUSH_BATCH_SIZE")
+    # checkpoint（crawl_checkpoints / crawl_frontier）的保留時間（秒），過期後由 TTL 索引自動刪除
+    crawl_checkpoint_ttl_seconds: int = Field(default=7 * 24 * 3600, alias="CRAWL_CHECKPOINT_TTL_SECONDS")
+    # 流式爬取（/api/scrape/stream）：寫入批次（商品寫入後立即推送）、無事件時的心跳間隔（秒）
+    scrape_stream_flush_batch_size: int = Field(default=1, alias="SCRAPE_STREAM_FLUSH_BATCH_SIZE")
+    scrape_stream_heartbeat_seconds: float = Field(default=15.0, alias="SCRAPE_STREAM_HEARTBEAT_SECONDS")
+    # 異步抓取：單個爬取同時進行的請求數；按主機限速（每秒請求數、突發數），
+    # 同一主機相鄰請求另外間隔 DELAY_MIN ~ DELAY_MAX 秒
+    scrape_concurrency: int = Field(default=4, alias="SCRAPE_CONCURRENCY")
+    scrape_host_rate: float = Field(default=0.5, alias="SCRAPE_HOST_RATE")
+    scrape_host_burst: int = Field(default=2, alias="SCRAPE_HOST_BURST")
+    # HTML 解析後端："lxml"（預編譯 XPath，失敗時回退）或 "beautifulsoup"
+    scrape_parser: str = Field(default="lxml", alias="SCRAPE_PARSER")
+    # 原始 HTML 歸檔（用於離線重放，默認關閉：歸檔不會自動清理，只在需要重放時開啟）；
+    # 壓縮格式 "zstd"（需安裝 zstandard，否則使用 gzip）或 "gzip"
+    html_archive_enabled: bool = Field(default=False, alias="HTML_ARCHIVE_ENABLED")
+    html_archive_dir: str = Field(default="data/html_archive", alias="HTML_ARCHIVE_DIR")
+    html_archive_codec: str = Field(default="zstd", alias="HTML_ARCHIVE_CODEC")
+    # 商品詳情頁面 HTTP 緩存（按 ASIN）：新鮮期內不重新請求，過期後按 ETag / Last-Modified 重新驗證
+    detail_cache_enabled: bool = Field(default=True, alias="DETAIL_CACHE_ENABLED")
+    detail_cache_dir: str = Field(default="data/http_cache", alias="DETAIL_CACHE_DIR")
+    detail_cache_max_age_seconds: int = Field(default=86400, alias="DETAIL_CACHE_MAX_AGE_SECONDS")
+    # 詳情頁面緩存清理：超過此時長（秒）沒有刷新的條目刪除、總大小上限（字節），0 表示不限
+    detail_cache_retention_seconds: int = Field(default=7 * 24 * 3600, alias="DETAIL_CACHE_RETENTION_SECONDS")
+    detail_cache_max_bytes: int = Field(default=512 * 1024 * 1024, alias="DETAIL_CACHE_MAX_BYTES")
     
     # 日誌設置
     log_level: str = Field(default="INFO", alias="LOG_LEVEL")
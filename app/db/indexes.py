@@ -0,0 +1,243 @@
+"""
+MongoDB 索引管理
+聲明熱點查詢所需的索引，在應用啟動或通過 scripts/manage_indexes.py 冪等創建，
+並可報告缺失 / 未使用 / 未聲明的索引
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+from app.config import settings
+from app.db.mongodb import mongodb
+
+
+# 各 collection 需要的索引（名稱固定，便於報告和遷移）
+INDEX_SPECS: Dict[str, List[Dict[str, Any]]] = {
+    "products": [
+        # upsert 鍵：bulk_upsert_products_mongodb 按 (product_url, name) 匹配
+        {"name": "product_url_1_name_1", "keys": [("product_url", ASCENDING), ("name", ASCENDING)]},
+        # 列表 / 分析按平台、分類、批次過濾並按 created_at 倒序；
+        # 列表索引帶上 _id，供 (created_at, _id) 游標分頁使用
+        {"name": "platform_1_created_at_-1__id_-1", "keys": [("platform", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]},
+        {"name": "categories_1_created_at_-1__id_-1", "keys": [("categories", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]},
+        {"name": "run_id_1_created_at_-1", "keys": [("run_id", ASCENDING), ("created_at", DESCENDING)]},
+        {"name": "created_at_-1__id_-1", "keys": [("created_at", DESCENDING), ("_id", DESCENDING)]},
+        # 產品詳情按 content_hash 前綴查找（^ 錨定的正則可以走索引）
+        {"name": "content_hash_1", "keys": [("content_hash", ASCENDING)]},
+        # 全文搜索：$text 相關度匹配 + search_tokens 前綴匹配（見 app/services/product_search.py）
+        {
+            "name": "search_text",
+            "keys": [("name", TEXT), ("description", TEXT)],
+            "weights": {"name": 10, "description": 2},
+            "default_language": "english",
+        },
+        {"name": "search_tokens_1", "keys": [("search_tokens", ASCENDING)]},
+        # 寫入時預先計算的派生字段，供分析端過濾 / 排序
+        {"name": "price_value_1", "keys": [("price_value", ASCENDING)]},
+        {"name": "competition_score_1", "keys": [("competition_score", ASCENDING)]},
+    ],
+    "categories": [
+        {"name": "name_1", "keys": [("name", ASCENDING)], "unique": True},
+    ],
+    "query_history": [
+        {"name": "query_keyword_1_created_at_-1", "keys": [("query_keyword", ASCENDING), ("created_at", DESCENDING)]},
+        {"name": "created_at_-1", "keys": [("created_at", DESCENDING)]},
+        {"name": "run_id_1", "keys": [("run_id", ASCENDING)]},
+        # 按規範化搜索詞讀取最近的結果緩存（見 app/services/query_history.py）
+        {"name": "term_key_1_created_at_-1", "keys": [("term_key", ASCENDING), ("created_at", DESCENDING)]},
+    ],
+    "scrape_jobs": [
+        # 任務列表按創建時間倒序；啟動時按狀態查找中斷的任務
+        {"name": "created_at_-1", "keys": [("created_at", DESCENDING)]},
+        {"name": "status_1", "keys": [("status", ASCENDING)]},
+    ],
+    "scrape_leases": [
+        # 過期的租約自動刪除（持有方崩潰時；見 app/services/scrape_leases.py）
+        {"name": "expires_at_ttl", "keys": [("expires_at", ASCENDING)], "expireAfterSeconds": 0},
+    ],
+    "crawl_checkpoints": [
+        # 過期的 checkpoint 自動刪除（見 app/services/crawl_checkpoint.py）
+        {"name": "updated_at_ttl", "keys": [("updated_at", ASCENDING)], "expireAfterSeconds": settings.crawl_checkpoint_ttl_seconds},
+    ],
+    "crawl_frontier": [
+        # 恢復任務時按 run_id 讀取全部商品
+        {"name": "run_id_1_term_1_index_1", "keys": [("run_id", ASCENDING), ("term", ASCENDING), ("index", ASCENDING)]},
+        {"name": "updated_at_ttl", "keys": [("updated_at", ASCENDING)], "expireAfterSeconds": settings.crawl_checkpoint_ttl_seconds},
+    ],
+    "analytics_rollups": [
+        # 批次匯總按最近 / 最早創建時間排序；按日匯總按日期範圍讀取（見 app/services/analytics_rollups.py）
+        {"name": "kind_1_last_created_-1", "keys": [("kind", ASCENDING), ("last_created", DESCENDING)]},
+        {"name": "kind_1_first_created_-1", "keys": [("kind", ASCENDING), ("first_created", DESCENDING)]},
+        {"name": "kind_1_day_1", "keys": [("kind", ASCENDING), ("day", ASCENDING)]},
+    ],
+}
+
+# upsert 使用的匹配鍵，必須被某個索引的前綴覆蓋，否則每次 upsert 都是全表掃描
+UPSERT_KEYS: Dict[str, Sequence[str]] = {
+    "products": ("product_url", "name"),
+    "categories": ("name",),
+}
+
+
+class IndexBootstrapError(RuntimeError):
+    """必需的索引無法建立（例如 upsert 鍵沒有被索引覆蓋）"""
+
+
+def _normalize_keys(keys) -> List[Tuple[str, Any]]:
+    """把 index_information() / IndexSpec 的 key 統一成 [(field, direction)]
+
+    文本索引的字段按名稱排序，便於與 index_information() 的 weights 比較
+    """
+    normalized = [(field, direction) for field, direction in keys]
+    text_fields = sorted(field for field, direction in normalized if direction == TEXT)
+    if not text_fields:
+        return normalized
+    others = [(field, direction) for field, direction in normalized if direction != TEXT]
+    return others + [(field, TEXT) for field in text_fields]
+
+
+def _index_keys_from_info(info: Dict[str, Any]) -> List[Tuple[str, Any]]:
+    """index_information() 中文本索引的 key 是 _fts/_ftsx，需要從 weights 還原字段"""
+    keys = [(field, direction) for field, direction in info["key"]]
+    if ("_fts", TEXT) not in keys:
+        return _normalize_keys(keys)
+    others = [(field, direction) for field, direction in keys if field not in ("_fts", "_ftsx")]
+    return _normalize_keys(others + [(field, TEXT) for field in info.get("weights", {})])
+
+
+def _existing_indexes(collection) -> Dict[str, List[Tuple[str, Any]]]:
+    return {name: _index_keys_from_info(info) for name, info in collection.index_information().items()}
+
+
+def _covers(index_keys: List[Tuple[str, Any]], fields: Sequence[str]) -> bool:
+    """索引前綴是否覆蓋給定的等值匹配字段（順序無關）"""
+    prefix = [field for field, _ in index_keys[:len(fields)]]
+    return len(prefix) == len(fields) and set(prefix) == set(fields)
+
+
+def _sync_ttl(db, collection_name: str, index_name: str, info: Dict[str, Any], spec: Dict[str, Any]) -> bool:
+    """TTL 索引已存在但過期時間與聲明不同（例如修改了 CRAWL_CHECKPOINT_TTL_SECONDS）時用 collMod 更新
+
+    重建索引會在創建期間失去 TTL 清理，collMod 原地修改即可
+    """
+    expire_after = spec.get("expireAfterSeconds")
+    if expire_after is None or info.get("expireAfterSeconds") == expire_after:
+        return False
+    try:
+        db.command("collMod", collection_name, index={"name": index_name, "expireAfterSeconds": expire_after})
+        print(f"[Indexes] 已更新 {collection_name}.{index_name} 的過期時間: "
+              f"{info.get('expireAfterSeconds')} -> {expire_after} 秒")
+        return True
+    except OperationFailure as e:
+        print(f"[Indexes] 更新 {collection_name}.{index_name} 的過期時間失敗: {e}")
+        return False
+
+
+def _get_db(db=None):
+    if db is not None:
+        return db
+    return mongodb.get_database()
+
+
+def ensure_indexes(db=None, collections: Optional[Sequence[str]] = None) -> Dict[str, List[str]]:
+    """冪等創建缺失的索引，返回每個 collection 新建的索引名稱
+
+    已存在相同 key 的索引（即使名稱不同）會被視為已滿足，不會重複創建；
+    其中 TTL 索引的過期時間與聲明不同時原地更新。
+    最後校驗 upsert 鍵是否被覆蓋，未覆蓋時拋出 IndexBootstrapError。
+    """
+    db = _get_db(db)
+    if db is None:
+        print("[Indexes] MongoDB 未設定，跳過索引初始化")
+        return {}
+
+    created: Dict[str, List[str]] = {}
+    for collection_name, specs in INDEX_SPECS.items():
+        if collections and collection_name not in collections:
+            continue
+
+        collection = db[collection_name]
+        existing = collection.index_information()
+        existing_keys = {name: _index_keys_from_info(info) for name, info in existing.items()}
+        created[collection_name] = []
+
+        for spec in specs:
+            keys = _normalize_keys(spec["keys"])
+            matched = next((name for name, index_keys in existing_keys.items() if index_keys == keys), None)
+            if matched is not None:
+                _sync_ttl(db, collection_name, matched, existing[matched], spec)
+                continue
+
+            options = {k: v for k, v in spec.items() if k not in ("name", "keys")}
+            # 逐個創建：單個索引失敗（例如唯一索引遇到重複數據）不影響其他索引
+            try:
+                collection.create_indexes([IndexModel(keys, name=spec["name"], background=True, **options)])
+                created[collection_name].append(spec["name"])
+                print(f"[Indexes] 已創建索引 {collection_name}.{spec['name']}")
+            except OperationFailure as e:
+                print(f"[Indexes] 創建索引 {collection_name}.{spec['name']} 失敗: {e}")
+
+    verify_upsert_keys(db)
+    return created
+
+
+def verify_upsert_keys(db=None) -> None:
+    """校驗 upsert 鍵被索引覆蓋，否則大聲失敗"""
+    db = _get_db(db)
+    if db is None:
+        return
+
+    uncovered = []
+    for collection_name, fields in UPSERT_KEYS.items():
+        indexes = _existing_indexes(db[collection_name]).values()
+        if not any(_covers(keys, fields) for keys in indexes):
+            uncovered.append(f"{collection_name}({', '.join(fields)})")
+
+    if uncovered:
+        raise IndexBootstrapError(
+            f"upsert 鍵沒有被索引覆蓋: {'; '.join(uncovered)}，"
+            f"請先處理重複數據（scripts/remove_duplicates.py）後重新執行 scripts/manage_indexes.py"
+        )
+
+
+def report_indexes(db=None) -> Dict[str, Dict[str, Any]]:
+    """報告每個 collection 的索引狀態
+
+    missing: 已聲明但不存在；unused: 存在但自上次重啟以來沒有被使用（$indexStats）；
+    undeclared: 存在但沒有在 INDEX_SPECS 中聲明
+    """
+    db = _get_db(db)
+    if db is None:
+        return {}
+
+    report: Dict[str, Dict[str, Any]] = {}
+    for collection_name, specs in INDEX_SPECS.items():
+        collection = db[collection_name]
+        existing = _existing_indexes(collection)
+        declared_keys = [_normalize_keys(spec["keys"]) for spec in specs]
+
+        missing = [spec["name"] for spec in specs if _normalize_keys(spec["keys"]) not in existing.values()]
+        undeclared = [
+            name for name, keys in existing.items()
+            if name != "_id_" and keys not in declared_keys
+        ]
+
+        usage: Dict[str, int] = {}
+        try:
+            for stat in collection.aggregate([{"$indexStats": {}}]):
+                usage[stat["name"]] = int(stat.get("accesses", {}).get("ops", 0))
+        except OperationFailure as e:
+            # 沒有 $indexStats 權限時只報告缺失 / 未聲明
+            print(f"[Indexes] 無法讀取 {collection_name} 的索引使用統計: {e}")
+
+        unused = [name for name, ops in usage.items() if name != "_id_" and ops == 0]
+
+        report[collection_name] = {
+            "missing": missing,
+            "unused": unused,
+            "undeclared": undeclared,
+            "usage": usage,
+        }
+    return report
@@ -1,3 +1,4 @@
+import threading
 from pymongo import MongoClient
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.config import settings
@@ -5,49 +6,89 @@ from typing import Optional
 
 
 class MongoDBClient:
+    """進程級共享的 MongoDB 客戶端
+
+    MongoClient / AsyncIOMotorClient 本身線程安全且自帶連線池，整個進程只建立一次：
+    FastAPI 啟動時 connect()，關閉時 close()。服務函數透過 get_database() 取得共享實例，
+    不再各自建立或關閉連線，避免一個請求的 close() 拆掉另一個請求正在使用的連線。
+    """
+
     def __init__(self):
         self.client: Optional[MongoClient] = None
         self.async_client: Optional[AsyncIOMotorClient] = None
         self.database = None
         self.async_database = None
+        self._lock = threading.Lock()
+
+    def _client_options(self) -> dict:
+        """連線池參數（同步與異步客戶端共用）"""
+        return {
+            "serverSelectionTimeoutMS": settings.mongodb_server_selection_timeout_ms,
+            "maxPoolSize": settings.mongodb_max_pool_size,
+            "minPoolSize": settings.mongodb_min_pool_size,
+            "maxIdleTimeMS": settings.mongodb_max_idle_time_ms,
+            # macOS 上可能需要跳过 SSL 证书验证
+            "tlsAllowInvalidCertificates": True,  # 允许无效证书（开发环境）
+            "tls": True,  # 明确启用 TLS
+        }
 
     def connect(self):
-        """建立同步 MongoDB 連線"""
+        """建立同步 MongoDB 連線池（冪等，已連線時直接返回）"""
         if not settings.mongodb_url:
             return None
-        
-        try:
-            # 创建 MongoDB 客户端
-            # macOS 上可能需要跳过 SSL 证书验证
-            self.client = MongoClient(
-                settings.mongodb_url, 
-                serverSelectionTimeoutMS=10000,
-                tlsAllowInvalidCertificates=True,  # 允许无效证书（开发环境）
-                tls=True  # 明确启用 TLS
-            )
-            self.database = self.client[settings.mongodb_database]
-            # 测试连接
-            self.client.admin.command('ping')
+
+        if self.database is not None:
             return self.database
-        except Exception as e:
-            print(f"MongoDB 连接错误: {e}")
-            return None
+
+        with self._lock:
+            if self.database is not None:
+                return self.database
+
+            client = None
+            try:
+                client = MongoClient(settings.mongodb_url, **self._client_options())
+                # 测试连接（只在建立連線池時執行一次）
+                client.admin.command('ping')
+                self.client = client
+                self.database = client[settings.mongodb_database]
+                return self.database
+            except Exception as e:
+                print(f"MongoDB 连接错误: {e}")
+                if client is not None:
+                    client.close()
+                return None
+
+    def get_database(self):
+        """取得共享的同步 database，尚未連線時自動建立"""
+        if self.database is not None:
+            return self.database
+        return self.connect()
 
     def connect_async(self):
-        """建立異步 MongoDB 連線"""
+        """建立異步 MongoDB 連線池（冪等，已連線時直接返回）"""
         if not settings.mongodb_url:
             return None
-            
-        self.async_client = AsyncIOMotorClient(settings.mongodb_url)
-        self.async_database = self.async_client[settings.mongodb_database]
-        return self.async_database
+
+        if self.async_database is not None:
+            return self.async_database
+
+        with self._lock:
+            if self.async_database is None:
+                self.async_client = AsyncIOMotorClient(settings.mongodb_url, **self._client_options())
+                self.async_database = self.async_client[settings.mongodb_database]
+            return self.async_database
 
     def close(self):
-        """關閉連線"""
-        if self.client:
-            self.client.close()
-        if self.async_client:
-            self.async_client.close()
+        """關閉連線池（僅在應用關閉或腳本結束時調用）"""
+        with self._lock:
+            if self.client:
+                self.client.close()
+            if self.async_client:
+                self.async_client.close()
+            self.client = None
+            self.async_client = None
+            self.database = None
+            self.async_database = None
 
 
 # 全域實例
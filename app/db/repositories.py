@@ -0,0 +1,143 @@
+"""
+異步 MongoDB 倉儲層
+基於 AsyncIOMotorClient（共享連線池），供 API 讀取路徑與查詢歷史使用，
+避免在 async 端點中調用阻塞的 PyMongo 而卡住整個事件循環
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.db.mongodb import mongodb
+
+
+SortSpec = Optional[Sequence[Tuple[str, int]]]
+
+
+class MongoRepository:
+    """單一 collection 的異步讀寫封裝"""
+
+    collection_name: str = ""
+
+    def __init__(self, database):
+        self.collection = database[self.collection_name]
+
+    async def find(
+        self,
+        query: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+        sort: SortSpec = None,
+        skip: int = 0,
+        limit: int = 0,
+    ) -> List[Dict]:
+        """查詢多個文檔（limit=0 表示不限制）"""
+        cursor = self.collection.find(query, projection)
+        if sort:
+            cursor = cursor.sort(list(sort))
+        if skip:
+            cursor = cursor.skip(skip)
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=None)
+
+    def iterate(
+        self,
+        query: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+        sort: SortSpec = None,
+        batch_size: int = 0,
+    ):
+        """返回可 async for 迭代的游標，逐批讀取而不一次載入全部文檔"""
+        cursor = self.collection.find(query, projection)
+        if sort:
+            cursor = cursor.sort(list(sort))
+        if batch_size:
+            cursor = cursor.batch_size(batch_size)
+        return cursor
+
+    async def find_one(
+        self,
+        query: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+        sort: SortSpec = None,
+    ) -> Optional[Dict]:
+        return await self.collection.find_one(query, projection, sort=list(sort) if sort else None)
+
+    async def count(self, query: Optional[Dict[str, Any]] = None) -> int:
+        return await self.collection.count_documents(query or {})
+
+    async def aggregate(self, pipeline: List[Dict[str, Any]], allow_disk_use: bool = False) -> List[Dict]:
+        cursor = self.collection.aggregate(pipeline, allowDiskUse=allow_disk_use)
+        return await cursor.to_list(length=None)
+
+    async def insert_one(self, document: Dict[str, Any]):
+        return await self.collection.insert_one(document)
+
+    async def insert_many(self, documents: List[Dict[str, Any]]):
+        return await self.collection.insert_many(documents)
+
+    async def delete_one(self, query: Dict[str, Any]) -> int:
+        result = await self.collection.delete_one(query)
+        return result.deleted_count
+
+    async def delete_many(self, query: Dict[str, Any]) -> int:
+        result = await self.collection.delete_many(query)
+        return result.deleted_count
+
+
+class ProductRepository(MongoRepository):
+    collection_name = "products"
+
+
+class QueryHistoryRepository(MongoRepository):
+    collection_name = "query_history"
+
+
+class AnalyticsRollupRepository(MongoRepository):
+    collection_name = "analytics_rollups"
+
+
+class AppMetaRepository(MongoRepository):
+    collection_name = "app_meta"
+
+
+class ScrapeJobRepository(MongoRepository):
+    collection_name = "scrape_jobs"
+
+
+def get_product_repository() -> Optional[ProductRepository]:
+    """取得產品倉儲，MongoDB 未設定時返回 None"""
+    db = mongodb.connect_async()
+    if db is None:
+        return None
+    return ProductRepository(db)
+
+
+def get_query_history_repository() -> Optional[QueryHistoryRepository]:
+    """取得查詢歷史倉儲，MongoDB 未設定時返回 None"""
+    db = mongodb.connect_async()
+    if db is None:
+        return None
+    return QueryHistoryRepository(db)
+
+
+def get_analytics_rollup_repository() -> Optional[AnalyticsRollupRepository]:
+    """取得分析匯總倉儲，MongoDB 未設定時返回 None"""
+    db = mongodb.connect_async()
+    if db is None:
+        return None
+    return AnalyticsRollupRepository(db)
+
+
+def get_app_meta_repository() -> Optional[AppMetaRepository]:
+    """取得應用元數據倉儲（數據版本號等），MongoDB 未設定時返回 None"""
+    db = mongodb.connect_async()
+    if db is None:
+        return None
+    return AppMetaRepository(db)
+
+
+def get_scrape_job_repository() -> Optional[ScrapeJobRepository]:
+    """取得爬取任務倉儲，MongoDB 未設定時返回 None"""
+    db = mongodb.connect_async()
+    if db is None:
+        return None
+    return ScrapeJobRepository(db)
@@ -0,0 +1,76 @@
+"""
+BeautifulSoup 爬取結果轉換
+把 BeautifulSoupScraper 返回的字典轉換為寫入端使用的 ProductWithCategories
+"""
+
+import hashlib
+from typing import Any, Dict, List
+
+from app.schemas.product import ProductIn, CategoryIn, ProductWithCategories
+
+
+def beautifulsoup_to_product_with_categories(products: List[Dict[str, Any]], source_url: str = "https://www.amazon.com/") -> List[ProductWithCategories]:
+    """將 BeautifulSoup 爬取的產品轉換為 ProductWithCategories 格式"""
+    result = []
+    
+    for p in products:
+        if not p.get('name'):
+            continue
+        
+        # 計算 content_hash
+        core_values = [
+            p.get('name'),
+            p.get('price'),
+            str(p.get('rating') or ''),
+            p.get('review_count'),
+            p.get('image_url'),
+            p.get('product_url'),
+            p.get('description'),
+            source_url,
+        ]
+        hasher = hashlib.sha256()
+        for v in core_values:
+            hasher.update((str(v) or "").encode("utf-8"))
+            hasher.update(b"\x1f")
+        content_hash = hasher.hexdigest()
+        
+        # 解析 review_count
+        review_count_text = p.get('review_count') or p.get('review_count_text')
+        review_count = None
+        if review_count_text:
+            try:
+                review_count = int(str(review_count_text).replace(",", "").strip())
+            except:
+                pass
+        
+        # 創建 ProductIn
+        product_in = ProductIn(
+            name=p.get('name'),
+            price=p.get('price'),
+            rating=p.get('rating'),
+            review_count_text=review_count_text,
+            review_count=review_count,
+            image_url=p.get('image_url'),
+            product_url=p.get('product_url'),
+            description=p.get('description'),
+            source_url=source_url,
+            content_hash=content_hash,
+            platform="amazon",  # BeautifulSoup 爬蟲默認爬取 Amazon
+        )
+        
+        # 提取分類（從 category_path 或其他字段）
+        categories = []
+        if p.get('category_path'):
+            # 從 category_path 提取分類
+            parts = [part.strip() for part in p.get('category_path', '').split('>') if part.strip()]
+            for part in parts[:3]:  # 最多取前3個分類
+                if part and part.lower() != 'home':
+                    categories.append(CategoryIn(name=part, source_url=source_url))
+        
+        # 如果沒有分類，使用默認分類
+        if not categories:
+            categories.append(CategoryIn(name="General", source_url=source_url))
+        
+        result.append(ProductWithCategories(product=product_in, categories=categories))
+    
+    return result
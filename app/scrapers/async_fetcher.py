@@ -0,0 +1,209 @@
+"""
+異步並發抓取
+- 全局並發上限：整個進程同時進行的請求數（settings.scrape_concurrency）
+- 按主機的令牌桶限速（settings.scrape_host_rate 個/秒，突發 settings.scrape_host_burst）
+- 按主機的禮貌延遲：同一主機相鄰兩個請求的開始時間至少間隔 [delay_min, delay_max] 之間的隨機值
+
+並發名額和限速狀態保存在進程級的 request_limiter / host_limiter 中（線程安全、不綁定事件循環）。
+每個後台爬取任務在自己的線程和事件循環中運行，多個任務同時運行時共用同一個並發上限和主機限速，
+而不是各自計算。
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import aiohttp
+
+from app.config import settings
+
+
+class HostRateLimiter:
+    """按主機的令牌桶 + 抖動間隔，返回本次請求需要等待的秒數（預約制，等待由調用方完成）"""
+
+    def __init__(self, rate: float, burst: int, delay_min: float, delay_max: float):
+        self.rate = max(rate, 0.001)
+        self.burst = max(burst, 1)
+        self.delay_min = max(delay_min, 0.0)
+        self.delay_max = max(delay_max, self.delay_min)
+        self._hosts: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, host: str) -> float:
+        with self._lock:
+            now = time.monotonic()
+            state = self._hosts.get(host)
+            if state is None:
+                state = {"tokens": float(self.burst), "updated": now, "next_allowed": now}
+                self._hosts[host] = state
+
+            # 補充令牌（允許為負，表示已預約的未來請求）
+            state["tokens"] = min(float(self.burst), state["tokens"] + (now - state["updated"]) * self.rate)
+            state["updated"] = now
+
+            start = max(now, state["next_allowed"])
+            if state["tokens"] < 1:
+                start = max(start, now + (1 - state["tokens"]) / self.rate)
+            state["tokens"] -= 1
+            state["next_allowed"] = start + random.uniform(self.delay_min, self.delay_max)
+            return start - now
+
+
+class ConcurrencyLimiter:
+    """跨線程 / 事件循環的異步信號量（async with 使用）
+
+    asyncio.Semaphore 綁定單個事件循環，不能在多個爬取任務的事件循環之間共用；
+    這裡用線程鎖記錄名額，等待方在自己的事件循環中等待 future，釋放時把名額直接轉交給最早的等待方
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self._active = 0
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> int:
+        """當前佔用的名額數"""
+        with self._lock:
+            return self._active
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._active < self.limit and not self._waiters:
+                self._active += 1
+                return
+            future = loop.create_future()
+            self._waiters.append((loop, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                waiting = (loop, future) in self._waiters
+                if waiting:
+                    self._waiters.remove((loop, future))
+            # 名額已經轉交但任務同時被取消：歸還名額（future 被取消時由 _wake 歸還）
+            if not waiting and future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                loop, future = self._waiters.popleft()
+                try:
+                    loop.call_soon_threadsafe(self._wake, future)
+                    return
+                except RuntimeError:
+                    # 等待方的事件循環已關閉，轉交給下一個
+                    continue
+            self._active -= 1
+
+    def _wake(self, future: asyncio.Future) -> None:
+        """在等待方的事件循環中執行：等待方已取消時把名額繼續轉交"""
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    async def __aenter__(self) -> "ConcurrencyLimiter":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.release()
+
+
+host_limiter = HostRateLimiter(
+    rate=settings.scrape_host_rate,
+    burst=settings.scrape_host_burst,
+    delay_min=settings.delay_min,
+    delay_max=settings.delay_max,
+)
+
+request_limiter = ConcurrencyLimiter(settings.scrape_concurrency)
+
+
+def _is_blocked(url: str) -> bool:
+    """是否被重定向到驗證頁面"""
+    lowered = url.lower()
+    return "captcha" in lowered or "robot" in lowered
+
+
+class FetchResult:
+    """一次成功抓取的結果（status 為 304 時 content 為空）"""
+
+    __slots__ = ("url", "status", "content", "etag", "last_modified")
+
+    def __init__(
+        self,
+        url: str,
+        status: int,
+        content: bytes,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ):
+        self.url = url
+        self.status = status
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class AsyncFetcher:
+    """基於 aiohttp 的並發抓取器（async with 使用）"""
+
+    def __init__(
+        self,
+        headers: Optional[Dict[str, str]] = None,
+        concurrency: ConcurrencyLimiter = request_limiter,
+        limiter: HostRateLimiter = host_limiter,
+        timeout: float = 30,
+    ):
+        self.headers = dict(headers or {})
+        self.concurrency = concurrency
+        self.limiter = limiter
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self) -> "AsyncFetcher":
+        self._session = aiohttp.ClientSession(headers=self.headers, timeout=self.timeout)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> Optional[FetchResult]:
+        """抓取頁面，失敗或遇到驗證頁面時返回 None（帶條件請求頭時可能返回 304）"""
+        host = urlparse(url).netloc
+        async with self.concurrency:
+            # 取得並發名額後再按主機預約，保證請求實際發出的間隔不小於預約間隔
+            wait = self.limiter.reserve(host)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                print(f"正在獲取頁面: {url}")
+                async with self._session.get(url, headers=headers) as response:
+                    response.raise_for_status()
+                    final_url = str(response.url)
+                    if _is_blocked(final_url):
+                        print("檢測到驗證頁面，跳過此 URL")
+                        return None
+                    etag = response.headers.get("ETag")
+                    last_modified = response.headers.get("Last-Modified")
+                    if response.status == 304:
+                        print("頁面未修改 (304)")
+                        return FetchResult(final_url, 304, b"", etag, last_modified)
+                    content = await response.read()
+                    print(f"成功獲取頁面，內容長度: {len(content)} 字節")
+                    return FetchResult(final_url, response.status, content, etag, last_modified)
+            except Exception as e:
+                print(f"獲取頁面失敗: {url} {e}")
+                return None
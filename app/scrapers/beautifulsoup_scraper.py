@@ -2,12 +2,94 @@
 BeautifulSoup 爬蟲實現
 """
 
+import asyncio
 import requests
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 from bs4 import BeautifulSoup
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional
+from urllib.parse import urlparse
 import re
 import random
+import time
+from app.config import settings
+from .async_fetcher import AsyncFetcher, FetchResult, host_limiter
 from .base_scraper import BaseScraper
+from .frontier import CrawlFrontier
+from .html_archive import HtmlArchive, get_html_archive
+from .html_parsers import get_page_parser
+from .http_cache import get_detail_page_cache
+
+
+# 隨機 User-Agent 列表
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/121.0',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15'
+]
+
+HOMEPAGE_URL = "https://www.amazon.com/"
+
+_PAGE_PARAM = re.compile(r'&page=(\d+)$')
+
+
+def search_url_for(search_term: str, page: int = 1) -> str:
+    """關鍵詞對應的搜索結果頁面 URL（第一頁不帶 page 參數）"""
+    url = f"https://www.amazon.com/s?k={search_term.replace(' ', '+')}"
+    return url if page <= 1 else f"{url}&page={page}"
+
+
+def split_search_page(url: str):
+    """搜索結果頁面 URL 拆分為 (第一頁 URL, 頁碼)"""
+    match = _PAGE_PARAM.search(url)
+    if not match:
+        return url, 1
+    return url[:match.start()], int(match.group(1))
+
+
+def merge_search_pages(pages: List[List[Dict[str, Any]]], quota: int) -> List[Dict[str, Any]]:
+    """按頁碼順序合併搜索結果（按商品 URL 去重，廣告位會在多頁重複出現），截斷到配額"""
+    merged = []
+    seen = set()
+    for products in pages:
+        for product_info in products:
+            key = product_info.get('product_url') or product_info.get('name')
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(product_info)
+            if len(merged) >= quota:
+                return merged
+    return merged
+
+
+def page_kind(url: str) -> str:
+    """頁面類型：search / detail / page"""
+    if '/s?' in url:
+        return 'search'
+    if '/dp/' in url or '/gp/product/' in url:
+        return 'detail'
+    return 'page'
+
+
+# 歸檔重放的進程池：每個子進程一個爬蟲實例（只用於解析）
+_replay_scraper: Optional["BeautifulSoupScraper"] = None
+
+
+def _init_replay_worker():
+    global _replay_scraper
+    _replay_scraper = BeautifulSoupScraper()
+
+
+def _replay_parse(task):
+    """子進程中解析一個歸檔頁面"""
+    archive_root, record = task
+    content = HtmlArchive(archive_root).load(record)
+    if record['kind'] == 'search':
+        return _replay_scraper.parse_search_page(content)
+    return _replay_scraper.parse_detail_page(content)
 
 
 class BeautifulSoupScraper(BaseScraper):
@@ -16,18 +98,15 @@ class BeautifulSoupScraper(BaseScraper):
     def __init__(self, output_dir: str = "data/scraped_content"):
         super().__init__(output_dir)
         self.session = requests.Session()
-        
-        # 隨機 User-Agent 列表
-        user_agents = [
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/121.0',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15'
-        ]
+        # HTML 解析後端（None 表示使用 BeautifulSoup）
+        self.parser = get_page_parser(settings.scrape_parser)
+        # 原始 HTML 歸檔（None 表示未啟用）
+        self.archive = get_html_archive()
+        # 詳情頁面 HTTP 緩存（None 表示未啟用）
+        self.detail_cache = get_detail_page_cache()
         
         self.session.headers.update({
-            'User-Agent': random.choice(user_agents),
+            'User-Agent': random.choice(USER_AGENTS),
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
             'Accept-Language': 'en-US,en;q=0.9,zh-TW;q=0.8,zh;q=0.7',
             'Accept-Encoding': 'gzip, deflate, br',
@@ -39,23 +118,26 @@ class BeautifulSoupScraper(BaseScraper):
             'Cache-Control': 'max-age=0',
         })
     
+    def _archive_page(self, url: str, content: bytes):
+        """保存抓取到的頁面到歸檔（失敗不影響爬取）"""
+        try:
+            self.archive.store(url, content, page_kind(url))
+        except Exception as e:
+            print(f"保存頁面歸檔失敗: {url} {e}")
+    
     def get_page(self, url: str) -> Optional[BeautifulSoup]:
         """獲取頁面內容"""
         try:
             print(f"正在獲取頁面: {url}")
             
-            # 增加隨機延遲
-            delay = random.uniform(3, 8)
-            print(f"等待 {delay:.1f} 秒...")
-            self.add_delay(delay, delay + 1)
+            # 按主機限速（與異步抓取共用同一限速器）
+            delay = host_limiter.reserve(urlparse(url).netloc)
+            if delay > 0:
+                print(f"等待 {delay:.1f} 秒...")
+                time.sleep(delay)
             
             # 隨機更新 User-Agent
-            user_agents = [
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
-                'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            ]
-            self.session.headers['User-Agent'] = random.choice(user_agents)
+            self.session.headers['User-Agent'] = random.choice(USER_AGENTS)
             
             # 添加 Referer
             if 'amazon.com' in url:
@@ -69,6 +151,9 @@ class BeautifulSoupScraper(BaseScraper):
                 print("檢測到驗證頁面，跳過此 URL")
                 return None
             
+            if self.archive is not None:
+                self._archive_page(url, response.content)
+            
             soup = BeautifulSoup(response.content, 'html.parser')
             print(f"成功獲取頁面，內容長度: {len(response.content)} 字節")
             return soup
@@ -163,15 +248,17 @@ class BeautifulSoupScraper(BaseScraper):
     
     def scrape_product_detail(self, product_url: str) -> Dict[str, Any]:
         """爬取商品詳情頁面的完整信息"""
+        print(f"正在獲取商品詳情頁面: {product_url}")
+        soup = self.get_page(product_url)
+        if not soup:
+            return {}
+        return self.parse_product_detail(soup)
+    
+    def parse_product_detail(self, soup: BeautifulSoup) -> Dict[str, Any]:
+        """從商品詳情頁面中提取完整信息"""
         detail_info = {}
         
         try:
-            print(f"正在獲取商品詳情頁面: {product_url}")
-            soup = self.get_page(product_url)
-            
-            if not soup:
-                return detail_info
-            
             # 1. 分類路徑 (Breadcrumbs)
             breadcrumbs = []
             breadcrumb_selectors = [
@@ -387,80 +474,302 @@ class BeautifulSoupScraper(BaseScraper):
                         break
             
         except Exception as e:
-            print(f"爬取商品詳情時發生錯誤: {e}")
+            print(f"解析商品詳情時發生錯誤: {e}")
         
         return detail_info
     
-    def scrape_products(self, search_terms: List[str], fetch_details: bool = True) -> List[Dict[str, Any]]:
-        """爬取商品信息
+    def _find_product_containers(self, soup: BeautifulSoup) -> list:
+        """尋找搜索結果頁面中的商品容器 - 嘗試多種選擇器"""
+        product_containers = soup.select('[data-component-type="s-search-result"]')
+        if not product_containers:
+            # 嘗試其他可能的選擇器
+            product_containers = soup.select('.s-result-item')
+        if not product_containers:
+            product_containers = soup.select('[data-asin]')
+        
+        print(f"找到 {len(product_containers)} 個商品容器")
+        
+        # 調試：檢查頁面內容
+        if len(product_containers) == 0:
+            print("未找到商品容器，檢查頁面內容...")
+            # 檢查是否有驗證頁面
+            if soup.find('title') and 'captcha' in soup.find('title').get_text().lower():
+                print("檢測到驗證頁面")
+            # 檢查是否有搜索結果
+            search_results = soup.find('div', {'id': 'search'})
+            if search_results:
+                print(f"搜索結果區域存在，內容長度: {len(search_results.get_text())}")
+            else:
+                print("未找到搜索結果區域")
+        
+        return product_containers
+    
+    def parse_search_page(self, content: bytes, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """解析搜索結果頁面，返回有名稱的商品（limit 限制處理的商品容器數）
+        
+        優先使用配置的解析後端；解析失敗或未找到商品時回退到 BeautifulSoup
+        """
+        product_infos = []
+        if self.parser is not None:
+            try:
+                product_infos = self.parser.parse_search(content, limit)
+            except Exception as e:
+                print(f"解析搜索頁面失敗，回退到 BeautifulSoup: {e}")
+                product_infos = []
+            for product_info in product_infos:
+                if 'name' in product_info:
+                    features = self.extract_product_features(product_info['name'])
+                    product_info['description'] = self.create_description(product_info['name'], features)
+        
+        if not product_infos:
+            soup = BeautifulSoup(content, 'html.parser')
+            product_containers = self._find_product_containers(soup)
+            product_containers = product_containers[:limit]
+            for i, container in enumerate(product_containers):
+                print(f"處理商品 {i+1}/{len(product_containers)}")
+                product_infos.append(self.extract_product_info(container))
+        
+        return [product_info for product_info in product_infos if product_info.get('name')]
+    
+    def parse_detail_page(self, content: bytes) -> Dict[str, Any]:
+        """解析商品詳情頁面（解析後端失敗時回退到 BeautifulSoup）"""
+        if self.parser is not None:
+            try:
+                return self.parser.parse_detail(content)
+            except Exception as e:
+                print(f"解析商品詳情失敗，回退到 BeautifulSoup: {e}")
+        return self.parse_product_detail(BeautifulSoup(content, 'html.parser'))
+    
+    async def _fetch(
+        self,
+        fetcher: AsyncFetcher,
+        url: str,
+        headers: Optional[Dict[str, str]] = None
+    ) -> Optional[FetchResult]:
+        """異步獲取頁面（新內容會寫入歸檔）"""
+        result = await fetcher.fetch(url, headers={'User-Agent': random.choice(USER_AGENTS), **(headers or {})})
+        if result is not None and result.status != 304 and self.archive is not None:
+            await asyncio.to_thread(self._archive_page, url, result.content)
+        return result
+    
+    async def _fetch_content(self, fetcher: AsyncFetcher, url: str) -> Optional[bytes]:
+        """異步獲取頁面內容"""
+        result = await self._fetch(fetcher, url)
+        return result.content if result is not None else None
+    
+    async def _fetch_detail_content(self, fetcher: AsyncFetcher, url: str) -> Optional[bytes]:
+        """獲取詳情頁面內容，優先使用 HTTP 緩存"""
+        cache = self.detail_cache
+        cached = await asyncio.to_thread(cache.get, url) if cache is not None else None
+        if cached is not None and cached.is_fresh(cache.max_age_seconds):
+            print(f"詳情頁面緩存命中: {cached.key}")
+            return cached.content
+        
+        result = await self._fetch(fetcher, url, cached.validators() if cached is not None else None)
+        if result is None:
+            return None
+        if result.status == 304 and cached is not None:
+            print(f"詳情頁面未修改，沿用緩存: {cached.key}")
+            await asyncio.to_thread(cache.revalidated, cached, result.etag, result.last_modified)
+            return cached.content
+        if cache is not None and result.content:
+            await asyncio.to_thread(cache.put, url, result.content, result.etag, result.last_modified)
+        return result.content
+    
+    async def _fetch_detail(
+        self,
+        fetcher: AsyncFetcher,
+        product_info: Dict[str, Any],
+        should_stop: Optional[Callable[[], bool]]
+    ) -> bool:
+        """獲取詳情頁面並合併到搜索結果信息（詳情頁面的信息優先），返回是否成功獲取"""
+        if should_stop and should_stop():
+            return False
+        product_url = product_info['product_url']
+        try:
+            print(f"正在獲取商品詳情頁面: {product_url}")
+            content = await self._fetch_detail_content(fetcher, product_url)
+            if not content:
+                return False
+            product_info.update(self.parse_detail_page(content))
+            # 保留原始的商品URL
+            product_info['product_url'] = product_url
+            return True
+        except Exception as e:
+            print(f"獲取商品詳情失敗: {e}")
+            # 即使詳情獲取失敗，仍保留搜索結果的基本信息
+            return False
+    
+    async def _fetch_search_page(
+        self,
+        fetcher: AsyncFetcher,
+        search_term: str,
+        page: int,
+        should_stop: Optional[Callable[[], bool]]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """獲取並解析一頁搜索結果，獲取失敗或已停止時返回 None"""
+        if should_stop and should_stop():
+            return None
+        content = await self._fetch_content(fetcher, search_url_for(search_term, page))
+        if not content:
+            return None
+        products = self.parse_search_page(content)
+        print(f"關鍵詞 {search_term} 第 {page} 頁解析到 {len(products)} 個商品")
+        return products
+    
+    async def _crawl_search_pages(
+        self,
+        fetcher: AsyncFetcher,
+        search_term: str,
+        quota: int,
+        should_stop: Optional[Callable[[], bool]]
+    ) -> List[Dict[str, Any]]:
+        """按頁爬取搜索結果直到達到配額
+        
+        先獲取第一頁確定每頁商品數，再並發獲取還需要的頁面；按頁碼順序累計，
+        配額一滿就取消尚未完成的頁面。某頁獲取失敗或沒有商品時視為沒有更多結果。
+        """
+        if quota <= 0:
+            return []
+        first = await self._fetch_search_page(fetcher, search_term, 1, should_stop)
+        if not first:
+            return []
+        
+        pages = [first]
+        per_page = len(first)
+        next_page = 2
+        exhausted = False
+        max_pages = max(1, settings.scrape_max_search_pages)
+        while not exhausted and next_page <= max_pages and len(merge_search_pages(pages, quota)) < quota:
+            missing = quota - len(merge_search_pages(pages, quota))
+            batch = range(next_page, min(next_page + -(-missing // per_page), max_pages + 1))
+            tasks = [
+                asyncio.create_task(self._fetch_search_page(fetcher, search_term, page, should_stop))
+                for page in batch
+            ]
+            try:
+                for task in tasks:
+                    products = await task
+                    if not products:
+                        exhausted = True
+                        break
+                    pages.append(products)
+                    if len(merge_search_pages(pages, quota)) >= quota:
+                        break
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+            next_page = batch.stop
+        
+        products = merge_search_pages(pages, quota)
+        print(f"關鍵詞 {search_term} 共獲取 {len(pages)} 頁，{len(products)} 個商品（配額 {quota}）")
+        return products
+    
+    async def _scrape_search_term(
+        self,
+        fetcher: AsyncFetcher,
+        search_term: str,
+        fetch_details: bool,
+        should_stop: Optional[Callable[[], bool]],
+        frontier: Optional[CrawlFrontier] = None,
+        quota: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """爬取單個關鍵詞：搜索結果頁面（直到配額）+ 並發獲取詳情頁面（有前沿記錄時從記錄恢復）"""
+        if should_stop and should_stop():
+            return []
+        
+        state = await asyncio.to_thread(frontier.term_state, search_term) if frontier is not None else None
+        if state is not None and state.done:
+            print(f"關鍵詞 {search_term} 已完成，跳過")
+            return state.products
+        
+        if state is not None:
+            products, pending = state.products, state.pending
+            print(f"恢復關鍵詞 {search_term}：{len(products)} 個商品，{len(pending)} 個詳情頁面待獲取")
+        else:
+            # 只有配額內的商品會獲取詳情頁面
+            quota = settings.max_products_per_search if quota is None else quota
+            products = await self._crawl_search_pages(fetcher, search_term, quota, should_stop)
+            if not products:
+                return []
+            if frontier is not None:
+                products = await asyncio.to_thread(frontier.record_search, search_term, products, fetch_details)
+                # 待獲取詳情的商品以前沿記錄的狀態為準（沒有 URL 的商品可能已經寫入）
+                state = await asyncio.to_thread(frontier.term_state, search_term)
+                pending = state.pending if state is not None else set()
+            else:
+                pending = {
+                    index for index, product_info in enumerate(products)
+                    if fetch_details and product_info.get('product_url')
+                }
+        
+        async def complete(index: int):
+            product_info = products[index]
+            if await self._fetch_detail(fetcher, product_info, should_stop) and frontier is not None:
+                await asyncio.to_thread(frontier.product_done, search_term, index, product_info)
+        
+        # 詳情頁面並發獲取，並發數與按主機限速由 fetcher 控制；結果直接合併到 products，順序不變
+        await asyncio.gather(*[complete(index) for index in sorted(pending)])
+        
+        if frontier is not None and not (should_stop and should_stop()):
+            await asyncio.to_thread(frontier.term_done, search_term)
+        return products
+    
+    async def scrape_products_async(
+        self,
+        search_terms: List[str],
+        fetch_details: bool = True,
+        should_stop: Optional[Callable[[], bool]] = None,
+        frontier: Optional[CrawlFrontier] = None,
+        max_products_per_term: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """異步爬取商品信息（各關鍵詞及其詳情頁面並發進行）
         
         Args:
             search_terms: 搜索關鍵詞列表
             fetch_details: 是否訪問詳情頁面獲取完整信息（預設 True）
+            should_stop: 返回 True 時停止爬取（後台任務取消），在每個請求前檢查
+            frontier: 爬取前沿，增量保存進度並在恢復時跳過已完成的工作
+            max_products_per_term: 每個關鍵詞最多獲取的商品數（預設 settings.max_products_per_search），
+                搜索結果按頁獲取直到達到此數量
         """
-        all_products = []
-        
-        for search_term in search_terms:
-            search_url = f"https://www.amazon.com/s?k={search_term.replace(' ', '+')}"
-            soup = self.get_page(search_url)
-            
-            if not soup:
-                continue
-            
-            # 尋找商品容器 - 嘗試多種選擇器
-            product_containers = soup.select('[data-component-type="s-search-result"]')
-            if not product_containers:
-                # 嘗試其他可能的選擇器
-                product_containers = soup.select('.s-result-item')
-            if not product_containers:
-                product_containers = soup.select('[data-asin]')
-            
-            print(f"找到 {len(product_containers)} 個商品容器")
-            
-            # 調試：檢查頁面內容
-            if len(product_containers) == 0:
-                print("未找到商品容器，檢查頁面內容...")
-                # 檢查是否有驗證頁面
-                if soup.find('title') and 'captcha' in soup.find('title').get_text().lower():
-                    print("檢測到驗證頁面")
-                # 檢查是否有搜索結果
-                search_results = soup.find('div', {'id': 'search'})
-                if search_results:
-                    print(f"搜索結果區域存在，內容長度: {len(search_results.get_text())}")
-                else:
-                    print("未找到搜索結果區域")
-            
-            for i, container in enumerate(product_containers[:10]):  # 限制處理前10個（詳情頁面會增加請求）
-                print(f"處理商品 {i+1}/{min(10, len(product_containers))}")
-                product_info = self.extract_product_info(container)
-                
-                if product_info.get('name'):
-                    # 如果需要獲取詳情，且有商品URL，則訪問詳情頁面
-                    if fetch_details and product_info.get('product_url'):
-                        try:
-                            detail_info = self.scrape_product_detail(product_info['product_url'])
-                            # 合併詳情信息（詳情頁面的信息優先）
-                            product_info.update(detail_info)
-                            # 保留原始的商品URL
-                            product_info['product_url'] = product_info.get('product_url')
-                            self.add_delay(2, 4)  # 詳情頁面請求後延遲
-                        except Exception as e:
-                            print(f"獲取商品詳情失敗: {e}")
-                            # 即使詳情獲取失敗，仍保留搜索結果的基本信息
-                    
-                    all_products.append(product_info)
-            
-            self.add_delay(3, 6)  # 添加延遲避免被封鎖
-        
-        return all_products
+        headers = dict(self.session.headers)
+        headers['Accept-Encoding'] = 'gzip, deflate'  # aiohttp 未安裝 brotli 時無法解碼 br
+        headers['Referer'] = 'https://www.amazon.com/'
+        async with AsyncFetcher(headers=headers) as fetcher:
+            results = await asyncio.gather(*[
+                self._scrape_search_term(
+                    fetcher, search_term, fetch_details, should_stop, frontier, max_products_per_term
+                )
+                for search_term in search_terms
+            ])
+        return [product for products in results for product in products]
+    
+    def scrape_products(
+        self,
+        search_terms: List[str],
+        fetch_details: bool = True,
+        should_stop: Optional[Callable[[], bool]] = None,
+        frontier: Optional[CrawlFrontier] = None,
+        max_products_per_term: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """爬取商品信息（同步入口，在後台任務線程或腳本中調用）"""
+        return asyncio.run(self.scrape_products_async(
+            search_terms, fetch_details, should_stop, frontier, max_products_per_term
+        ))
     
     def scrape_categories(self) -> List[Dict[str, Any]]:
         """爬取分類信息"""
-        soup = self.get_page("https://www.amazon.com/")
+        soup = self.get_page(HOMEPAGE_URL)
         
         if not soup:
             return []
         
+        return self.parse_categories(soup)
+    
+    def parse_categories(self, soup: BeautifulSoup) -> List[Dict[str, Any]]:
+        """從首頁中提取分類信息"""
         categories = []
         
         # 尋找分類鏈接
@@ -499,3 +808,87 @@ class BeautifulSoupScraper(BaseScraper):
                 unique_categories.append(cat)
         
         return unique_categories[:20]  # 限制返回前20個分類
+    
+    def _open_archive(self) -> HtmlArchive:
+        # 重放不要求啟用歸檔寫入，直接讀取歸檔目錄
+        return self.archive or HtmlArchive(settings.html_archive_dir)
+    
+    def replay_archive(
+        self,
+        search_terms: Optional[List[str]] = None,
+        fetch_details: bool = True,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        workers: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """對歸檔的 HTML 重新解析（不訪問網絡），返回與 scrape_products 相同格式的結果
+        
+        每個 URL 使用時間範圍內最後一次抓取的頁面，解析在多個進程中並行進行。
+        
+        Args:
+            search_terms: 只重放這些關鍵詞的搜索頁面（None 表示全部）
+            fetch_details: 是否合併歸檔中的詳情頁面
+            since / until: 抓取時間範圍
+            workers: 進程數（預設為 CPU 核數）
+        """
+        archive = self._open_archive()
+        # 按關鍵詞（第一頁 URL）分組，每組按頁碼排序
+        term_pages: Dict[str, List[Dict[str, Any]]] = {}
+        for url, record in archive.latest_by_url('search', since, until).items():
+            base_url, page = split_search_page(url)
+            term_pages.setdefault(base_url, []).append({**record, 'page': page})
+        if search_terms is not None:
+            selected = {}
+            for search_term in search_terms:
+                url = search_url_for(search_term)
+                if url in term_pages:
+                    selected[url] = term_pages[url]
+                else:
+                    print(f"歸檔中沒有關鍵詞 {search_term} 的搜索頁面")
+            term_pages = selected
+        search_records = [
+            record for records in term_pages.values() for record in sorted(records, key=lambda r: r['page'])
+        ]
+        detail_records = archive.latest_by_url('detail', since, until) if fetch_details else {}
+        print(f"重放 {len(term_pages)} 個關鍵詞的 {len(search_records)} 個搜索頁面（歸檔中有 {len(detail_records)} 個詳情頁面）")
+        
+        root = str(archive.root)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_replay_worker) as pool:
+            page_results = list(pool.map(_replay_parse, [(root, record) for record in search_records]))
+            all_products = []
+            offset = 0
+            for records in term_pages.values():
+                pages = page_results[offset:offset + len(records)]
+                offset += len(records)
+                all_products.extend(merge_search_pages(pages, settings.max_products_per_search))
+            
+            detail_urls = list(dict.fromkeys(
+                product['product_url'] for product in all_products
+                if product.get('product_url') in detail_records
+            ))
+            details = dict(zip(
+                detail_urls,
+                pool.map(_replay_parse, [(root, detail_records[url]) for url in detail_urls], chunksize=4)
+            ))
+        
+        for product_info in all_products:
+            product_url = product_info.get('product_url')
+            if product_url in details:
+                # 合併詳情信息（詳情頁面的信息優先），保留原始的商品URL
+                product_info.update(details[product_url])
+                product_info['product_url'] = product_url
+        
+        print(f"重放得到 {len(all_products)} 個商品，合併 {len(details)} 個詳情頁面")
+        return all_products
+    
+    def replay_categories(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """從歸檔的首頁重新提取分類信息"""
+        archive = self._open_archive()
+        record = archive.latest_by_url('page', since, until).get(HOMEPAGE_URL)
+        if record is None:
+            return []
+        return self.parse_categories(BeautifulSoup(archive.load(record), 'html.parser'))
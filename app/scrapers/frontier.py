@@ -0,0 +1,46 @@
+"""
+爬取前沿（checkpoint）接口
+爬蟲在解析出搜索結果、完成詳情頁面、完成關鍵詞時通知前沿；
+持久化實現（app/services/crawl_checkpoint.py）據此增量保存進度並分批寫入數據庫，
+中斷後按 run_id 恢復時跳過已完成的工作。
+
+回調都是同步的，爬蟲通過 asyncio.to_thread 調用，實現需要線程安全。
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Set
+
+
+class TermState:
+    """關鍵詞已保存的進度"""
+
+    __slots__ = ("products", "pending", "done")
+
+    def __init__(self, products: List[Dict[str, Any]], pending: Set[int], done: bool):
+        self.products = products  # 搜索結果（已完成詳情的商品已合併詳情信息）
+        self.pending = pending    # 尚未獲取詳情頁面的商品下標
+        self.done = done
+
+
+class CrawlFrontier(ABC):
+    """爬取前沿接口"""
+
+    @abstractmethod
+    def term_state(self, term: str) -> Optional[TermState]:
+        """關鍵詞的已保存進度，沒有記錄時返回 None"""
+        ...
+
+    @abstractmethod
+    def record_search(self, term: str, products: List[Dict[str, Any]], fetch_details: bool) -> List[Dict[str, Any]]:
+        """保存搜索結果，返回需要繼續處理的商品（可能按剩餘配額截斷）"""
+        ...
+
+    @abstractmethod
+    def product_done(self, term: str, index: int, product_info: Dict[str, Any]) -> None:
+        """商品的詳情頁面已獲取並合併"""
+        ...
+
+    @abstractmethod
+    def term_done(self, term: str) -> None:
+        """關鍵詞處理完成（詳情獲取失敗的商品以搜索結果信息為準）"""
+        ...
@@ -0,0 +1,148 @@
+"""
+原始 HTML 歸檔
+每個抓取到的頁面按內容的 SHA-256 壓縮保存一次（相同內容只存一份），
+索引按天寫入 JSONL，每行記錄 URL、抓取時間、內容哈希和頁面類型：
+
+    {root}/objects/ab/abcdef....html.zst   （未安裝 zstandard 時為 .html.gz）
+    {root}/index/20260101.jsonl
+
+修改選擇器後可以對歸檔重新解析（BeautifulSoupScraper.replay_archive），不需要重新爬取。
+歸檔不會自動清理，默認關閉（settings.html_archive_enabled）。
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from app.config import settings
+
+# zstandard 為可選依賴，未安裝時使用 gzip
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+
+def _compress_zstd(content: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=10).compress(content)
+
+
+def _decompress_zstd(data: bytes) -> bytes:
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+def _compress_gzip(content: bytes) -> bytes:
+    return gzip.compress(content, compresslevel=6)
+
+
+# codec -> (文件後綴, 壓縮, 解壓)
+CODECS = {
+    "zstd": (".html.zst", _compress_zstd, _decompress_zstd),
+    "gzip": (".html.gz", _compress_gzip, gzip.decompress),
+}
+
+
+def _default_codec() -> str:
+    codec = settings.html_archive_codec
+    if codec == "zstd" and not ZSTD_AVAILABLE:
+        return "gzip"
+    return codec if codec in CODECS else "gzip"
+
+
+class HtmlArchive:
+    """內容尋址的壓縮 HTML 歸檔（線程安全）"""
+
+    def __init__(self, root: str, codec: Optional[str] = None):
+        self.root = Path(root)
+        self.codec = codec or _default_codec()
+        self._lock = threading.Lock()
+
+    def _object_path(self, sha256: str, codec: str) -> Path:
+        return self.root / "objects" / sha256[:2] / f"{sha256}{CODECS[codec][0]}"
+
+    def store(self, url: str, content: bytes, kind: str, fetched_at: Optional[datetime] = None) -> Dict[str, Any]:
+        """保存頁面並追加索引記錄，返回索引記錄"""
+        fetched_at = fetched_at or datetime.now(timezone.utc)
+        sha256 = hashlib.sha256(content).hexdigest()
+        path = self._object_path(sha256, self.codec)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(CODECS[self.codec][1](content))
+            tmp_path.replace(path)
+
+        record = {
+            "url": url,
+            "fetched_at": fetched_at.isoformat(),
+            "sha256": sha256,
+            "codec": self.codec,
+            "kind": kind,
+            "size": len(content),
+        }
+        index_path = self.root / "index" / f"{fetched_at.strftime('%Y%m%d')}.jsonl"
+        with self._lock:
+            index_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return record
+
+    def load(self, record: Dict[str, Any]) -> bytes:
+        """讀取索引記錄對應的原始 HTML"""
+        codec = record.get("codec", "gzip")
+        return CODECS[codec][2](self._object_path(record["sha256"], codec).read_bytes())
+
+    def iter_records(
+        self,
+        kind: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """按抓取時間順序遍歷索引記錄"""
+        index_dir = self.root / "index"
+        if not index_dir.exists():
+            return
+        for index_path in sorted(index_dir.glob("*.jsonl")):
+            with open(index_path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if kind and record.get("kind") != kind:
+                        continue
+                    fetched_at = datetime.fromisoformat(record["fetched_at"])
+                    if since and fetched_at < since:
+                        continue
+                    if until and fetched_at > until:
+                        continue
+                    yield record
+
+    def latest_by_url(
+        self,
+        kind: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """每個 URL 在時間範圍內最後一次抓取的記錄"""
+        latest: Dict[str, Dict[str, Any]] = {}
+        for record in self.iter_records(kind, since, until):
+            latest[record["url"]] = record
+        return latest
+
+
+_archive: Optional[HtmlArchive] = None
+
+
+def get_html_archive() -> Optional[HtmlArchive]:
+    """進程共用的歸檔實例，未啟用時返回 None"""
+    global _archive
+    if not settings.html_archive_enabled:
+        return None
+    if _archive is None:
+        _archive = HtmlArchive(settings.html_archive_dir)
+    return _archive
@@ -0,0 +1,390 @@
+"""
+HTML 解析後端
+搜索結果頁面和商品詳情頁面的字段提取，與 BeautifulSoupScraper.extract_product_info /
+parse_product_detail 的規則一一對應（選擇器順序、命中即停止的規則相同）：
+- LxmlPageParser：lxml + 預編譯 XPath，每個商品容器只遍歷一次文本節點
+- BeautifulSoup（settings.scrape_parser = "beautifulsoup"）：原有實現，同時作為 lxml 解析失敗時的回退
+
+返回的是原始字段，description 等派生字段由爬蟲補充。
+"""
+
+import re
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Optional
+
+import lxml.html
+from bs4 import UnicodeDammit
+from lxml import etree
+
+
+# BeautifulSoup get_text() 不包含這些標籤內的文本（html.parser 的 string_containers）
+_NON_TEXT_TAGS = frozenset({"script", "style", "template", "rt", "rp"})
+
+
+def _cls(name: str) -> str:
+    """CSS .class 對應的 XPath 條件"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def _xpath(expr: str) -> etree.XPath:
+    return etree.XPath(expr)
+
+
+def _strings(el) -> Iterator[str]:
+    """按文檔順序遍歷元素內的文本（不含註釋和腳本、樣式，與 get_text() 一致）"""
+    if not isinstance(el.tag, str) or el.tag in _NON_TEXT_TAGS:
+        return
+    if el.text:
+        yield el.text
+    for child in el:
+        yield from _strings(child)
+        if child.tail:
+            yield child.tail
+
+
+def _text(el) -> str:
+    """等同於 get_text()"""
+    return "".join(_strings(el))
+
+
+def _text_strip(el) -> str:
+    """等同於 get_text(strip=True)"""
+    return "".join(s.strip() for s in _strings(el))
+
+
+def _single_string(el) -> Optional[str]:
+    """等同於 Tag.string：只有一個子節點且為文本時返回該文本（沿單一子元素向下）"""
+    while True:
+        if len(el) == 0:
+            return el.text or None
+        if len(el) > 1 or el.text or el[0].tail or not isinstance(el[0].tag, str):
+            return None
+        el = el[0]
+
+
+# ---- 搜索結果頁面 ----
+
+_SEARCH_CONTAINERS = [
+    _xpath('//*[@data-component-type="s-search-result"]'),
+    _xpath(f"//*[{_cls('s-result-item')}]"),
+    _xpath("//*[@data-asin]"),
+]
+_CONTAINER_NAME = _xpath("(((.//h2)[1]//a)[1]//span)[1]")
+_CONTAINER_HEADINGS = _xpath(".//*[self::h2 or self::h3]")
+_CONTAINER_IMAGE = _xpath("(.//img)[1]")
+_CONTAINER_LINK = _xpath("(.//a[contains(@href, '/dp/') or contains(@href, '/gp/product/')])[1]")
+
+_PRICE_IN_TEXT = re.compile(r"\$[\d,]+\.?\d*")
+_RATING_IN_TEXT = re.compile(r"(\d+\.\d+)")
+_REVIEWS_IN_TEXT = re.compile(r"\(\d+\)")
+
+# ---- 商品詳情頁面 ----
+
+_BREADCRUMBS = [
+    _xpath(f'//*[@id="wayfinding-breadcrumbs_feature_div"]//ul[{_cls("a-unordered-list")}]//li//span'),
+    _xpath(f"//*[{_cls('a-breadcrumb')}]//li//span//a"),
+    _xpath('//*[@id="wayfinding-breadcrumbs"]//li//span'),
+    _xpath("//*[contains(@aria-label, 'breadcrumb')]//a"),
+]
+_TITLES = [
+    _xpath('(//*[@id="productTitle"])[1]'),
+    _xpath(f"(//h1[{_cls('a-size-large')}])[1]"),
+    _xpath('(//span[@id="productTitle"])[1]'),
+    _xpath(f"(//h1[{_cls('a-product-title')}])[1]"),
+]
+_RATINGS = [
+    _xpath('(//*[@data-hook="rating-out-of-text"])[1]'),
+    _xpath(f"(//span[{_cls('a-icon-alt')}])[1]"),
+    _xpath('(//*[@id="acrPopover"]//span)[1]'),
+    _xpath(f"(//*[{_cls('a-icon-alt')}])[1]"),
+]
+_REVIEW_COUNTS = [
+    _xpath('(//*[@id="acrCustomerReviewText"])[1]'),
+    _xpath('(//*[@id="acrCustomerReviewLink"])[1]'),
+    _xpath('(//*[@data-hook="total-review-count"])[1]'),
+    _xpath("(//a[contains(@href, '#customerReviews')])[1]"),
+]
+_PRICES = [
+    _xpath(f"(//*[{_cls('a-price-whole')}])[1]"),
+    _xpath('(//*[@id="priceblock_ourprice"])[1]'),
+    _xpath('(//*[@id="priceblock_dealprice"])[1]'),
+    _xpath(f"(//*[{_cls('a-price')}]//*[{_cls('a-offscreen')}])[1]"),
+    _xpath(f"(//span[{_cls('a-price-whole')}])[1]"),
+    _xpath(f"(//*[{_cls('a-color-price')}])[1]"),
+]
+_COLORS = [
+    _xpath('//*[@id="variation_color_name"]//ul//li'),
+    _xpath(f'//*[@id="color_name_0"]//*[{_cls("a-button-inner")}]'),
+    _xpath(f'//*[@data-csa-c-content-id="twister"]//*[{_cls("a-button-inner")}]'),
+    _xpath(f"//*[{_cls('swatchElement')}]//span[@data-asin]"),
+]
+_COLOR_NAME = _xpath(f"(.//*[self::span or (self::img and @alt) or {_cls('a-button-text')}])[1]")
+_SIZES = [
+    _xpath('//*[@id="variation_size_name"]//select//option'),
+    _xpath(f'//*[@id="size_name_0"]//*[{_cls("a-button-text")}]'),
+    _xpath(f'//*[@data-csa-c-content-id="twister_size_name"]//*[{_cls("a-button-text")}]'),
+    _xpath("//select[contains(@name, 'size')]//option"),
+]
+_DETAIL_ROWS = _xpath(f'//*[@id="productDetails_detailBullets_sections1"]//tr | //*[{_cls("prodDetTable")}]//tr')
+_ROW_TH = _xpath("(.//th)[1]")
+_ROW_TD = _xpath("(.//td)[1]")
+_DETAIL_SECTIONS = _xpath(
+    f'//*[@id="feature-bullets"]//ul//li//span[{_cls("a-list-item")}] | //*[@id="productDescription"]//p'
+)
+_ABOUT_SECTIONS = [
+    _xpath('(//*[@id="feature-bullets"])[1]'),
+    _xpath('(//*[@id="productDescription"])[1]'),
+    _xpath('(//*[@data-feature-name="productDescription"])[1]'),
+    _xpath(f"(//*[{_cls('a-section')} and {_cls('a-spacing-medium')}])[1]"),
+]
+_ABOUT_ITEMS = _xpath(".//li//span | .//p")
+_IMAGES = [
+    _xpath('(//*[@id="landingImage"])[1]'),
+    _xpath('(//*[@id="main-image"])[1]'),
+    _xpath("(//*[@data-main-image])[1]"),
+    _xpath("(//img[@data-a-dynamic-image])[1]"),
+]
+
+_RATING_OUT_OF = re.compile(r"(\d+\.?\d*)\s*out of 5", re.I)
+_DIGITS = re.compile(r"([\d,]+)")
+_BOUGHT = re.compile(r"([\d,]+[KMBkkmb]?\+?)\s*bought in past month", re.I)
+_PRICE_VALUE = re.compile(r"\$?([\d,]+\.?\d*)")
+_COLOR_PRICE = re.compile(r"\$([\d,]+\.?\d*)")
+
+
+def _first(xpath: etree.XPath, node):
+    found = xpath(node)
+    return found[0] if found else None
+
+
+class PageParser(ABC):
+    """頁面解析後端接口"""
+
+    @abstractmethod
+    def parse_search(self, content: bytes, limit: Optional[int]) -> List[Dict[str, Any]]:
+        """解析搜索結果頁面，返回前 limit 個商品容器的字段（None 表示全部；沒有商品容器時返回空列表）"""
+        ...
+
+    @abstractmethod
+    def parse_detail(self, content: bytes) -> Dict[str, Any]:
+        """解析商品詳情頁面"""
+        ...
+
+
+class LxmlPageParser(PageParser):
+    """lxml + 預編譯 XPath"""
+
+    def _document(self, content: bytes):
+        # 與 BeautifulSoup 相同的編碼識別（lxml 在沒有 charset 聲明時按 latin-1 解碼）
+        markup = UnicodeDammit(content, is_html=True).unicode_markup
+        return lxml.html.document_fromstring(markup)
+
+    def parse_search(self, content: bytes, limit: Optional[int]) -> List[Dict[str, Any]]:
+        doc = self._document(content)
+        containers = []
+        for xpath in _SEARCH_CONTAINERS:
+            containers = xpath(doc)
+            if containers:
+                break
+        return [self._parse_container(container) for container in containers[:limit]]
+
+    def _parse_container(self, container) -> Dict[str, Any]:
+        product_info: Dict[str, Any] = {}
+
+        name_el = _first(_CONTAINER_NAME, container)
+        if name_el is not None:
+            product_info["name"] = _text_strip(name_el)
+        else:
+            for heading in _CONTAINER_HEADINGS(container):
+                if _single_string(heading) is None:
+                    continue
+                text = _text_strip(heading)
+                if text and len(text) > 10 and "Featured" not in text:
+                    product_info["name"] = text
+                    break
+
+        # 價格、評分、評論數：只遍歷一次只含單個文本的 span
+        for span in container.iter("span"):
+            string = _single_string(span)
+            if string is None:
+                continue
+            text = string.strip()
+            if "price" not in product_info and "$" in text and any(c.isdigit() for c in text):
+                product_info["price"] = text
+            if "rating" not in product_info and "out of 5 stars" in text:
+                rating_match = _RATING_IN_TEXT.search(text)
+                if rating_match:
+                    product_info["rating"] = float(rating_match.group(1))
+            if "review_count" not in product_info and _REVIEWS_IN_TEXT.search(text):
+                product_info["review_count"] = text
+            if "price" in product_info and "rating" in product_info and "review_count" in product_info:
+                break
+
+        if "price" not in product_info:
+            price_match = _PRICE_IN_TEXT.search(_text(container))
+            if price_match:
+                product_info["price"] = price_match.group()
+
+        img_el = _first(_CONTAINER_IMAGE, container)
+        if img_el is not None:
+            img_src = img_el.get("src") or img_el.get("data-src")
+            if img_src and "amazon" in img_src:
+                product_info["image_url"] = img_src
+
+        link_el = _first(_CONTAINER_LINK, container)
+        if link_el is not None:
+            href = link_el.get("href")
+            product_info["product_url"] = f"https://www.amazon.com{href}" if href.startswith("/") else href
+
+        return product_info
+
+    def parse_detail(self, content: bytes) -> Dict[str, Any]:
+        doc = self._document(content)
+        detail_info: Dict[str, Any] = {}
+
+        # 1. 分類路徑
+        breadcrumbs = []
+        for xpath in _BREADCRUMBS:
+            for link in xpath(doc):
+                text = _text_strip(link)
+                if text and text.lower() != "home":
+                    breadcrumbs.append(text)
+            if breadcrumbs:
+                break
+        if breadcrumbs:
+            detail_info["category_path"] = " > ".join(breadcrumbs)
+
+        # 2. 商品名稱
+        for xpath in _TITLES:
+            title_el = _first(xpath, doc)
+            if title_el is not None:
+                detail_info["name"] = _text_strip(title_el)
+                break
+
+        # 3. 評分和評論數
+        for xpath in _RATINGS:
+            rating_el = _first(xpath, doc)
+            if rating_el is not None:
+                rating_match = _RATING_OUT_OF.search(_text_strip(rating_el))
+                if rating_match:
+                    try:
+                        detail_info["rating"] = float(rating_match.group(1))
+                    except ValueError:
+                        pass
+                break
+
+        for xpath in _REVIEW_COUNTS:
+            review_el = _first(xpath, doc)
+            if review_el is not None:
+                review_match = _DIGITS.search(_text_strip(review_el))
+                if review_match:
+                    detail_info["review_count"] = review_match.group(1)
+                break
+
+        # 4. 過去一個月購買數量
+        bought_match = _BOUGHT.search(_text(doc))
+        if bought_match:
+            detail_info["bought_in_past_month"] = bought_match.group(1)
+
+        # 5. 價格
+        for xpath in _PRICES:
+            price_el = _first(xpath, doc)
+            if price_el is not None:
+                price_match = _PRICE_VALUE.search(_text_strip(price_el))
+                if price_match:
+                    detail_info["price"] = f"${price_match.group(1)}"
+                    break
+
+        # 6. 顏色選項
+        color_options = []
+        for xpath in _COLORS:
+            color_elements = xpath(doc)
+            if not color_elements:
+                continue
+            for color_el in color_elements:
+                color_info = {}
+                color_name_el = _first(_COLOR_NAME, color_el)
+                if color_name_el is not None:
+                    color_name = color_name_el.get("alt") or _text_strip(color_name_el)
+                    if color_name:
+                        color_info["color_name"] = color_name
+                color_price_match = _COLOR_PRICE.search(_text(color_el))
+                if color_price_match:
+                    color_info["color_price"] = f"${color_price_match.group(1)}"
+                if color_info:
+                    color_options.append(color_info)
+            if color_options:
+                break
+        if color_options:
+            detail_info["color_options"] = color_options
+
+        # 7. 尺寸選項
+        size_options = []
+        for xpath in _SIZES:
+            size_elements = xpath(doc)
+            if not size_elements:
+                continue
+            for size_el in size_elements:
+                size_text = _text_strip(size_el)
+                if size_text and size_text.lower() not in ["select", "choose", "size"]:
+                    size_options.append(size_text)
+            if size_options:
+                break
+        if size_options:
+            detail_info["size_options"] = size_options
+
+        # 8. 商品詳情
+        product_details = {}
+        for row in _DETAIL_ROWS(doc):
+            th = _first(_ROW_TH, row)
+            td = _first(_ROW_TD, row)
+            if th is not None and td is not None:
+                key = _text_strip(th)
+                value = _text_strip(td)
+                if key and value:
+                    product_details[key] = value
+        if not product_details:
+            detail_sections = _DETAIL_SECTIONS(doc)
+            if detail_sections:
+                details_text = " | ".join(_text_strip(s) for s in detail_sections[:5])
+                if details_text:
+                    product_details["description"] = details_text
+        if product_details:
+            detail_info["product_details"] = product_details
+
+        # 9. 關於商品的內容
+        about_items = []
+        for xpath in _ABOUT_SECTIONS:
+            about_section = _first(xpath, doc)
+            if about_section is not None:
+                for item in _ABOUT_ITEMS(about_section)[:10]:
+                    text = _text_strip(item)
+                    if text and len(text) > 20:
+                        about_items.append(text)
+                if about_items:
+                    break
+        if about_items:
+            detail_info["about_this_item"] = about_items
+
+        # 10. 圖片URL
+        for xpath in _IMAGES:
+            img_el = _first(xpath, doc)
+            if img_el is not None:
+                img_src = img_el.get("src") or img_el.get("data-src")
+                if img_src:
+                    detail_info["image_url"] = img_src
+                    break
+
+        return detail_info
+
+
+# "beautifulsoup" 不在表中：直接使用爬蟲內置的 BeautifulSoup 實現
+PARSER_BACKENDS = {
+    "lxml": LxmlPageParser,
+}
+
+
+def get_page_parser(name: str) -> Optional[PageParser]:
+    """按名稱創建解析後端，未知名稱或 "beautifulsoup" 返回 None"""
+    parser_cls = PARSER_BACKENDS.get(name)
+    return parser_cls() if parser_cls else None
@@ -0,0 +1,183 @@
+"""
+商品詳情頁面的 HTTP 緩存（磁盤）
+按 ASIN 作為鍵：同一商品在不同關鍵詞、不同 URL 參數下共用一個條目。
+- 新鮮期內（settings.detail_cache_max_age_seconds）直接使用緩存，不發請求也不等待限速
+- 過期後帶 If-None-Match / If-Modified-Since 重新驗證，304 時沿用緩存並刷新時間
+- prune 刪除長時間沒有刷新的條目，並把總大小控制在上限內（數據保留任務定期執行，
+  見 app/services/retention.py）
+
+    {root}/{asin 末兩位}/{asin}.json      元數據（url、fetched_at、etag、last_modified）
+    {root}/{asin 末兩位}/{asin}.html.gz   頁面內容
+"""
+
+import gzip
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+
+
+_ASIN_IN_URL = re.compile(r"/(?:dp|gp/product)/([A-Z0-9]{10})(?:[/?#]|$)", re.I)
+
+
+def product_cache_key(url: str) -> Optional[str]:
+    """商品 URL 對應的緩存鍵（ASIN），不是商品詳情 URL 時返回 None"""
+    match = _ASIN_IN_URL.search(url)
+    return match.group(1).upper() if match else None
+
+
+class CachedPage:
+    """緩存的詳情頁面"""
+
+    __slots__ = ("key", "url", "fetched_at", "etag", "last_modified", "content")
+
+    def __init__(
+        self,
+        key: str,
+        url: str,
+        fetched_at: float,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        content: bytes,
+    ):
+        self.key = key
+        self.url = url
+        self.fetched_at = fetched_at
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content = content
+
+    def is_fresh(self, max_age_seconds: float) -> bool:
+        return time.time() - self.fetched_at < max_age_seconds
+
+    def validators(self) -> Dict[str, str]:
+        """重新驗證用的條件請求頭"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class DetailPageCache:
+    """詳情頁面磁盤緩存（線程安全）"""
+
+    def __init__(self, root: str, max_age_seconds: float):
+        self.root = Path(root)
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+
+    def _paths(self, key: str):
+        directory = self.root / key[-2:]
+        return directory / f"{key}.json", directory / f"{key}.html.gz"
+
+    def _write(self, path: Path, data: bytes) -> None:
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+
+    def _write_meta(self, page: CachedPage) -> None:
+        meta_path, _ = self._paths(page.key)
+        meta = {
+            "url": page.url,
+            "fetched_at": page.fetched_at,
+            "etag": page.etag,
+            "last_modified": page.last_modified,
+        }
+        self._write(meta_path, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        key = product_cache_key(url)
+        if key is None:
+            return None
+        meta_path, body_path = self._paths(key)
+        try:
+            meta = json.loads(meta_path.read_bytes())
+            content = gzip.decompress(body_path.read_bytes())
+        except (OSError, ValueError, EOFError):
+            return None
+        return CachedPage(key, meta["url"], meta["fetched_at"], meta.get("etag"), meta.get("last_modified"), content)
+
+    def put(self, url: str, content: bytes, etag: Optional[str], last_modified: Optional[str]) -> None:
+        key = product_cache_key(url)
+        if key is None:
+            return
+        page = CachedPage(key, url, time.time(), etag, last_modified, content)
+        meta_path, body_path = self._paths(key)
+        with self._lock:
+            meta_path.parent.mkdir(parents=True, exist_ok=True)
+            # 先寫內容再寫元數據：讀取方只在元數據存在時才讀內容
+            self._write(body_path, gzip.compress(content, compresslevel=6))
+            self._write_meta(page)
+
+    def revalidated(self, page: CachedPage, etag: Optional[str], last_modified: Optional[str]) -> None:
+        """304 後刷新抓取時間（服務器返回新的驗證器時一併更新）"""
+        page.fetched_at = time.time()
+        page.etag = etag or page.etag
+        page.last_modified = last_modified or page.last_modified
+        with self._lock:
+            self._write_meta(page)
+
+    def _entries(self) -> List[Tuple[float, int, List[Path]]]:
+        """(最近寫入時間, 大小, 文件)，按時間從舊到新；元數據在寫入和重新驗證時都會重寫，用它的 mtime"""
+        entries = []
+        for body_path in self.root.glob("*/*.html.gz"):
+            key = body_path.name[:-len(".html.gz")]
+            meta_path, _ = self._paths(key)
+            paths = [path for path in (meta_path, body_path) if path.exists()]
+            try:
+                stats = [path.stat() for path in paths]
+            except OSError:
+                continue
+            entries.append((max(stat.st_mtime for stat in stats), sum(stat.st_size for stat in stats), paths))
+        entries.sort(key=lambda entry: entry[0])
+        return entries
+
+    def prune(self, max_age_seconds: float, max_bytes: int, now: Optional[float] = None) -> int:
+        """刪除超過 max_age_seconds 沒有刷新的條目，再從最舊的開始刪除直到總大小不超過 max_bytes
+
+        0 表示不限；返回刪除的條目數
+        """
+        now = now if now is not None else time.time()
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for updated_at, size, paths in entries:
+            expired = max_age_seconds and now - updated_at > max_age_seconds
+            over_budget = max_bytes and total > max_bytes
+            if not (expired or over_budget):
+                break
+            with self._lock:
+                for path in paths:
+                    path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        if removed:
+            print(f"[Detail Cache] 清理 {removed} 個詳情頁面緩存，剩餘 {total} 字節")
+        return removed
+
+
+_cache: Optional[DetailPageCache] = None
+
+
+def get_detail_page_cache() -> Optional[DetailPageCache]:
+    """進程共用的詳情頁面緩存，未啟用時返回 None"""
+    global _cache
+    if not settings.detail_cache_enabled:
+        return None
+    if _cache is None:
+        _cache = DetailPageCache(settings.detail_cache_dir, settings.detail_cache_max_age_seconds)
+    return _cache
+
+
+def prune_detail_cache() -> int:
+    """按 settings 清理詳情頁面緩存（未啟用或目錄不存在時跳過）"""
+    cache = get_detail_page_cache()
+    if cache is None or not cache.root.exists():
+        return 0
+    return cache.prune(settings.detail_cache_retention_seconds, settings.detail_cache_max_bytes)
@@ -6,9 +6,10 @@ AI 分析服务
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 from app.config import settings
-from app.db.mongodb import mongodb
+from app.db.repositories import get_product_repository
+from app.services.product_metrics import parse_price, parse_review_count
+import asyncio
 import json
-import re
 
 # 延迟导入 google.generativeai，避免启动时失败
 try:
@@ -19,30 +20,6 @@ except ImportError as e:
     genai = None
 
 
-def _parse_price(price_str: Optional[str]) -> float:
-    """解析价格字符串为数字"""
-    if not price_str:
-        return 0.0
-    cleaned = re.sub(r'[$,]', '', str(price_str))
-    try:
-        return float(cleaned)
-    except (ValueError, AttributeError):
-        return 0.0
-
-
-def _parse_review_count(review_count_text: Optional[str]) -> Optional[int]:
-    """从 review_count_text 解析评论数"""
-    if not review_count_text:
-        return None
-    numbers = re.findall(r'\d+', review_count_text.replace(',', ''))
-    if numbers:
-        try:
-            return int(numbers[0])
-        except:
-            pass
-    return None
-
-
 def _prepare_product_summary(products: List[Dict]) -> str:
     """准备产品数据摘要，用于 AI 分析"""
     if not products:
@@ -58,11 +35,11 @@ def _prepare_product_summary(products: List[Dict]) -> str:
     categories = []
     
     for product in products:
-        price_str = product.get("price", "")
-        if price_str:
-            price = _parse_price(price_str)
-            if price > 0:
-                prices.append(price)
+        price = product.get("price_value")
+        if price is None:
+            price = parse_price(product.get("price"))
+        if price > 0:
+            prices.append(price)
         
         rating = product.get("rating")
         if rating:
@@ -70,7 +47,7 @@ def _prepare_product_summary(products: List[Dict]) -> str:
         
         review_count = product.get("review_count")
         if review_count is None:
-            review_count = _parse_review_count(product.get("review_count_text"))
+            review_count = parse_review_count(product.get("review_count_text"))
         if review_count:
             review_counts.append(review_count)
         
@@ -179,16 +156,14 @@ async def analyze_with_ai(
         }
     
     # 从 MongoDB 获取产品数据
-    db = mongodb.connect()
-    if db is None:
+    products_repo = get_product_repository()
+    if products_repo is None:
         return {
             "error": "MongoDB not configured",
             "insights": None
         }
     
     try:
-        products_collection = db["products"]
-        
         # 构建查询
         query = {}
         if category:
@@ -197,7 +172,7 @@ async def analyze_with_ai(
             query["platform"] = platform
         
         # 获取产品数据
-        products = list(products_collection.find(query).limit(limit))
+        products = await products_repo.find(query, limit=limit)
         
         if not products:
             return {
@@ -236,7 +211,8 @@ Format your response as a clear, structured analysis with bullet points and spec
 
         # 调用 AI API
         try:
-            response = model.generate_content(prompt)
+            # 同步 SDK 調用放到線程池，避免阻塞事件循環
+            response = await asyncio.to_thread(model.generate_content, prompt)
             ai_insights = response.text
         except Exception as e:
             return {
@@ -258,6 +234,4 @@ Format your response as a clear, structured analysis with bullet points and spec
             "error": f"Analysis failed: {str(e)}",
             "insights": None
         }
-    finally:
-        mongodb.close()
 
@@ -0,0 +1,408 @@
+"""
+分析匯總表（analytics_rollups）
+按平台、平台+分類、批次（run_id）、平台+日期預先聚合產品指標，儀表板端點只需讀取
+O(分組數) 個匯總文檔，而不是每次都掃描整個 products collection。
+
+- 寫入端（bulk_upsert_products_mongodb）和清理端（app/services/retention.py）在修改數據後，
+  只重算受影響的分組（refresh_rollups），通過 $merge 寫回匯總表
+- rebuild_rollups 全量重建（scripts/rebuild_rollups.py，或啟動時尚未建立時自動執行）
+- 讀取端（read_rollups）在匯總表未建立 / 已標記過期 / 被禁用時回退到實時聚合，
+  兩種來源返回相同結構的文檔，並附帶 freshness 指示
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pymongo.errors import PyMongoError
+
+from app.config import settings
+from app.db.mongodb import mongodb
+from app.db.repositories import get_analytics_rollup_repository, get_product_repository
+from app.services.data_quality import quality_accumulators
+from app.services.data_version import bump_data_version
+
+
+ROLLUP_COLLECTION = "analytics_rollups"
+META_ID = "meta:status"
+
+# 匯總維度
+ROLLUP_KINDS = ("platform", "platform_category", "run", "platform_day")
+
+# 價格區間（左閉右開，最後一檔為 200+）
+PRICE_BUCKET_BOUNDARIES = [0, 20, 50, 100, 200]
+PRICE_BUCKET_LABELS = {0: "0-20", 20: "20-50", 50: "50-100", 100: "100-200", "200+": "200+"}
+
+DAY_FORMAT = "%Y-%m-%d"
+
+# 可直接相加的計數字段
+_SUM_FIELDS = ("count", "price_count", "price_sum", "rating_count", "rating_sum", "review_sum")
+
+_PLATFORM_EXPR = {"$ifNull": ["$platform", "unknown"]}
+_HAS_PRICE = {"$gt": ["$price_value", 0]}
+_HAS_RATING = {"$isNumber": "$rating"}
+
+
+def _now() -> datetime:
+    """截斷到毫秒，與 MongoDB 存儲精度一致（否則 refreshed_at 比較會出錯）"""
+    now = datetime.utcnow()
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+def rollup_id(kind: str, *parts: Any) -> str:
+    """匯總文檔的 _id，例如 platform_category:amazon|Shirts"""
+    return f"{kind}:" + "|".join(str(part) for part in parts)
+
+
+# 每個維度：基礎過濾、分組鍵（_id 子字段 → 表達式）
+_KIND_SPECS: Dict[str, Dict[str, Any]] = {
+    "platform": {
+        "match": {},
+        "key": {"platform": _PLATFORM_EXPR},
+    },
+    "platform_category": {
+        "match": {"categories.0": {"$exists": True}},
+        "unwind": "$categories",
+        "key": {"platform": _PLATFORM_EXPR, "category": "$categories"},
+    },
+    "run": {
+        "match": {"run_id": {"$nin": [None, ""]}},
+        "key": {"run_id": "$run_id"},
+    },
+    "platform_day": {
+        "match": {"created_at": {"$type": "date"}},
+        "key": {"platform": _PLATFORM_EXPR, "day": {"$dateToString": {"format": DAY_FORMAT, "date": "$created_at"}}},
+    },
+}
+
+
+def _bucket_condition(lower: Any, upper: Optional[Any]) -> Dict[str, Any]:
+    conditions = [_HAS_PRICE, {"$gte": ["$price_value", lower]}]
+    if upper is not None:
+        conditions.append({"$lt": ["$price_value", upper]})
+    return {"$and": conditions}
+
+
+def _bucket_fields() -> List[Tuple[str, str, Dict[str, Any]]]:
+    """(累加器字段名, 區間標籤, 條件)"""
+    bounds = PRICE_BUCKET_BOUNDARIES + [None]
+    fields = []
+    for lower, upper in zip(bounds, bounds[1:]):
+        label = PRICE_BUCKET_LABELS[lower] if upper is not None else PRICE_BUCKET_LABELS["200+"]
+        fields.append((f"bucket_{lower}", label, _bucket_condition(lower, upper)))
+    return fields
+
+
+def _rollup_stages(kind: str, refreshed_at: datetime) -> List[Dict[str, Any]]:
+    """把產品聚合為指定維度匯總文檔的 pipeline（不含 $merge）"""
+    spec = _KIND_SPECS[kind]
+    quality = quality_accumulators()
+    buckets = _bucket_fields()
+
+    stages: List[Dict[str, Any]] = []
+    if spec["match"]:
+        stages.append({"$match": spec["match"]})
+    if spec.get("unwind"):
+        stages.append({"$unwind": spec["unwind"]})
+
+    group: Dict[str, Any] = {
+        "_id": spec["key"],
+        "count": {"$sum": 1},
+        "price_count": {"$sum": {"$cond": [_HAS_PRICE, 1, 0]}},
+        "price_sum": {"$sum": {"$cond": [_HAS_PRICE, "$price_value", 0]}},
+        "price_min": {"$min": {"$cond": [_HAS_PRICE, "$price_value", None]}},
+        "price_max": {"$max": {"$cond": [_HAS_PRICE, "$price_value", None]}},
+        "rating_count": {"$sum": {"$cond": [_HAS_RATING, 1, 0]}},
+        "rating_sum": {"$sum": {"$cond": [_HAS_RATING, "$rating", 0]}},
+        "review_sum": {"$sum": {"$ifNull": ["$review_count", 0]}},
+        "first_created": {"$min": "$created_at"},
+        "last_created": {"$max": "$created_at"},
+        "last_updated": {"$max": "$updated_at"},
+        **quality,
+    }
+    for field, _, condition in buckets:
+        group[field] = {"$sum": {"$cond": [condition, 1, 0]}}
+    stages.append({"$group": group})
+
+    id_parts: List[Any] = [f"{kind}:"]
+    for index, field in enumerate(spec["key"]):
+        if index:
+            id_parts.append("|")
+        id_parts.append({"$toString": f"$_id.{field}"})
+
+    projection: Dict[str, Any] = {
+        "_id": {"$concat": id_parts},
+        "kind": {"$literal": kind},
+        **{field: f"$_id.{field}" for field in spec["key"]},
+        **{field: 1 for field in _SUM_FIELDS},
+        "price_min": 1,
+        "price_max": 1,
+        "first_created": 1,
+        "last_created": 1,
+        "last_updated": 1,
+        "quality": {check_type: f"${check_type}" for check_type in quality},
+        "price_buckets": {label: f"${field}" for field, label, _ in buckets},
+        "refreshed_at": {"$literal": refreshed_at},
+    }
+    stages.append({"$project": projection})
+    return stages
+
+
+def _merge_stage() -> Dict[str, Any]:
+    return {"$merge": {"into": ROLLUP_COLLECTION, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}}
+
+
+class RollupScope:
+    """一次寫入 / 刪除影響到的匯總分組"""
+
+    def __init__(self):
+        self.platforms = set()
+        self.platform_categories = set()
+        self.runs = set()
+        self.platform_days = set()
+
+    def add_product(self, product_doc: Dict[str, Any]) -> None:
+        platform = product_doc.get("platform") or "unknown"
+        self.platforms.add(platform)
+        for category in product_doc.get("categories") or []:
+            self.platform_categories.add((platform, category))
+        if product_doc.get("run_id"):
+            self.runs.add(product_doc["run_id"])
+        created_at = product_doc.get("created_at")
+        if isinstance(created_at, datetime):
+            self.platform_days.add((platform, created_at.strftime(DAY_FORMAT)))
+
+    def __bool__(self) -> bool:
+        return bool(self.platforms or self.runs)
+
+
+def _platform_match(platforms: Iterable[str]) -> Dict[str, Any]:
+    values: List[Any] = sorted(set(platforms))
+    if "unknown" in values:
+        values.append(None)  # 匯總時 platform 缺失歸為 unknown
+    return {"$in": values}
+
+
+def _scope_targets(scope: RollupScope) -> List[Tuple[str, Dict[str, Any], List[str]]]:
+    """每個維度需要重算的 (kind, 產品過濾條件, 受影響的匯總 _id)
+
+    過濾條件可能比受影響分組更寬（例如平台 × 分類的笛卡爾積），受影響的分組都會被完整重算；
+    但命中產品的其他分類展開後只得到部分產品，只能寫回受影響的分組（見 _refresh_pipeline）
+    """
+    targets = []
+    if scope.platforms:
+        targets.append((
+            "platform",
+            {"platform": _platform_match(scope.platforms)},
+            [rollup_id("platform", p) for p in scope.platforms],
+        ))
+    if scope.platform_categories:
+        targets.append((
+            "platform_category",
+            {
+                "platform": _platform_match(p for p, _ in scope.platform_categories),
+                "categories": {"$in": sorted({c for _, c in scope.platform_categories})},
+            },
+            [rollup_id("platform_category", p, c) for p, c in scope.platform_categories],
+        ))
+    if scope.runs:
+        targets.append((
+            "run",
+            {"run_id": {"$in": sorted(scope.runs)}},
+            [rollup_id("run", r) for r in scope.runs],
+        ))
+    if scope.platform_days:
+        days = sorted(d for _, d in scope.platform_days)
+        targets.append((
+            "platform_day",
+            {
+                "platform": _platform_match(p for p, _ in scope.platform_days),
+                "created_at": {
+                    "$gte": datetime.strptime(days[0], DAY_FORMAT),
+                    "$lt": datetime.strptime(days[-1], DAY_FORMAT) + timedelta(days=1),
+                },
+            },
+            [rollup_id("platform_day", p, d) for p, d in scope.platform_days],
+        ))
+    return targets
+
+
+def _refresh_pipeline(
+    kind: str, product_match: Dict[str, Any], ids: List[str], refreshed_at: datetime
+) -> List[Dict[str, Any]]:
+    """增量重算一個維度的 pipeline（不含 $merge）
+
+    分組後只保留受影響的匯總 _id：例如分類為 [A, B] 的產品因分類 A 被命中，
+    展開後的 B 分組只包含本次命中的產品，寫回會覆蓋正確的完整匯總
+    """
+    return [
+        {"$match": product_match},
+        *_rollup_stages(kind, refreshed_at),
+        {"$match": {"_id": {"$in": ids}}},
+    ]
+
+
+def _get_db(db=None):
+    if db is not None:
+        return db
+    return mongodb.get_database()
+
+
+def _set_meta(db, fields: Dict[str, Any]) -> None:
+    db[ROLLUP_COLLECTION].update_one(
+        {"_id": META_ID},
+        {"$set": {"kind": "meta", **fields}},
+        upsert=True
+    )
+
+
+def get_rollup_status(db=None) -> Optional[Dict[str, Any]]:
+    """匯總表狀態（未建立時返回 None）"""
+    db = _get_db(db)
+    if db is None:
+        return None
+    return db[ROLLUP_COLLECTION].find_one({"_id": META_ID})
+
+
+def refresh_rollups(scope: RollupScope, db=None) -> int:
+    """增量重算受影響的匯總分組，返回重算的維度數
+
+    匯總表尚未建立（從未 rebuild）時跳過：讀取端此時使用實時聚合。
+    重算失敗時把匯總表標記為過期，讀取端回退到實時聚合，直到下一次全量重建。
+    """
+    if not settings.analytics_rollups_enabled or not scope:
+        return 0
+    db = _get_db(db)
+    if db is None:
+        return 0
+
+    rollups = db[ROLLUP_COLLECTION]
+    try:
+        status = rollups.find_one({"_id": META_ID}, {"last_rebuild_at": 1})
+        if not status or not status.get("last_rebuild_at"):
+            return 0
+
+        now = _now()
+        targets = _scope_targets(scope)
+        for kind, product_match, ids in targets:
+            pipeline = [*_refresh_pipeline(kind, product_match, ids, now), _merge_stage()]
+            db["products"].aggregate(pipeline, allowDiskUse=True)
+            # 沒有被本次重算覆蓋的受影響分組已經沒有產品，刪除
+            rollups.delete_many({"_id": {"$in": ids}, "refreshed_at": {"$lt": now}})
+
+        _set_meta(db, {"last_refresh_at": now})
+        return len(targets)
+    except Exception as e:
+        # 匯總失敗不能影響寫入結果
+        print(f"[Rollups] 增量匯總失敗，標記為過期: {e}")
+        try:
+            _set_meta(db, {"stale": True, "last_error": str(e)})
+        except PyMongoError:
+            pass
+        return 0
+
+
+def rebuild_rollups(db=None) -> Dict[str, int]:
+    """全量重建所有匯總，返回每個維度的分組數"""
+    db = _get_db(db)
+    if db is None:
+        print("[Rollups] MongoDB 未設定，跳過匯總重建")
+        return {}
+
+    now = _now()
+    rollups = db[ROLLUP_COLLECTION]
+    for kind in ROLLUP_KINDS:
+        db["products"].aggregate([*_rollup_stages(kind, now), _merge_stage()], allowDiskUse=True)
+    removed = rollups.delete_many({"kind": {"$in": list(ROLLUP_KINDS)}, "refreshed_at": {"$lt": now}}).deleted_count
+    _set_meta(db, {"last_rebuild_at": now, "last_refresh_at": now, "stale": False, "last_error": None})
+    # 匯總更新時間出現在響應中，讓響應緩存和 ETag 失效
+    bump_data_version(db)
+
+    counts = {kind: rollups.count_documents({"kind": kind}) for kind in ROLLUP_KINDS}
+    print(f"[Rollups] 匯總重建完成: {counts}，移除過期分組 {removed} 個")
+    return counts
+
+
+def ensure_rollups(db=None) -> bool:
+    """匯總表尚未建立或已過期時全量重建，返回是否執行了重建"""
+    if not settings.analytics_rollups_enabled:
+        return False
+    status = get_rollup_status(db)
+    if status and status.get("last_rebuild_at") and not status.get("stale"):
+        return False
+    rebuild_rollups(db)
+    return True
+
+
+def _freshness(source: str, refreshed_at: Optional[datetime], stale: bool = False) -> Dict[str, Any]:
+    """數據來源指示；只依賴匯總更新時間（不含請求時刻），同一數據版本下響應保持不變，便於緩存和 ETag"""
+    return {
+        "source": source,
+        "refreshed_at": refreshed_at.isoformat() if refreshed_at else None,
+        "stale": stale,
+    }
+
+
+async def read_rollups(
+    kind: str,
+    rollup_filter: Optional[Dict[str, Any]] = None,
+    product_match: Optional[Dict[str, Any]] = None,
+    sort: Optional[Sequence[Tuple[str, int]]] = None,
+    limit: int = 0,
+    force_live: bool = False,
+) -> Tuple[List[Dict], Dict[str, Any]]:
+    """讀取指定維度的匯總文檔，返回 (文檔列表, freshness)
+
+    Args:
+        rollup_filter: 對匯總文檔的過濾（例如 {"platform": "amazon"}）
+        product_match: 回退到實時聚合時對產品的等價過濾
+        force_live: 匯總維度無法表達的過濾（例如按分類看價格趨勢）時強制實時聚合
+    """
+    rollup_repo = get_analytics_rollup_repository()
+    stale = False
+    if rollup_repo is not None and settings.analytics_rollups_enabled and not force_live:
+        status = await rollup_repo.find_one({"_id": META_ID})
+        stale = bool(status and status.get("stale"))
+        if status and status.get("last_rebuild_at") and not stale:
+            rows = await rollup_repo.find({"kind": kind, **(rollup_filter or {})}, sort=sort, limit=limit)
+            return rows, _freshness("rollup", status.get("last_refresh_at"))
+
+    products_repo = get_product_repository()
+    if products_repo is None:
+        return [], _freshness("live", None, stale)
+
+    now = _now()
+    pipeline: List[Dict[str, Any]] = []
+    if product_match:
+        pipeline.append({"$match": product_match})
+    pipeline.extend(_rollup_stages(kind, now))
+    if sort:
+        pipeline.append({"$sort": dict(sort)})
+    if limit:
+        pipeline.append({"$limit": limit})
+    rows = await products_repo.aggregate(pipeline, allow_disk_use=True)
+    return rows, _freshness("live", None, stale)
+
+
+def merge_rollup_rows(rows: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """把多個匯總文檔合併為一個（計數相加，最值取極值）"""
+    merged: Dict[str, Any] = {field: 0 for field in _SUM_FIELDS}
+    merged.update({"price_min": None, "price_max": None, "quality": {}, "price_buckets": {}})
+    for row in rows:
+        for field in _SUM_FIELDS:
+            merged[field] += row.get(field) or 0
+        for field, pick in (("price_min", min), ("price_max", max)):
+            value = row.get(field)
+            if value is not None:
+                merged[field] = value if merged[field] is None else pick(merged[field], value)
+        for nested in ("quality", "price_buckets"):
+            for key, value in (row.get(nested) or {}).items():
+                merged[nested][key] = merged[nested].get(key, 0) + (value or 0)
+    return merged
+
+
+def rollup_average(row: Dict[str, Any], metric: str) -> Optional[float]:
+    """匯總文檔中某指標（price / rating）的平均值，沒有數據時返回 None"""
+    count = row.get(f"{metric}_count") or 0
+    if not count:
+        return None
+    return (row.get(f"{metric}_sum") or 0) / count
@@ -0,0 +1,229 @@
+"""
+爬取 checkpoint（MongoDB）
+後台爬取任務的進度增量保存，進程崩潰、部署或取消後可以按 run_id 恢復：
+
+- crawl_checkpoints：每個任務一條（_id 為 run_id），記錄已完成的關鍵詞和累計寫入數
+- crawl_frontier：每個商品一條，狀態 pending（待獲取詳情）→ done（待寫入）→ flushed（已寫入 products）
+
+完成的商品按 settings.crawl_flush_batch_size 分批寫入 products（寫入失敗或寫入前崩潰的商品保持 done，
+稍後或恢復時重新寫入，upsert 保證冪等）。retain_flushed=False 時寫入後不再在內存中保留商品內容（流式任務）。
+兩個 collection 的記錄在 settings.crawl_checkpoint_ttl_seconds 後由 TTL 索引自動刪除。
+"""
+
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.db.mongodb import mongodb
+from app.scrapers.frontier import CrawlFrontier, TermState
+
+
+CHECKPOINT_COLLECTION = "crawl_checkpoints"
+FRONTIER_COLLECTION = "crawl_frontier"
+
+PENDING = "pending"
+DONE = "done"
+FLUSHED = "flushed"
+
+
+def _item_id(run_id: str, term: str, index: int) -> str:
+    return f"{run_id}\x1f{term}\x1f{index}"
+
+
+class CrawlCheckpoint(CrawlFrontier):
+    """按 run_id 持久化的爬取前沿（MongoDB 未設定時只在內存中記錄）
+
+    flush: 把一批商品寫入 products，返回寫入數
+    max_products: 整個任務最多處理的商品數，搜索結果超出剩餘配額的部分不再獲取詳情
+    retain_flushed: 寫入後是否保留商品內容（False 時 products() 不返回已寫入的商品）
+    """
+
+    def __init__(
+        self,
+        run_id: str,
+        max_products: int,
+        flush: Callable[[List[Dict[str, Any]]], int],
+        batch_size: Optional[int] = None,
+        db=None,
+        retain_flushed: bool = True,
+    ):
+        self.run_id = run_id
+        self.max_products = max_products
+        self.batch_size = max(1, batch_size or settings.crawl_flush_batch_size)
+        self._flush_fn = flush
+        self.retain_flushed = retain_flushed
+        self.db = db if db is not None else mongodb.get_database()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # term -> {"products": [...], "status": [...], "done": bool}
+        self._terms: Dict[str, Dict[str, Any]] = {}
+        self._buffer: List[Tuple[str, int]] = []
+        self.written = 0
+        self._load()
+
+    # ---- 持久化 ----
+
+    def _load(self) -> None:
+        """讀取已保存的進度（新任務沒有記錄）"""
+        if self.db is None:
+            return
+        checkpoint = self.db[CHECKPOINT_COLLECTION].find_one({"_id": self.run_id})
+        if checkpoint is None:
+            return
+        self.written = checkpoint.get("written", 0)
+        completed = set(checkpoint.get("completed_terms", []))
+
+        for item in self.db[FRONTIER_COLLECTION].find({"run_id": self.run_id}).sort([("term", 1), ("index", 1)]):
+            state = self._terms.setdefault(item["term"], {"products": [], "status": [], "done": False})
+            state["products"].append(item["product"])
+            state["status"].append(item["status"])
+            if item["status"] == DONE:
+                # 上次完成但未寫入的商品
+                self._buffer.append((item["term"], item["index"]))
+        for term in completed:
+            self._terms.setdefault(term, {"products": [], "status": [], "done": True})["done"] = True
+
+        accepted = sum(len(state["products"]) for state in self._terms.values())
+        print(f"[Crawl Checkpoint] 恢復任務 {self.run_id}：{len(completed)} 個關鍵詞已完成，"
+              f"{accepted} 個商品，{len(self._buffer)} 個待寫入，已寫入 {self.written}")
+
+    def _save_items(self, term: str, start: int, products: List[Dict[str, Any]], statuses: List[str]) -> None:
+        if self.db is None or not products:
+            return
+        now = datetime.utcnow()
+        self.db[FRONTIER_COLLECTION].insert_many([
+            {
+                "_id": _item_id(self.run_id, term, start + offset),
+                "run_id": self.run_id,
+                "term": term,
+                "index": start + offset,
+                "product_url": product.get("product_url"),
+                "status": status,
+                "product": product,
+                "updated_at": now,
+            }
+            for offset, (product, status) in enumerate(zip(products, statuses))
+        ], ordered=False)
+
+    def _touch_checkpoint(self, update: Dict[str, Any]) -> None:
+        if self.db is None:
+            return
+        update.setdefault("$set", {})["updated_at"] = datetime.utcnow()
+        self.db[CHECKPOINT_COLLECTION].update_one({"_id": self.run_id}, update, upsert=True)
+
+    # ---- CrawlFrontier ----
+
+    @property
+    def remaining(self) -> int:
+        """剩餘的商品配額"""
+        with self._lock:
+            accepted = sum(len(state["products"]) for state in self._terms.values())
+        return max(self.max_products - accepted, 0)
+
+    def term_state(self, term: str) -> Optional[TermState]:
+        with self._lock:
+            state = self._terms.get(term)
+            if state is None:
+                return None
+            pending = {index for index, status in enumerate(state["status"]) if status == PENDING}
+            # 返回副本：retain_flushed=False 時寫入後只清空 checkpoint 自己的引用，不影響爬蟲使用的列表
+            return TermState(list(state["products"]), pending, state["done"])
+
+    def record_search(self, term: str, products: List[Dict[str, Any]], fetch_details: bool) -> List[Dict[str, Any]]:
+        with self._lock:
+            accepted = sum(len(state["products"]) for state in self._terms.values())
+            products = products[:max(self.max_products - accepted, 0)]
+            statuses = [PENDING if fetch_details and p.get("product_url") else DONE for p in products]
+            self._terms[term] = {"products": list(products), "status": statuses, "done": False}
+            self._buffer.extend((term, index) for index, status in enumerate(statuses) if status == DONE)
+        self._save_items(term, 0, products, statuses)
+        self._touch_checkpoint({"$setOnInsert": {"created_at": datetime.utcnow()}})
+        self._maybe_flush()
+        return products
+
+    def product_done(self, term: str, index: int, product_info: Dict[str, Any]) -> None:
+        with self._lock:
+            state = self._terms[term]
+            if state["status"][index] != PENDING:
+                return
+            state["status"][index] = DONE
+            state["products"][index] = product_info
+            self._buffer.append((term, index))
+        if self.db is not None:
+            self.db[FRONTIER_COLLECTION].update_one(
+                {"_id": _item_id(self.run_id, term, index)},
+                {"$set": {"status": DONE, "product": product_info, "updated_at": datetime.utcnow()}}
+            )
+        self._maybe_flush()
+
+    def term_done(self, term: str) -> None:
+        with self._lock:
+            state = self._terms.setdefault(term, {"products": [], "status": [], "done": False})
+            # 詳情獲取失敗的商品：保留搜索結果信息，一併寫入
+            failed = [index for index, status in enumerate(state["status"]) if status == PENDING]
+            for index in failed:
+                state["status"][index] = DONE
+            self._buffer.extend((term, index) for index in failed)
+            state["done"] = True
+        if self.db is not None and failed:
+            self.db[FRONTIER_COLLECTION].update_many(
+                {"_id": {"$in": [_item_id(self.run_id, term, index) for index in failed]}},
+                {"$set": {"status": DONE, "updated_at": datetime.utcnow()}}
+            )
+        self._touch_checkpoint({"$addToSet": {"completed_terms": term}})
+        self._maybe_flush()
+
+    # ---- 寫入 ----
+
+    def _maybe_flush(self) -> None:
+        if len(self._buffer) >= self.batch_size:
+            try:
+                self.flush()
+            except Exception as e:
+                # 爬取過程中的寫入失敗不中斷任務：商品留在緩衝區，下一批或任務結束時重試
+                print(f"[Crawl Checkpoint] 任務 {self.run_id} 寫入失敗，{len(self._buffer)} 個商品稍後重試: {e}")
+
+    def flush(self) -> int:
+        """把已完成的商品寫入 products，返回本次寫入數
+
+        寫入回調拋出異常時商品留在緩衝區（frontier 中保持 done，恢復任務時重新寫入）並重新拋出；
+        回調必須在任何商品沒有寫入時拋出，而不是只返回較小的寫入數
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+                products = [self._terms[term]["products"][index] for term, index in batch]
+            if not batch:
+                return 0
+            try:
+                written = self._flush_fn(products)
+            except Exception:
+                with self._lock:
+                    self._buffer = batch + self._buffer
+                raise
+            with self._lock:
+                for term, index in batch:
+                    self._terms[term]["status"][index] = FLUSHED
+                    if not self.retain_flushed:
+                        self._terms[term]["products"][index] = None
+                self.written += written
+            if self.db is not None:
+                self.db[FRONTIER_COLLECTION].update_many(
+                    {"_id": {"$in": [_item_id(self.run_id, term, index) for term, index in batch]}},
+                    {"$set": {"status": FLUSHED, "updated_at": datetime.utcnow()}}
+                )
+            self._touch_checkpoint({"$inc": {"written": written}})
+            print(f"[Crawl Checkpoint] 任務 {self.run_id} 寫入 {len(batch)} 個商品（累計 {self.written}）")
+            return written
+
+    def products(self, terms: List[str]) -> List[Dict[str, Any]]:
+        """按關鍵詞順序返回已寫入的商品"""
+        with self._lock:
+            return [
+                product
+                for term in dict.fromkeys(terms)
+                if term in self._terms
+                for product, status in zip(self._terms[term]["products"], self._terms[term]["status"])
+                if status == FLUSHED and product is not None
+            ]
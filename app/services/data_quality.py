@@ -0,0 +1,72 @@
+"""
+數據質量檢查
+檢查項以聲明式表格定義（聚合表達式），既用於實時聚合也用於分析匯總表（analytics_rollups）
+"""
+
+from typing import Any, Dict, List
+
+
+def _is_blank(field: str) -> Dict[str, Any]:
+    """聚合表達式：字段缺失、為 null 或為空字符串"""
+    return {"$in": [{"$ifNull": [f"${field}", None]}, [None, ""]]}
+
+
+def _is_null(field: str) -> Dict[str, Any]:
+    """聚合表達式：字段缺失或為 null"""
+    return {"$eq": [{"$ifNull": [f"${field}", None]}, None]}
+
+
+# 數據質量檢查項：新增檢查只需在表中加一行（condition 為判斷文檔存在該問題的聚合表達式）
+DATA_QUALITY_CHECKS: List[Dict[str, Any]] = [
+    {"type": "missing_price", "severity": "high", "condition": _is_blank("price")},
+    {"type": "missing_name", "severity": "critical", "condition": _is_blank("name")},
+    {"type": "missing_image", "severity": "medium", "condition": _is_blank("image_url")},
+    {"type": "missing_url", "severity": "medium", "condition": _is_blank("product_url")},
+    {"type": "missing_rating", "severity": "low", "condition": _is_null("rating")},
+    {"type": "missing_review_count", "severity": "low", "condition": {"$and": [_is_null("review_count"), _is_blank("review_count_text")]}},
+]
+
+# 質量分數扣分權重（每 1% 問題產品扣的分數）
+SEVERITY_WEIGHTS = {"critical": 2, "high": 1.5, "medium": 1, "low": 0.5}
+
+
+def quality_accumulators() -> Dict[str, Any]:
+    """$group 累加器：每個檢查項的問題產品數"""
+    return {
+        check["type"]: {"$sum": {"$cond": [check["condition"], 1, 0]}}
+        for check in DATA_QUALITY_CHECKS
+    }
+
+
+def build_quality_report(total_products: int, issue_counts: Dict[str, int]) -> Dict[str, Any]:
+    """把產品總數和各檢查項的問題數轉換為質量報告"""
+    if total_products == 0:
+        return {
+            "total_products": 0,
+            "quality_score": 0,
+            "issues": []
+        }
+
+    issues = []
+    for check in DATA_QUALITY_CHECKS:
+        count = issue_counts.get(check["type"], 0)
+        if count > 0:
+            issues.append({
+                "type": check["type"],
+                "count": count,
+                "percentage": round(count / total_products * 100, 2),
+                "severity": check["severity"]
+            })
+
+    # 計算質量分數（100分制，每個問題扣分）
+    quality_score = 100
+    for issue in issues:
+        quality_score -= issue["percentage"] * SEVERITY_WEIGHTS.get(issue["severity"], 0.5)
+    quality_score = max(0, min(100, quality_score))
+
+    return {
+        "total_products": total_products,
+        "quality_score": round(quality_score, 2),
+        "issues": issues,
+        "completeness": round((total_products - len([i for i in issues if i["count"] > 0])) / total_products * 100, 2)
+    }
@@ -0,0 +1,75 @@
+"""
+數據版本號
+products 的任何寫入 / 刪除（寫入端、查詢歷史清理、維護腳本）都會遞增 app_meta 中的版本號。
+響應緩存和 ETag 以版本號判斷數據是否變化：版本號不變，只讀端點的響應就不變。
+多進程部署時其他進程最多延遲 settings.data_version_check_seconds 秒感知到新版本。
+"""
+
+import threading
+import time
+from typing import Optional
+
+from pymongo import ReturnDocument
+
+from app.config import settings
+from app.db.mongodb import mongodb
+from app.db.repositories import get_app_meta_repository
+
+
+META_COLLECTION = "app_meta"
+DATA_VERSION_ID = "data_version"
+
+
+class DataVersion:
+    """進程內緩存的數據版本號"""
+
+    def __init__(self):
+        self._value: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _remember(self, value: int) -> int:
+        with self._lock:
+            self._value = value
+            self._checked_at = time.monotonic()
+        return value
+
+    async def current(self) -> int:
+        """當前版本號（短時間內直接使用進程內的值，避免每個請求都查詢數據庫）"""
+        if self._value is not None and time.monotonic() - self._checked_at < settings.data_version_check_seconds:
+            return self._value
+
+        meta_repo = get_app_meta_repository()
+        if meta_repo is None:
+            return 0
+        try:
+            doc = await meta_repo.find_one({"_id": DATA_VERSION_ID})
+        except Exception as e:
+            print(f"[Data Version] 讀取版本號失敗: {e}")
+            return self._value or 0
+        return self._remember(int(doc.get("version", 0)) if doc else 0)
+
+    def bump(self, db=None) -> int:
+        """遞增版本號（同步 PyMongo，寫入端和腳本調用）"""
+        db = db if db is not None else mongodb.get_database()
+        if db is None:
+            return 0
+        try:
+            doc = db[META_COLLECTION].find_one_and_update(
+                {"_id": DATA_VERSION_ID},
+                {"$inc": {"version": 1}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except Exception as e:
+            print(f"[Data Version] 遞增版本號失敗: {e}")
+            return self._value or 0
+        return self._remember(int(doc.get("version", 0)))
+
+
+data_version = DataVersion()
+
+
+def bump_data_version(db=None) -> int:
+    """products 數據變化後調用"""
+    return data_version.bump(db)
@@ -1,64 +1,42 @@
 """
 MongoDB 数据读取服务
 从 MongoDB 读取产品数据，供前端 API 使用
+读取失败时抛出异常（端点返回 5xx），不返回空结果，避免被响应缓存 / ETag 当作正常数据
 """
 
-from app.db.mongodb import mongodb
-from typing import List, Optional, Dict, Any
+from app.db.repositories import get_product_repository
+from app.services.product_search import build_search_filter
+from app.services.product_metrics import compute_derived_fields, get_competition_level, has_derived_fields
+from app.services.analytics_rollups import read_rollups
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+import base64
+import json
+import re
 from pydantic import BaseModel
 
 
-def _parse_price(price_str: Optional[str]) -> float:
-    """解析價格字符串為數字"""
-    if not price_str:
-        return 0.0
-    import re
-    cleaned = re.sub(r'[$,]', '', str(price_str))
-    try:
-        return float(cleaned)
-    except (ValueError, AttributeError):
-        return 0.0
-
-
-def _calculate_margin_rate(price: float) -> float:
-    """計算利潤率"""
-    if price <= 0:
-        return 0.0
-    cost = price * 0.6
-    margin = ((price - cost) / cost) * 100
-    return round(margin, 2)
-
-
-def _calculate_competition_score(review_count: Optional[int], rating: Optional[float]) -> float:
-    """計算競爭度分數"""
-    score = 50.0
-    
-    if review_count:
-        if review_count > 10000:
-            score += 30
-        elif review_count > 5000:
-            score += 20
-        elif review_count > 1000:
-            score += 10
-    
-    if rating:
-        if rating >= 4.5:
-            score += 20
-        elif rating >= 4.0:
-            score += 10
-    
-    return min(100.0, max(0.0, score))
-
-
-def _get_competition_level(score: float) -> str:
-    """根據競爭度分數返回等級（與前端 Product 類保持一致：<30=low, 30-60=medium, >=60=high）"""
-    if score < 30:
-        return "low"
-    elif score < 60:  # 與前端 Product.competitionLevel getter 保持一致
-        return "medium"
-    else:
-        return "high"
+# 列表 / 詳情響應所需字段（派生字段由寫入端預先計算，見 product_metrics）
+PRODUCT_RESPONSE_PROJECTION = {
+    "name": 1,
+    "platform": 1,
+    "price": 1,
+    "price_value": 1,
+    "margin_rate": 1,
+    "competition_score": 1,
+    "competition_level": 1,
+    "rating": 1,
+    "review_count": 1,
+    "review_count_text": 1,
+    "categories": 1,
+    "image_url": 1,
+    "description": 1,
+    "product_url": 1,
+    "content_hash": 1,
+    "created_at": 1,
+}
 
 
 # 定义 ProductResponse 以避免循环导入
@@ -88,38 +66,30 @@ class ProductResponse(BaseModel):
         from_attributes = True
 
 
-def _parse_review_count(review_count_text: Optional[str]) -> Optional[int]:
-    """从 review_count_text 解析评论数"""
-    if not review_count_text:
-        return None
-    
-    import re
-    # 移除逗号和其他字符，只保留数字
-    numbers = re.findall(r'\d+', str(review_count_text).replace(',', ''))
-    if numbers:
-        try:
-            return int(numbers[0])
-        except:
-            pass
-    return None
+class ProductPage(BaseModel):
+    """游標分頁響應：next_cursor 為 None 表示沒有下一頁"""
+    items: List[ProductResponse]
+    next_cursor: Optional[str] = None
 
 
 def _mongo_product_to_response(product_doc: Dict) -> ProductResponse:
     """將 MongoDB 產品文檔轉換為 ProductResponse"""
     try:
-        price = _parse_price(product_doc.get("price"))
-        margin_rate = _calculate_margin_rate(price)
-        
-        # 优先使用 review_count，如果为 None 则从 review_count_text 解析
-        review_count = product_doc.get("review_count")
-        if review_count is None:
-            review_count = _parse_review_count(product_doc.get("review_count_text"))
-        
-        competition_score = _calculate_competition_score(
-            review_count,
-            product_doc.get("rating")
-        )
-        competition_level = _get_competition_level(competition_score)
+        # 優先使用寫入時存儲的派生字段，舊文檔（未回填）才現場計算
+        if has_derived_fields(product_doc):
+            derived = product_doc
+        else:
+            derived = compute_derived_fields(
+                product_doc.get("price"),
+                product_doc.get("review_count"),
+                product_doc.get("review_count_text"),
+                product_doc.get("rating"),
+            )
+        price = derived.get("price_value") or 0.0
+        margin_rate = derived.get("margin_rate") or 0.0
+        review_count = derived.get("review_count")
+        competition_score = derived["competition_score"]
+        competition_level = derived.get("competition_level") or get_competition_level(competition_score)
         
         # 獲取分類
         categories = product_doc.get("categories", [])
@@ -158,7 +128,77 @@ def _mongo_product_to_response(product_doc: Dict) -> ProductResponse:
         raise
 
 
-def get_products_from_mongodb(
+def _build_product_query(
+    platform: Optional[str] = None,
+    category: Optional[str] = None,
+    search: Optional[str] = None
+) -> Tuple[Dict[str, Any], bool]:
+    """構建產品列表查詢條件，返回 (查詢條件, 是否使用文本相關度排序)"""
+    query: Dict[str, Any] = {}
+    
+    # 狀態過濾（MongoDB 中 status 為 "draft"，但我們返回時轉為 "active"）
+    # 實際上我們返回所有數據，因為都是爬取的最新數據
+    
+    # 平台過濾
+    if platform:
+        query["platform"] = platform
+    
+    # 分類過濾
+    if category:
+        query["categories"] = {"$in": [category]}
+    
+    # 搜索過濾（文本索引 + 詞元前綴匹配，見 product_search）
+    search_filter, text_ranked = build_search_filter(search)
+    query.update(search_filter)
+    return query, text_ranked
+
+
+def encode_cursor(product_doc: Dict) -> str:
+    """把最後一條記錄的 (created_at, _id) 編碼為不透明游標"""
+    created_at = product_doc.get("created_at")
+    payload = {
+        "c": created_at.isoformat() if isinstance(created_at, datetime) else None,
+        "i": str(product_doc["_id"]),
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], ObjectId]:
+    """解碼游標，格式錯誤時拋出 ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        created_at = datetime.fromisoformat(payload["c"]) if payload.get("c") else None
+        return created_at, ObjectId(payload["i"])
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def _keyset_filter(created_at: Optional[datetime], last_id: ObjectId) -> Dict[str, Any]:
+    """排序鍵 (created_at desc, _id desc) 上位於游標之後的記錄"""
+    if created_at is None:
+        # 沒有 created_at 的舊數據排在最後，只能再按 _id 繼續
+        return {"created_at": None, "_id": {"$lt": last_id}}
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "_id": {"$lt": last_id}},
+        {"created_at": None},
+    ]}
+
+
+def _to_responses(products: List[Dict]) -> List[ProductResponse]:
+    result = []
+    for product_doc in products:
+        try:
+            result.append(_mongo_product_to_response(product_doc))
+        except Exception as e:
+            print(f"[MongoDB Reader] 跳過產品: {e}")
+            continue
+    return result
+
+
+async def get_products_from_mongodb(
     skip: int = 0,
     limit: int = 20,
     platform: Optional[str] = None,
@@ -166,77 +206,90 @@ def get_products_from_mongodb(
     search: Optional[str] = None,
     status: str = "active"
 ) -> List[ProductResponse]:
-    """從 MongoDB 獲取產品列表"""
-    db = mongodb.connect()
-    if db is None:
+    """從 MongoDB 獲取產品列表（offset 分頁）"""
+    repo = get_product_repository()
+    if repo is None:
         print("MongoDB 未設定，返回空列表")
         return []
     
     try:
-        products_collection = db["products"]
-        
-        # 構建查詢條件
-        query = {}
-        
-        # 狀態過濾（MongoDB 中 status 為 "draft"，但我們返回時轉為 "active"）
-        # 實際上我們返回所有數據，因為都是爬取的最新數據
+        query, text_ranked = _build_product_query(platform, category, search)
         
-        # 平台過濾
-        if platform:
-            query["platform"] = platform
+        # 執行查詢：全文搜索按相關度排序，否則按創建時間倒序
+        projection = PRODUCT_RESPONSE_PROJECTION
+        sort = [("created_at", -1)]
+        if text_ranked:
+            projection = {**PRODUCT_RESPONSE_PROJECTION, "score": {"$meta": "textScore"}}
+            sort = [("score", {"$meta": "textScore"}), ("created_at", -1)]
+        products = await repo.find(query, projection=projection, sort=sort, skip=skip, limit=limit)
         
-        # 分類過濾
-        if category:
-            query["categories"] = {"$in": [category]}
-        
-        # 搜索過濾
-        if search:
-            query["$or"] = [
-                {"name": {"$regex": search, "$options": "i"}},
-                {"description": {"$regex": search, "$options": "i"}}
-            ]
+        # 轉換為響應格式
+        return _to_responses(products)
         
-        # 執行查詢
-        cursor = products_collection.find(query).sort("created_at", -1).skip(skip).limit(limit)
-        products = list(cursor)
+    except Exception as e:
+        # 數據庫錯誤交給端點返回 5xx：空列表會被響應緩存 / ETag 當作正常數據保存
+        print(f"[MongoDB Reader] 獲取產品失敗: {e}")
+        raise
+
+
+async def get_products_page_from_mongodb(
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    platform: Optional[str] = None,
+    category: Optional[str] = None,
+    search: Optional[str] = None
+) -> ProductPage:
+    """從 MongoDB 獲取產品列表（游標分頁）
+
+    按 (created_at, _id) 倒序做 keyset 分頁，每頁成本與頁數深度無關。
+    搜索時同樣按時間排序（相關度排序無法穩定地作為游標）。
+    游標格式錯誤時拋出 ValueError。
+    """
+    position = decode_cursor(cursor) if cursor else None
+    
+    repo = get_product_repository()
+    if repo is None:
+        print("MongoDB 未設定，返回空列表")
+        return ProductPage(items=[])
+    
+    try:
+        query, _ = _build_product_query(platform, category, search)
+        if position:
+            query = {"$and": [query, _keyset_filter(*position)]} if query else _keyset_filter(*position)
         
-        # 轉換為響應格式
-        result = []
-        for product_doc in products:
-            try:
-                response = _mongo_product_to_response(product_doc)
-                result.append(response)
-            except Exception as e:
-                print(f"[MongoDB Reader] 跳過產品: {e}")
-                continue
+        # 多取一條判斷是否還有下一頁
+        products = await repo.find(
+            query,
+            projection=PRODUCT_RESPONSE_PROJECTION,
+            sort=[("created_at", -1), ("_id", -1)],
+            limit=limit + 1
+        )
+        has_more = len(products) > limit
+        products = products[:limit]
         
-        return result
+        next_cursor = encode_cursor(products[-1]) if has_more and products else None
+        return ProductPage(items=_to_responses(products), next_cursor=next_cursor)
         
     except Exception as e:
         print(f"[MongoDB Reader] 獲取產品失敗: {e}")
-        return []
-    finally:
-        mongodb.close()
+        raise
 
 
-def get_product_by_id_from_mongodb(product_id: str) -> Optional[ProductResponse]:
+async def get_product_by_id_from_mongodb(product_id: str) -> Optional[ProductResponse]:
     """從 MongoDB 根據 ID 獲取單個產品"""
-    db = mongodb.connect()
-    if db is None:
+    repo = get_product_repository()
+    if repo is None:
         return None
     
     try:
-        products_collection = db["products"]
-        
         # 嘗試通過 content_hash 查找
         if product_id.startswith("prod-"):
             hash_part = product_id.replace("prod-", "")
-            product_doc = products_collection.find_one({"content_hash": {"$regex": f"^{hash_part}"}})
+            product_doc = await repo.find_one({"content_hash": {"$regex": f"^{re.escape(hash_part)}"}}, PRODUCT_RESPONSE_PROJECTION)
         else:
             # 嘗試通過 _id 查找
-            from bson import ObjectId
             try:
-                product_doc = products_collection.find_one({"_id": ObjectId(product_id)})
+                product_doc = await repo.find_one({"_id": ObjectId(product_id)}, PRODUCT_RESPONSE_PROJECTION)
             except:
                 product_doc = None
         
@@ -246,41 +299,35 @@ def get_product_by_id_from_mongodb(product_id: str) -> Optional[ProductResponse]
         return None
         
     except Exception as e:
+        # 返回 None 會變成 404
         print(f"[MongoDB Reader] 獲取產品失敗: {e}")
-        return None
-    finally:
-        mongodb.close()
+        raise
 
 
-def get_products_stats_from_mongodb() -> Dict[str, Any]:
+async def get_products_stats_from_mongodb() -> Dict[str, Any]:
     """從 MongoDB 獲取產品統計信息"""
-    db = mongodb.connect()
-    if db is None:
+    repo = get_product_repository()
+    if repo is None:
         return {"totalProducts": 0, "activeProducts": 0, "platforms": {}}
     
     try:
-        products_collection = db["products"]
+        # 按平台統計（讀取平台匯總）
+        rows, freshness = await read_rollups("platform")
+        platforms = {}
+        for row in rows:
+            platform = row.get("platform") or "unknown"
+            platforms[platform] = platforms.get(platform, 0) + row.get("count", 0)
         
-        total_count = products_collection.count_documents({})
+        total_count = sum(platforms.values())
         active_count = total_count  # MongoDB 中所有產品都是 active
         
-        # 按平台統計
-        platforms = {}
-        pipeline = [
-            {"$group": {"_id": "$platform", "count": {"$sum": 1}}}
-        ]
-        for result in products_collection.aggregate(pipeline):
-            platform = result.get("_id") or "unknown"
-            platforms[platform] = result.get("count", 0)
-        
         return {
             "totalProducts": total_count,
             "activeProducts": active_count,
-            "platforms": platforms
+            "platforms": platforms,
+            "freshness": freshness
         }
     except Exception as e:
         print(f"[MongoDB Reader] 獲取統計失敗: {e}")
-        return {"totalProducts": 0, "activeProducts": 0, "platforms": {}}
-    finally:
-        mongodb.close()
+        raise
 
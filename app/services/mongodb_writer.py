@@ -1,18 +1,127 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from pydantic import BaseModel
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 from app.schemas.product import ProductWithCategories
+from app.services.product_search import build_search_tokens
+from app.services.product_metrics import compute_derived_fields
+from app.services.analytics_rollups import RollupScope, refresh_rollups
+from app.services.data_version import bump_data_version
 from app.db.mongodb import mongodb
+from app.config import settings
 from datetime import datetime
 
 
-def bulk_upsert_products_mongodb(data: List[ProductWithCategories], run_id: str | None = None) -> int:
-    """將產品資料寫入 MongoDB"""
+class BulkUpsertResult(BaseModel):
+    """批量 upsert 結果（產品部分）"""
+    inserted: int = 0
+    matched: int = 0
+    modified: int = 0
+    errors: int = 0
+    error_messages: List[str] = []
+
+    @property
+    def written(self) -> int:
+        """成功落庫的產品數（新插入 + 已存在並匹配）"""
+        return self.inserted + self.matched
+
+
+def _chunks(items: List[Any], size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _execute_bulk(collection, operations: List[UpdateOne], chunk_size: int, result: BulkUpsertResult) -> None:
+    """分批執行無序 bulk_write，並把每批結果累加到 result（部分失敗不會中斷其他批次）"""
+    for chunk in _chunks(operations, chunk_size):
+        try:
+            bulk = collection.bulk_write(chunk, ordered=False)
+            result.inserted += bulk.upserted_count
+            result.matched += bulk.matched_count
+            result.modified += bulk.modified_count
+        except BulkWriteError as e:
+            details = e.details or {}
+            write_errors = details.get("writeErrors", [])
+            result.inserted += details.get("nUpserted", 0)
+            result.matched += details.get("nMatched", 0)
+            result.modified += details.get("nModified", 0)
+            result.errors += len(write_errors)
+            result.error_messages.extend(err.get("errmsg", "") for err in write_errors[:5])
+        except Exception as e:
+            # 整批失敗（例如網絡錯誤），整批計為錯誤
+            result.errors += len(chunk)
+            result.error_messages.append(str(e))
+
+
+def _derived_fields_for(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """寫入時生成的字段：類型化指標 + 搜索詞元"""
+    return {
+        **compute_derived_fields(
+            doc.get("price"),
+            doc.get("review_count"),
+            doc.get("review_count_text"),
+            doc.get("rating"),
+        ),
+        "search_tokens": build_search_tokens(doc.get("name"), doc.get("description")),
+    }
+
+
+def _build_product_doc(item: ProductWithCategories, run_id: Optional[str]) -> Dict[str, Any]:
+    product_doc = {
+        "name": item.product.name,
+        "price": item.product.price,
+        "rating": item.product.rating,
+        "review_count_text": item.product.review_count_text,
+        "review_count": item.product.review_count,
+        "image_url": str(item.product.image_url) if item.product.image_url else None,
+        "product_url": str(item.product.product_url) if item.product.product_url else None,
+        "description": item.product.description,
+        "source_url": str(item.product.source_url) if item.product.source_url else None,
+        "content_hash": item.product.content_hash,
+        "platform": item.product.platform or "amazon",
+        "status": "draft",
+        "run_id": run_id,
+        "categories": [cat.name for cat in item.categories],
+    }
+    product_doc.update(_derived_fields_for(product_doc))
+    return product_doc
+
+
+# 匯總分組需要的產品字段（寫入前讀取已存在產品的舊值）
+_ROLLUP_SCOPE_FIELDS = {"product_url": 1, "name": 1, "platform": 1, "categories": 1, "run_id": 1, "created_at": 1}
+
+
+def _collect_rollup_scope(collection, products_by_key: Dict[tuple, Dict[str, Any]], chunk_size: int, now: datetime) -> RollupScope:
+    """收集本次寫入影響的匯總分組：新值 + 被覆蓋產品的舊值（舊批次 / 舊平台 / 創建日期）"""
+    scope = RollupScope()
+    for product in products_by_key.values():
+        scope.add_product({**product, "created_at": now})
+    
+    urls = sorted({url for url, _ in products_by_key if url})
+    for url_chunk in _chunks(urls, chunk_size):
+        for existing in collection.find({"product_url": {"$in": url_chunk}}, _ROLLUP_SCOPE_FIELDS):
+            if (existing.get("product_url"), existing.get("name")) in products_by_key:
+                scope.add_product(existing)
+    return scope
+
+
+def bulk_upsert_products_mongodb(
+    data: List[ProductWithCategories],
+    run_id: str | None = None,
+    chunk_size: Optional[int] = None,
+) -> BulkUpsertResult:
+    """將產品資料寫入 MongoDB（按批次無序 bulk_write）"""
+    result = BulkUpsertResult()
     if not data:
-        return 0
+        return result
     
-    db = mongodb.connect()
+    db = mongodb.get_database()
     if db is None:
         print("MongoDB 未設定，跳過 MongoDB 寫入")
-        return 0
+        return result
+    
+    chunk_size = max(1, chunk_size or settings.mongodb_bulk_chunk_size)
+    now = datetime.utcnow()
     
     try:
         products_collection = db["products"]
@@ -24,42 +133,30 @@ def bulk_upsert_products_mongodb(data: List[ProductWithCategories], run_id: str
             for cat in item.categories:
                 category_names.add(cat.name)
         
-        # 建立分類文件
-        for cat_name in category_names:
-            categories_collection.update_one(
+        category_ops = [
+            UpdateOne(
                 {"name": cat_name},
-                {"$set": {"name": cat_name, "updated_at": datetime.utcnow()}},
+                {"$set": {"name": cat_name, "updated_at": now}},
                 upsert=True
             )
+            for cat_name in sorted(category_names)
+        ]
+        category_result = BulkUpsertResult()
+        _execute_bulk(categories_collection, category_ops, chunk_size, category_result)
+        if category_result.errors:
+            print(f"MongoDB 分類寫入部分失敗: {category_result.errors} 個錯誤 {category_result.error_messages[:3]}")
         
-        # 2) 處理產品
-        products_to_insert = []
+        # 2) 處理產品（以 upsert 鍵去重，避免同一批次內重複鍵並發 upsert 產生重複文檔）
+        products_by_key: Dict[tuple, Dict[str, Any]] = {}
         for item in data:
-            product_doc = {
-                "name": item.product.name,
-                "price": item.product.price,
-                "rating": item.product.rating,
-                "review_count_text": item.product.review_count_text,
-                "review_count": item.product.review_count,
-                "image_url": str(item.product.image_url) if item.product.image_url else None,
-                "product_url": str(item.product.product_url) if item.product.product_url else None,
-                "description": item.product.description,
-                "source_url": str(item.product.source_url) if item.product.source_url else None,
-                "content_hash": item.product.content_hash,
-                "platform": item.product.platform or "amazon",
-                "status": "draft",
-                "run_id": run_id,
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow(),
-                "categories": [cat.name for cat in item.categories]
-            }
-            products_to_insert.append(product_doc)
+            product_doc = _build_product_doc(item, run_id)
+            products_by_key[(product_doc["product_url"], product_doc["name"])] = product_doc
+        
+        rollup_scope = _collect_rollup_scope(products_collection, products_by_key, chunk_size, now)
         
-        # 3) 批量 upsert 產品
-        for product in products_to_insert:
-            # 分离 created_at，只在插入时设置
-            created_at = product.pop("created_at", datetime.utcnow())
-            products_collection.update_one(
+        # 3) 批量 upsert 產品（created_at 只在插入時設置）
+        product_ops = [
+            UpdateOne(
                 {
                     "product_url": product["product_url"],
                     "name": product["name"]
@@ -67,19 +164,79 @@ def bulk_upsert_products_mongodb(data: List[ProductWithCategories], run_id: str
                 {
                     "$set": {
                         **product,
-                        "updated_at": datetime.utcnow()
+                        "updated_at": now
                     },
                     "$setOnInsert": {
-                        "created_at": created_at
+                        "created_at": now
                     }
                 },
                 upsert=True
             )
+            for product in products_by_key.values()
+        ]
+        _execute_bulk(products_collection, product_ops, chunk_size, result)
         
-        return len(products_to_insert)
+        # 4) 增量更新受影響的分析匯總，並讓只讀端點的響應緩存失效
+        refresh_rollups(rollup_scope, db)
+        if result.inserted or result.modified:
+            bump_data_version(db)
+        
+        if result.errors:
+            print(f"MongoDB 產品寫入部分失敗: {result.errors} 個錯誤 {result.error_messages[:3]}")
+        return result
         
     except Exception as e:
         print(f"MongoDB 寫入錯誤: {e}")
-        return 0
-    finally:
-        mongodb.close()
+        result.errors += len(data)
+        result.error_messages.append(str(e))
+        return result
+
+
+# 回填時需要讀取的原始字段
+_BACKFILL_SOURCE_FIELDS = {
+    "name": 1,
+    "description": 1,
+    "price": 1,
+    "rating": 1,
+    "review_count": 1,
+    "review_count_text": 1,
+}
+
+
+def backfill_derived_fields(chunk_size: Optional[int] = None, force: bool = False) -> BulkUpsertResult:
+    """為舊產品補寫寫入時生成的字段（派生指標與搜索詞元）
+
+    Args:
+        chunk_size: 每批 bulk_write 的操作數
+        force: 為 True 時重算所有產品（例如修改了計算公式之後）
+    """
+    result = BulkUpsertResult()
+    db = mongodb.get_database()
+    if db is None:
+        print("MongoDB 未設定，跳過回填")
+        return result
+    
+    chunk_size = max(1, chunk_size or settings.mongodb_bulk_chunk_size)
+    products_collection = db["products"]
+    query = {} if force else {"$or": [
+        {"search_tokens": {"$exists": False}},
+        {"competition_score": {"$exists": False}},
+    ]}
+    cursor = products_collection.find(query, _BACKFILL_SOURCE_FIELDS).batch_size(chunk_size)
+    
+    operations: List[UpdateOne] = []
+    for doc in cursor:
+        operations.append(UpdateOne(
+            {"_id": doc["_id"]},
+            {"$set": _derived_fields_for(doc)}
+        ))
+        if len(operations) >= chunk_size:
+            _execute_bulk(products_collection, operations, chunk_size, result)
+            operations = []
+    if operations:
+        _execute_bulk(products_collection, operations, chunk_size, result)
+    
+    if result.modified:
+        bump_data_version(db)
+    print(f"[MongoDB Writer] 回填派生字段: 更新 {result.modified} 個產品，錯誤 {result.errors}")
+    return result
@@ -0,0 +1,104 @@
+"""
+產品派生指標
+價格 / 評論數解析與利潤率、競爭度計算的唯一實現。
+寫入時計算一次並存為類型化字段（price_value, review_count, margin_rate,
+competition_score, competition_level），讀取和分析端直接使用存儲值
+"""
+
+import re
+from typing import Any, Dict, Optional
+
+
+def parse_price(price_str: Optional[Any]) -> float:
+    """解析價格字符串為數字"""
+    if price_str is None or price_str == "":
+        return 0.0
+    if isinstance(price_str, (int, float)):
+        return float(price_str)
+    cleaned = re.sub(r'[$,]', '', str(price_str))
+    try:
+        return float(cleaned)
+    except (ValueError, AttributeError):
+        return 0.0
+
+
+def parse_review_count(review_count_text: Optional[Any]) -> Optional[int]:
+    """从 review_count_text 解析评论数"""
+    if not review_count_text:
+        return None
+    # 移除逗号和其他字符，只保留数字
+    numbers = re.findall(r'\d+', str(review_count_text).replace(',', ''))
+    if numbers:
+        try:
+            return int(numbers[0])
+        except ValueError:
+            pass
+    return None
+
+
+def calculate_margin_rate(price: float) -> float:
+    """計算利潤率"""
+    if price <= 0:
+        return 0.0
+    cost = price * 0.6
+    margin = ((price - cost) / cost) * 100
+    return round(margin, 2)
+
+
+def calculate_competition_score(review_count: Optional[int], rating: Optional[float]) -> float:
+    """計算競爭度分數"""
+    score = 50.0
+
+    if review_count:
+        if review_count > 10000:
+            score += 30
+        elif review_count > 5000:
+            score += 20
+        elif review_count > 1000:
+            score += 10
+
+    if rating:
+        if rating >= 4.5:
+            score += 20
+        elif rating >= 4.0:
+            score += 10
+
+    return min(100.0, max(0.0, score))
+
+
+def get_competition_level(score: float) -> str:
+    """根據競爭度分數返回等級（與前端 Product 類保持一致：<30=low, 30-60=medium, >=60=high）"""
+    if score < 30:
+        return "low"
+    elif score < 60:  # 與前端 Product.competitionLevel getter 保持一致
+        return "medium"
+    else:
+        return "high"
+
+
+def compute_derived_fields(
+    price: Optional[Any],
+    review_count: Optional[int],
+    review_count_text: Optional[str],
+    rating: Optional[float],
+) -> Dict[str, Any]:
+    """計算寫入時存儲的派生字段
+
+    price_value 在價格缺失或無法解析時為 None，聚合中的 $avg 會自動忽略
+    """
+    price_value = parse_price(price)
+    if review_count is None:
+        review_count = parse_review_count(review_count_text)
+    competition_score = calculate_competition_score(review_count, rating)
+    return {
+        "price_value": price_value if price_value > 0 else None,
+        "review_count": review_count,
+        "margin_rate": calculate_margin_rate(price_value),
+        "competition_score": competition_score,
+        "competition_level": get_competition_level(competition_score),
+    }
+
+
+def has_derived_fields(product_doc: Dict[str, Any]) -> bool:
+    """文檔是否已經由寫入端 / 回填任務寫入派生字段"""
+    return "competition_score" in product_doc
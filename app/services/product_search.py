@@ -0,0 +1,81 @@
+"""
+產品全文搜索
+寫入時為每個產品生成小寫詞元（search_tokens），讀取時把搜索詞解析為：
+- 完整詞：走 MongoDB 文本索引（$text），按 textScore 相關度排序
+- 前綴詞（以 * 結尾，如 "shi*"）：對 search_tokens 做 ^ 錨定的前綴匹配，走普通索引
+用戶輸入一律轉義，不會作為正則直接傳給數據庫
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+
+_TOKEN_RE = re.compile(r"[0-9a-z]+")
+
+# 每個產品最多保存的詞元數、每次搜索最多使用的詞數
+MAX_TOKENS_PER_PRODUCT = 256
+MAX_QUERY_TERMS = 10
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """把文本切分為小寫字母數字詞元"""
+    if not text:
+        return []
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+def build_search_tokens(*texts: Optional[str]) -> List[str]:
+    """生成產品的去重詞元列表（保留首次出現順序）"""
+    tokens: List[str] = []
+    seen = set()
+    for text in texts:
+        for token in tokenize(text):
+            if token not in seen:
+                seen.add(token)
+                tokens.append(token)
+                if len(tokens) >= MAX_TOKENS_PER_PRODUCT:
+                    return tokens
+    return tokens
+
+
+def parse_search_query(search: str) -> Tuple[List[str], List[str]]:
+    """解析搜索詞，返回 (完整詞, 前綴詞)"""
+    terms: List[str] = []
+    prefixes: List[str] = []
+    for raw in search.split()[:MAX_QUERY_TERMS]:
+        is_prefix = raw.endswith("*")
+        tokens = tokenize(raw)
+        if not tokens:
+            continue
+        if is_prefix:
+            # "t-shi*" 之類的輸入：前面的部分當完整詞，最後一段當前綴
+            terms.extend(tokens[:-1])
+            prefixes.append(tokens[-1])
+        else:
+            terms.extend(tokens)
+    return terms, prefixes
+
+
+def build_search_filter(search: Optional[str]) -> Tuple[Dict[str, Any], bool]:
+    """構建搜索查詢條件
+
+    Returns:
+        (查詢條件, 是否使用文本相關度排序)
+    """
+    if not search:
+        return {}, False
+
+    terms, prefixes = parse_search_query(search)
+    conditions: List[Dict[str, Any]] = []
+
+    if terms:
+        conditions.append({"$text": {"$search": " ".join(terms)}})
+    for prefix in prefixes:
+        conditions.append({"search_tokens": {"$regex": f"^{re.escape(prefix)}"}})
+
+    if not conditions:
+        # 只包含標點等無效字符，返回一個不會命中的條件
+        return {"search_tokens": {"$in": []}}, False
+    if len(conditions) == 1:
+        return conditions[0], bool(terms)
+    return {"$and": conditions}, bool(terms)
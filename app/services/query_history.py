@@ -1,97 +1,107 @@
 """
 查询历史管理服务
-记录每次查询，保留最近5次查询的数据，自动清理旧数据
+记录每次查询；旧数据由数据保留任务（app/services/retention.py）在后台按批次清理
+
+查询历史同时作为按搜索词的结果缓存：每次爬取为每个搜索词记录一条（term_key 为规范化的搜索词，
+product_keys 为该词的商品），多关键词请求按词复用缓存，只爬取缺失的词。
+- 新鲜期内（settings.scrape_cache_max_age_seconds）直接使用
+- 之后的 settings.scrape_cache_stale_seconds 内仍可使用，同时在后台重新爬取（stale-while-revalidate）
+- 超过两者之和视为缺失
 """
 
-from app.db.mongodb import mongodb
-from datetime import datetime
-from typing import List, Dict, Optional
+import asyncio
+import re
+import unicodedata
+
+from app.config import settings
+from app.db.repositories import get_product_repository, get_query_history_repository
+from app.services.retention import RetentionPolicy, apply_retention
+from datetime import datetime, timedelta
+from typing import Any, List, Dict, Optional
+
+FRESH = "fresh"
+STALE = "stale"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_term(term: str) -> str:
+    """搜索词的规范形式（NFKC、小写、合并空白），用作结果缓存的键"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", term)).strip().lower()
+
+
+def cache_state(created_at: Optional[datetime], now: Optional[datetime] = None) -> Optional[str]:
+    """缓存条目的新鲜度：FRESH / STALE，过期返回 None"""
+    if created_at is None:
+        return None
+    age = ((now or datetime.utcnow()) - created_at).total_seconds()
+    if age < settings.scrape_cache_max_age_seconds:
+        return FRESH
+    if age < settings.scrape_cache_max_age_seconds + settings.scrape_cache_stale_seconds:
+        return STALE
+    return None
+
 
+async def save_query_history(
+    query_keyword: str,
+    run_id: str,
+    product_count: int,
+    term_products: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+) -> Dict:
+    """保存查询历史记录
 
-def save_query_history(query_keyword: str, run_id: str, product_count: int) -> Dict:
-    """保存查询历史记录"""
-    db = mongodb.connect()
-    if db is None:
+    term_products: 搜索词 -> 该词商品的 upsert 键（product_url、name）；提供时每个词记录一条，
+    供按词的结果缓存使用，否则只记录 query_keyword 一条
+    """
+    history_repo = get_query_history_repository()
+    if history_repo is None:
         print("MongoDB 未設定，跳過查詢歷史記錄")
         return {}
     
     try:
-        history_collection = db["query_history"]
-        
-        history_doc = {
-            "query_keyword": query_keyword,
-            "run_id": run_id,
-            "product_count": product_count,
-            "created_at": datetime.utcnow()
-        }
-        
-        result = history_collection.insert_one(history_doc)
-        print(f"[Query History] 保存查詢歷史: {query_keyword} -> {run_id}")
-        
-        # 清理旧数据（保留最近5次）
-        cleanup_old_queries(keep_count=5)
+        now = datetime.utcnow()
+        if term_products is None:
+            term_products = {query_keyword: None}
+        history_docs = []
+        for term, product_keys in term_products.items():
+            history_doc = {
+                "query_keyword": term,
+                "term_key": normalize_term(term),
+                "run_id": run_id,
+                "product_count": product_count if product_keys is None else len(product_keys),
+                "created_at": now
+            }
+            if product_keys is not None:
+                history_doc["product_keys"] = product_keys
+            history_docs.append(history_doc)
         
-        return history_doc
+        await history_repo.insert_many(history_docs)
+        print(f"[Query History] 保存查詢歷史: {', '.join(term_products)} -> {run_id}")
+        return history_docs[0]
     except Exception as e:
         print(f"[Query History] 保存失敗: {e}")
         return {}
-    finally:
-        mongodb.close()
 
 
-def cleanup_old_queries(keep_count: int = 5) -> int:
-    """清理旧的查询数据，只保留最近 N 次查询"""
-    db = mongodb.connect()
-    if db is None:
-        return 0
-    
+async def cleanup_old_queries(keep_count: int = 5) -> int:
+    """清理旧的查询数据，只保留最近 N 次爬取（按批次删除，见 app/services/retention.py），返回删除的产品数"""
     try:
-        history_collection = db["query_history"]
-        products_collection = db["products"]
-        
-        # 获取所有历史记录，按时间倒序
-        all_history = list(history_collection.find().sort("created_at", -1))
-        
-        if len(all_history) <= keep_count:
-            print(f"[Query History] 查詢記錄數 ({len(all_history)}) 不超過保留數 ({keep_count})，無需清理")
-            return 0
-        
-        # 需要删除的历史记录（最旧的）
-        to_delete = all_history[keep_count:]
-        deleted_count = 0
-        
-        for history in to_delete:
-            run_id = history.get("run_id")
-            if run_id:
-                # 删除该 run_id 对应的所有产品
-                result = products_collection.delete_many({"run_id": run_id})
-                deleted_products = result.deleted_count
-                deleted_count += deleted_products
-                print(f"[Query History] 刪除 run_id {run_id} 的 {deleted_products} 個產品")
-            
-            # 删除历史记录
-            history_collection.delete_one({"_id": history["_id"]})
-            print(f"[Query History] 刪除查詢歷史: {history.get('query_keyword')} ({run_id})")
-        
-        print(f"[Query History] 清理完成，刪除了 {len(to_delete)} 次查詢的數據，共 {deleted_count} 個產品")
-        return deleted_count
-        
+        result = await asyncio.to_thread(apply_retention, RetentionPolicy(keep_runs=max(1, keep_count)))
+        print(f"[Query History] 清理完成，刪除了 {len(result.run_ids)} 次查詢的數據，共 {result.products} 個產品")
+        return result.products
     except Exception as e:
         print(f"[Query History] 清理失敗: {e}")
         return 0
-    finally:
-        mongodb.close()
 
 
-def get_recent_queries(limit: int = 10) -> List[Dict]:
+async def get_recent_queries(limit: int = 10) -> List[Dict]:
     """获取最近的查询记录"""
-    db = mongodb.connect()
-    if db is None:
+    history_repo = get_query_history_repository()
+    if history_repo is None:
         return []
     
     try:
-        history_collection = db["query_history"]
-        queries = list(history_collection.find().sort("created_at", -1).limit(limit))
+        queries = await history_repo.find({}, sort=[("created_at", -1)], limit=limit)
         
         # 转换为可序列化的格式
         result = []
@@ -107,36 +117,30 @@ def get_recent_queries(limit: int = 10) -> List[Dict]:
     except Exception as e:
         print(f"[Query History] 獲取查詢歷史失敗: {e}")
         return []
-    finally:
-        mongodb.close()
 
 
-def get_query_count() -> int:
+async def get_query_count() -> int:
     """获取当前查询记录总数"""
-    db = mongodb.connect()
-    if db is None:
+    history_repo = get_query_history_repository()
+    if history_repo is None:
         return 0
     
     try:
-        history_collection = db["query_history"]
-        return history_collection.count_documents({})
+        return await history_repo.count({})
     except Exception as e:
         print(f"[Query History] 獲取查詢數量失敗: {e}")
         return 0
-    finally:
-        mongodb.close()
 
 
-def get_query_by_keyword(query_keyword: str) -> Optional[Dict]:
+async def get_query_by_keyword(query_keyword: str) -> Optional[Dict]:
     """根据查询关键词获取最近的查询记录"""
-    db = mongodb.connect()
-    if db is None:
+    history_repo = get_query_history_repository()
+    if history_repo is None:
         return None
     
     try:
-        history_collection = db["query_history"]
         # 查找相同关键词的最近一次查询
-        query = history_collection.find_one(
+        query = await history_repo.find_one(
             {"query_keyword": query_keyword},
             sort=[("created_at", -1)]
         )
@@ -152,33 +156,81 @@ def get_query_by_keyword(query_keyword: str) -> Optional[Dict]:
     except Exception as e:
         print(f"[Query History] 獲取查詢記錄失敗: {e}")
         return None
-    finally:
-        mongodb.close()
 
 
-def get_products_by_query_keyword(query_keyword: str) -> List[Dict]:
+async def get_products_by_query_keyword(query_keyword: str) -> List[Dict]:
     """根据查询关键词获取该查询的所有产品"""
-    db = mongodb.connect()
-    if db is None:
-        return []
-    
     try:
         # 先找到该关键词的查询记录
-        query_record = get_query_by_keyword(query_keyword)
+        query_record = await get_query_by_keyword(query_keyword)
         if not query_record or not query_record.get("run_id"):
             return []
         
-        run_id = query_record["run_id"]
-        products_collection = db["products"]
-        
-        # 获取该 run_id 的所有产品
-        products = list(products_collection.find({"run_id": run_id}))
+        products = await get_products_by_run_id(query_record["run_id"])
         print(f"[Query History] 找到關鍵詞 '{query_keyword}' 的 {len(products)} 個產品")
         
         return products
     except Exception as e:
         print(f"[Query History] 獲取產品失敗: {e}")
         return []
-    finally:
-        mongodb.close()
 
+
+async def get_products_by_run_id(run_id: str) -> List[Dict]:
+    """获取某次爬取任务写入的所有产品"""
+    products_repo = get_product_repository()
+    if products_repo is None:
+        return []
+    return await products_repo.find({"run_id": run_id})
+
+
+async def get_cached_terms(terms: List[str]) -> Dict[str, Dict[str, Any]]:
+    """按规范化的搜索词读取结果缓存
+
+    返回 term_key -> {"run_id", "created_at", "state", "products"}，只包含新鲜或可陈旧使用、
+    且商品仍全部存在的条目（商品已被清理的视为缺失）
+    """
+    history_repo = get_query_history_repository()
+    products_repo = get_product_repository()
+    term_keys = list(dict.fromkeys(normalize_term(term) for term in terms))
+    if history_repo is None or products_repo is None or not term_keys:
+        return {}
+    
+    try:
+        now = datetime.utcnow()
+        oldest = now - timedelta(seconds=settings.scrape_cache_max_age_seconds + settings.scrape_cache_stale_seconds)
+        history = await history_repo.find(
+            {"term_key": {"$in": term_keys}, "created_at": {"$gt": oldest}},
+            sort=[("created_at", -1)]
+        )
+        latest: Dict[str, Dict[str, Any]] = {}
+        for entry in history:
+            latest.setdefault(entry["term_key"], entry)
+        
+        # 一次查询取回所有词的商品，再按记录的顺序分配
+        urls = {key["product_url"] for entry in latest.values() for key in entry.get("product_keys") or []}
+        by_key: Dict[tuple, Dict] = {}
+        if urls:
+            for product in await products_repo.find({"product_url": {"$in": list(urls)}}):
+                by_key[(product.get("product_url"), product.get("name"))] = product
+        
+        cached = {}
+        for term_key, entry in latest.items():
+            if "product_keys" in entry:
+                products = [by_key.get((key["product_url"], key["name"])) for key in entry["product_keys"]]
+                if not products or any(product is None for product in products):
+                    continue
+            else:
+                # 早期的记录只有 run_id
+                products = await products_repo.find({"run_id": entry["run_id"]})
+                if not products:
+                    continue
+            cached[term_key] = {
+                "run_id": entry["run_id"],
+                "created_at": entry["created_at"],
+                "state": cache_state(entry["created_at"], now),
+                "products": products,
+            }
+        return cached
+    except Exception as e:
+        print(f"[Query History] 讀取結果緩存失敗: {e}")
+        return {}
@@ -0,0 +1,224 @@
+"""
+只讀 API 響應緩存
+鍵 = 端點路徑 + 規範化後的查詢參數 + 數據版本號（app/services/data_version.py）。
+寫入端 / 清理端遞增版本號後，舊條目不會再被命中，無需逐條失效。
+
+兩級緩存：
+- 進程內 LRU（帶 TTL）
+- 可選的共享層（SharedCacheBackend），多個進程共用；內置 InMemorySharedBackend
+  作為本地替身，接入 Redis 等只需實現 get / set
+"""
+
+import base64
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from app.config import settings
+
+
+class CachedResponse:
+    """緩存的 HTTP 響應（狀態碼固定為 200）"""
+
+    __slots__ = ("headers", "body")
+
+    def __init__(self, headers: List[Tuple[bytes, bytes]], body: bytes):
+        self.headers = headers
+        self.body = body
+
+    def to_bytes(self) -> bytes:
+        return json.dumps({
+            "headers": [[k.decode("latin-1"), v.decode("latin-1")] for k, v in self.headers],
+            "body": base64.b64encode(self.body).decode("ascii"),
+        }).encode("utf-8")
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CachedResponse":
+        payload = json.loads(data)
+        return cls(
+            [(k.encode("latin-1"), v.encode("latin-1")) for k, v in payload["headers"]],
+            base64.b64decode(payload["body"]),
+        )
+
+
+class SharedCacheBackend(ABC):
+    """跨進程共享的緩存層接口"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl_seconds: int) -> None:
+        ...
+
+
+class InMemorySharedBackend(SharedCacheBackend):
+    """共享層的本地替身（單進程內有效，用於開發和測試）"""
+
+    def __init__(self):
+        self._items: Dict[str, Tuple[float, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._items[key]
+                return None
+            return value
+
+    def set(self, key: str, value: bytes, ttl_seconds: int) -> None:
+        with self._lock:
+            self._items[key] = (time.monotonic() + ttl_seconds, value)
+
+
+# 按端點統計的路徑數上限（/api/products/{id} 等路徑不會無限增長）
+MAX_TRACKED_ENDPOINTS = 100
+
+SHARED_BACKENDS = {
+    "memory": InMemorySharedBackend,
+}
+
+
+class LRUCache:
+    """線程安全的進程內 LRU 緩存（帶 TTL）"""
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._items: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+def normalize_query(query_string: str) -> str:
+    """規範化查詢參數：按鍵排序、去掉空值，使 ?b=1&a=2 與 ?a=2&b=1&c= 共用一個條目
+
+    只按鍵穩定排序：重複參數（?a=2&a=1）的順序會影響端點解析出的值，必須保留
+    """
+    pairs = parse_qsl(query_string, keep_blank_values=False)
+    return urlencode(sorted(pairs, key=lambda kv: kv[0]))
+
+
+def cache_key(path: str, query_string: str, version: int) -> str:
+    return f"v{version}:{path}?{normalize_query(query_string)}"
+
+
+class ResponseCache:
+    """兩級響應緩存與命中統計"""
+
+    def __init__(self):
+        self.local = LRUCache(settings.response_cache_max_entries, settings.response_cache_ttl_seconds)
+        backend_cls = SHARED_BACKENDS.get(settings.response_cache_shared_backend)
+        self.shared: Optional[SharedCacheBackend] = backend_cls() if backend_cls else None
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Dict[str, int]] = {}
+        self._invalidations = 0
+
+    def _count(self, path: str, field: str) -> None:
+        with self._lock:
+            if path not in self._metrics and len(self._metrics) >= MAX_TRACKED_ENDPOINTS:
+                path = "other"
+            endpoint = self._metrics.setdefault(path, {"local_hits": 0, "shared_hits": 0, "misses": 0})
+            endpoint[field] += 1
+
+    def observe_version(self, version: int) -> None:
+        """數據版本變化時清空進程內條目（舊版本的鍵不會再被命中，提前釋放內存）"""
+        with self._lock:
+            changed = self._version is not None and version != self._version
+            self._version = version
+            if changed:
+                self._invalidations += 1
+        if changed:
+            self.local.clear()
+
+    def get(self, path: str, key: str) -> Optional[CachedResponse]:
+        cached = self.local.get(key)
+        if cached is not None:
+            self._count(path, "local_hits")
+            return cached
+
+        if self.shared is not None:
+            try:
+                data = self.shared.get(key)
+            except Exception as e:
+                print(f"[Response Cache] 讀取共享緩存失敗: {e}")
+                data = None
+            if data is not None:
+                cached = CachedResponse.from_bytes(data)
+                self.local.set(key, cached)
+                self._count(path, "shared_hits")
+                return cached
+
+        self._count(path, "misses")
+        return None
+
+    def set(self, key: str, response: CachedResponse) -> None:
+        self.local.set(key, response)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, response.to_bytes(), settings.response_cache_ttl_seconds)
+            except Exception as e:
+                print(f"[Response Cache] 寫入共享緩存失敗: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            endpoints = {path: dict(counts) for path, counts in self._metrics.items()}
+            invalidations = self._invalidations
+        totals = {"local_hits": 0, "shared_hits": 0, "misses": 0}
+        for counts in endpoints.values():
+            for field in totals:
+                totals[field] += counts[field]
+        lookups = sum(totals.values())
+        return {
+            "enabled": settings.response_cache_enabled,
+            "data_version": self._version,
+            "entries": len(self.local),
+            "max_entries": self.local.max_entries,
+            "ttl_seconds": self.local.ttl_seconds,
+            "shared_backend": settings.response_cache_shared_backend or None,
+            "evictions": self.local.evictions,
+            "invalidations": invalidations,
+            **totals,
+            "hit_rate": round((totals["local_hits"] + totals["shared_hits"]) / lookups, 4) if lookups else 0,
+            "endpoints": endpoints,
+        }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,203 @@
+"""
+數據保留（retention）
+以爬取批次（run_id）為單位清理舊數據：先用索引查詢選出過期的批次，
+再按 settings.retention_batch_size 分批用 $in 刪除 products 和 query_history。
+
+批次來自查詢歷史（成功的任務），以及寫入了產品但沒有查詢歷史的批次（失敗 / 取消的任務，
+商品在爬取過程中已分批寫入；按最近一次寫入時間排序）；仍在排隊 / 運行中的任務不會被清理。
+
+策略可以組合，滿足任一條件的批次即過期（0 表示不啟用）：
+- keep_runs：只保留最近 N 個批次
+- max_age_seconds：刪除最近一次查詢早於此時長的批次
+- max_products：products 總數超過預算時，從最舊的批次開始刪除直到不超過預算
+
+後台按 settings.retention_interval_seconds 定期執行（app/api/main.py 啟動），不在爬取請求路徑上；
+也可以通過 scripts/run_retention.py 手動執行。
+"""
+
+import asyncio
+import heapq
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from pydantic import BaseModel
+
+from app.config import settings
+from app.db.mongodb import mongodb
+from app.scrapers.http_cache import prune_detail_cache
+from app.services.analytics_rollups import RollupScope, refresh_rollups
+from app.services.data_version import bump_data_version
+
+
+HISTORY_COLLECTION = "query_history"
+PRODUCT_COLLECTION = "products"
+JOB_COLLECTION = "scrape_jobs"
+# 進行中的任務狀態（與 app/services/scrape_jobs.py 的 ACTIVE_STATUSES 相同）
+_ACTIVE_JOB_STATUSES = ["queued", "running"]
+
+# 記錄被刪除產品所在的匯總分組需要的字段
+_ROLLUP_SCOPE_FIELDS = {"platform": 1, "categories": 1, "run_id": 1, "created_at": 1}
+
+
+class RetentionPolicy(BaseModel):
+    """保留策略（0 表示不啟用該條件）"""
+    keep_runs: int = 0
+    max_age_seconds: int = 0
+    max_products: int = 0
+
+    @classmethod
+    def from_settings(cls) -> "RetentionPolicy":
+        return cls(
+            keep_runs=settings.retention_keep_runs,
+            max_age_seconds=settings.retention_max_age_seconds,
+            max_products=settings.retention_max_products,
+        )
+
+
+class RetentionResult(BaseModel):
+    """一次清理的結果"""
+    run_ids: List[str] = []  # 過期的批次（最舊的在前）
+    products: int = 0  # 刪除的產品數
+    history: int = 0  # 刪除的查詢歷史記錄數
+    dry_run: bool = False
+
+
+def _history_runs(db) -> List[Tuple[str, datetime]]:
+    """查詢歷史中的批次，按最近一次查詢時間倒序（created_at 索引，只讀取 run_id 和時間）"""
+    seen = set()
+    runs = []
+    cursor = db[HISTORY_COLLECTION].find(
+        {"run_id": {"$ne": None}},
+        {"_id": 0, "run_id": 1, "created_at": 1},
+    ).sort("created_at", -1).batch_size(1000)
+    for doc in cursor:
+        if doc["run_id"] not in seen:
+            seen.add(doc["run_id"])
+            runs.append((doc["run_id"], doc.get("created_at")))
+    return runs
+
+
+def _chunks(values: List[str], size: int) -> Iterator[List[str]]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _run_time(run: Tuple[str, Optional[datetime]]) -> datetime:
+    return run[1] or datetime.min
+
+
+def _runs_without_history(db, known: Set[str], batch_size: int) -> List[Tuple[str, datetime]]:
+    """寫入了產品但沒有查詢歷史的批次，按最近一次寫入時間倒序（不含進行中的任務）"""
+    run_ids = [run_id for run_id in db[PRODUCT_COLLECTION].distinct("run_id") if run_id and run_id not in known]
+    runs = []
+    for batch in _chunks(run_ids, batch_size):
+        active = {
+            job["_id"]
+            for job in db[JOB_COLLECTION].find(
+                {"_id": {"$in": batch}, "status": {"$in": _ACTIVE_JOB_STATUSES}}, {"_id": 1}
+            )
+        }
+        candidates = [run_id for run_id in batch if run_id not in active]
+        if not candidates:
+            continue
+        for row in db[PRODUCT_COLLECTION].aggregate([
+            {"$match": {"run_id": {"$in": candidates}}},
+            {"$group": {"_id": "$run_id", "last_written": {"$max": {"$ifNull": ["$updated_at", "$created_at"]}}}},
+        ]):
+            runs.append((row["_id"], row["last_written"]))
+    runs.sort(key=_run_time, reverse=True)
+    return runs
+
+
+def _runs_newest_first(db, batch_size: int) -> Iterator[Tuple[str, datetime]]:
+    """按時間倒序遍歷所有批次（查詢歷史中的批次 + 沒有查詢歷史的批次）"""
+    history = _history_runs(db)
+    orphans = _runs_without_history(db, {run_id for run_id, _ in history}, batch_size)
+    return heapq.merge(history, orphans, key=_run_time, reverse=True)
+
+
+def _product_counts(db, run_ids: List[str], batch_size: int) -> Dict[str, int]:
+    """各批次的產品數（run_id 索引，按批聚合）"""
+    counts: Dict[str, int] = {}
+    for batch in _chunks(run_ids, batch_size):
+        for row in db[PRODUCT_COLLECTION].aggregate([
+            {"$match": {"run_id": {"$in": batch}}},
+            {"$group": {"_id": "$run_id", "count": {"$sum": 1}}},
+        ]):
+            counts[row["_id"]] = row["count"]
+    return counts
+
+
+def select_expired_runs(db, policy: RetentionPolicy, now: Optional[datetime] = None) -> List[str]:
+    """按策略選出過期的批次，最舊的在前"""
+    now = now or datetime.utcnow()
+    batch_size = max(1, settings.retention_batch_size)
+    cutoff = now - timedelta(seconds=policy.max_age_seconds) if policy.max_age_seconds else None
+
+    kept: List[str] = []  # 最新的在前
+    expired: List[str] = []
+    for index, (run_id, created_at) in enumerate(_runs_newest_first(db, batch_size)):
+        if policy.keep_runs and index >= policy.keep_runs:
+            expired.append(run_id)
+        elif cutoff is not None and created_at is not None and created_at < cutoff:
+            expired.append(run_id)
+        else:
+            kept.append(run_id)
+
+    expired.reverse()  # 最舊的在前；保留的批次都比已過期的新
+    if policy.max_products and kept:
+        # 文檔預算：扣除已過期批次的產品後仍超出時，從最舊的保留批次開始刪除
+        total = db[PRODUCT_COLLECTION].estimated_document_count()
+        counts = _product_counts(db, expired + kept, batch_size)
+        excess = total - sum(counts.get(run_id, 0) for run_id in expired) - policy.max_products
+        while excess > 0 and kept:
+            run_id = kept.pop()
+            expired.append(run_id)
+            excess -= counts.get(run_id, 0)
+    return expired
+
+
+def delete_runs(db, run_ids: List[str], batch_size: Optional[int] = None) -> RetentionResult:
+    """分批刪除批次的產品和查詢歷史，並增量更新受影響的分析匯總"""
+    result = RetentionResult(run_ids=run_ids)
+    batch_size = max(1, batch_size or settings.retention_batch_size)
+    for batch in _chunks(run_ids, batch_size):
+        scope = RollupScope()
+        for product in db[PRODUCT_COLLECTION].find({"run_id": {"$in": batch}}, _ROLLUP_SCOPE_FIELDS):
+            scope.add_product(product)
+        result.products += db[PRODUCT_COLLECTION].delete_many({"run_id": {"$in": batch}}).deleted_count
+        result.history += db[HISTORY_COLLECTION].delete_many({"run_id": {"$in": batch}}).deleted_count
+        refresh_rollups(scope, db)
+    if result.products:
+        bump_data_version(db)
+    return result
+
+
+def apply_retention(policy: Optional[RetentionPolicy] = None, db=None, dry_run: bool = False) -> RetentionResult:
+    """按策略清理過期的批次（同步 PyMongo；dry_run 時只返回將被刪除的批次）"""
+    db = db if db is not None else mongodb.get_database()
+    if db is None:
+        return RetentionResult(dry_run=dry_run)
+    policy = policy or RetentionPolicy.from_settings()
+
+    run_ids = select_expired_runs(db, policy)
+    if dry_run or not run_ids:
+        return RetentionResult(run_ids=run_ids, dry_run=dry_run)
+
+    result = delete_runs(db, run_ids)
+    print(f"[Retention] 清理 {len(run_ids)} 個批次：刪除 {result.products} 個產品、{result.history} 條查詢歷史")
+    return result
+
+
+async def run_retention_schedule() -> None:
+    """後台定期執行數據保留和詳情頁面緩存清理（啟動後先執行一次；同步 PyMongo 和文件操作放到線程中執行）"""
+    while True:
+        try:
+            await asyncio.to_thread(apply_retention)
+        except Exception as e:
+            print(f"[Retention] 清理失敗: {e}")
+        try:
+            await asyncio.to_thread(prune_detail_cache)
+        except Exception as e:
+            print(f"[Detail Cache] 清理失敗: {e}")
+        await asyncio.sleep(max(1, settings.retention_interval_seconds))
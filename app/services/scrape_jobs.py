@@ -0,0 +1,604 @@
+"""
+後台爬取任務
+爬蟲是同步阻塞的（requests + time.sleep 延遲），在 async 端點中直接調用會卡住整個事件循環。
+任務提交到有界的線程池中執行，API 事件循環只負責排隊和查詢狀態：
+
+- 任務記錄保存在 scrape_jobs collection（_id 為 run_id），並在進程內保留一份最新快照
+- 狀態：queued → running → succeeded / failed / cancelled
+- 按關鍵詞記錄進度；取消時設置事件，爬蟲在每個請求前檢查並盡快停止
+- 爬取進度通過 CrawlCheckpoint 增量保存，商品分批寫入 products；失敗或取消的任務
+  可以按 run_id 恢復（resume），跳過已完成的關鍵詞和詳情頁面
+- 任務可以註冊監聽器（流式響應）：工作線程在任務開始、關鍵詞狀態變化、商品寫入後
+  和任務結束時推送事件；流式任務按 settings.scrape_stream_flush_batch_size 小批寫入，
+  不在內存中保留已寫入的商品
+- 相同關鍵詞集合和參數的任務通過 scrape_leases 租約去重（single-flight，跨 worker 生效）：
+  提交時租約已被進行中的任務持有則附加到該任務，不再重複爬取
+- 工作線程只使用同步 PyMongo；查詢歷史（異步倉儲，綁定 API 事件循環）通過
+  run_coroutine_threadsafe 提交回 API 事件循環執行
+"""
+
+import asyncio
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic import BaseModel
+from pymongo.errors import PyMongoError
+
+from app.config import settings
+from app.db.mongodb import mongodb
+from app.db.repositories import get_scrape_job_repository
+from app.pipelines.beautifulsoup_adapter import beautifulsoup_to_product_with_categories
+from app.schemas.product import ProductWithCategories
+from app.scrapers.beautifulsoup_scraper import BeautifulSoupScraper
+from app.services.crawl_checkpoint import CrawlCheckpoint
+from app.services.mongodb_writer import bulk_upsert_products_mongodb
+from app.services.query_history import save_query_history
+from app.services.scrape_leases import ScrapeLeaseStore, single_flight_key
+
+
+JOB_COLLECTION = "scrape_jobs"
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+SKIPPED = "skipped"  # 關鍵詞狀態：商品數已達上限
+
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+FINISHED_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+SOURCE_URL = "https://www.amazon.com/"
+
+# 工作線程等待 API 事件循環保存查詢歷史的最長時間（秒）；
+# 關閉應用時事件循環不再執行提交的協程，不設上限會讓工作線程一直阻塞
+HISTORY_SAVE_TIMEOUT_SECONDS = 30
+
+
+class JobQueueFullError(RuntimeError):
+    """排隊中的任務已達上限"""
+
+
+class JobNotFoundError(KeyError):
+    """任務不存在（或不屬於本進程，無法取消）"""
+
+
+class JobNotResumableError(RuntimeError):
+    """任務仍在執行或已成功完成，不能恢復"""
+
+
+class ProductWriteError(RuntimeError):
+    """一批商品沒有全部寫入 products（checkpoint 保留整批商品，稍後重試；upsert 保證冪等）"""
+
+
+class ScrapeJobOutcome(BaseModel):
+    """任務結束後返回給等待方的結果"""
+    run_id: str
+    status: str
+    message: str = ""
+    error: Optional[str] = None  # 任務異常終止時的錯誤信息
+    written: int = 0
+    products: List[ProductWithCategories] = []
+
+
+JobListener = Callable[[Dict[str, Any]], None]
+
+
+class _JobHandle:
+    def __init__(self, record: Dict[str, Any]):
+        self.record = record
+        self.cancel_event = threading.Event()
+        self.future: Optional[Future] = None
+        self.listeners: List[JobListener] = []
+
+
+def _product_keys(products: List[Optional[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """商品在 products 中的 upsert 鍵（與寫入端相同的轉換），供按關鍵詞的結果緩存使用"""
+    return [
+        {"product_url": str(item.product.product_url) if item.product.product_url else None, "name": item.product.name}
+        for item in beautifulsoup_to_product_with_categories([p for p in products if p], SOURCE_URL)
+    ]
+
+
+def _serialize(record: Dict[str, Any]) -> Dict[str, Any]:
+    """任務記錄轉換為 API 響應"""
+    result = {key: value for key, value in record.items() if key != "_id"}
+    result["run_id"] = record["_id"]
+    for key in ("created_at", "started_at", "finished_at"):
+        if isinstance(result.get(key), datetime):
+            result[key] = result[key].isoformat()
+    return result
+
+
+class ScrapeJobManager:
+    """進程內的爬取任務隊列（有界線程池 + 持久化任務記錄）"""
+
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._jobs: Dict[str, _JobHandle] = {}
+        self._lock = threading.Lock()
+        self.leases = ScrapeLeaseStore()
+        self._renew_stop = threading.Event()
+        self._renew_thread: Optional[threading.Thread] = None
+
+    # ---- 生命週期 ----
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        """應用啟動時調用：建立線程池並記錄 API 事件循環"""
+        self._loop = loop
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=max(1, settings.scrape_max_workers),
+                thread_name_prefix="scrape-job"
+            )
+        if self._renew_thread is None:
+            self._renew_stop.clear()
+            self._renew_thread = threading.Thread(target=self._renew_leases, name="scrape-lease", daemon=True)
+            self._renew_thread.start()
+
+    def shutdown(self) -> None:
+        """應用關閉時調用：通知運行中的任務停止，丟棄排隊中的任務"""
+        with self._lock:
+            handles = list(self._jobs.values())
+        for handle in handles:
+            handle.cancel_event.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._renew_stop.set()
+        self._renew_thread = None
+
+    def _renew_leases(self) -> None:
+        """定期為排隊中 / 運行中的任務續約（續約間隔為租約時長的三分之一）"""
+        while not self._renew_stop.wait(self.leases.lease_seconds / 3):
+            with self._lock:
+                leases = [
+                    (h.record["flight_key"], rid)
+                    for rid, h in self._jobs.items()
+                    if h.record["status"] in ACTIVE_STATUSES
+                ]
+            try:
+                self.leases.renew(leases)
+            except Exception as e:
+                print(f"[Scrape Jobs] 續約失敗: {e}")
+
+    def recover_interrupted(self) -> int:
+        """把上次進程退出時仍未結束的任務標記為失敗（同步，啟動時在線程中調用）
+
+        租約仍有效的任務屬於其他 worker，不受影響。
+        """
+        db = mongodb.get_database()
+        if db is None:
+            return 0
+        interrupted = [
+            job["_id"]
+            for job in db[JOB_COLLECTION].find({"status": {"$in": list(ACTIVE_STATUSES)}}, {"flight_key": 1})
+            if not job.get("flight_key") or self.leases.holder(job["flight_key"]) != job["_id"]
+        ]
+        if not interrupted:
+            return 0
+        result = db[JOB_COLLECTION].update_many(
+            {"_id": {"$in": interrupted}, "status": {"$in": list(ACTIVE_STATUSES)}},
+            {"$set": {"status": FAILED, "error": "interrupted by server restart", "finished_at": datetime.utcnow()}}
+        )
+        if result.modified_count:
+            print(f"[Scrape Jobs] 標記 {result.modified_count} 個中斷的任務為失敗")
+        return result.modified_count
+
+    # ---- 記錄 ----
+
+    def _persist(self, handle: _JobHandle, fields: Dict[str, Any]) -> None:
+        """更新進程內快照並寫入 scrape_jobs（寫入失敗不影響任務執行）"""
+        with self._lock:
+            handle.record.update(fields)
+            record = dict(handle.record)
+        db = mongodb.get_database()
+        if db is None:
+            return
+        try:
+            db[JOB_COLLECTION].replace_one({"_id": record["_id"]}, record, upsert=True)
+        except Exception as e:
+            print(f"[Scrape Jobs] 保存任務記錄失敗: {e}")
+
+    def _update_term(self, handle: _JobHandle, index: int, **fields: Any) -> None:
+        with self._lock:
+            terms = [dict(term) for term in handle.record["terms"]]
+        terms[index].update(fields)
+        self._persist(handle, {"terms": terms})
+        self._emit(handle, {"event": "term", "index": index, **terms[index]})
+
+    def _emit(self, handle: _JobHandle, event: Dict[str, Any]) -> None:
+        """把事件推送給任務的監聽器（監聽器出錯不影響任務執行）"""
+        with self._lock:
+            listeners = list(handle.listeners)
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"[Scrape Jobs] 推送任務事件失敗: {e}")
+
+    def _flush_products(self, handle: _JobHandle, batch: List[Dict[str, Any]]) -> int:
+        """checkpoint 寫入回調：整批寫入 products 後才推送給監聽器
+
+        bulk_upsert_products_mongodb 不拋出異常，失敗記錄在 result.errors 中；
+        有失敗時推送 write_error 事件（不推送商品，客戶端不會看到沒有落庫的商品），
+        並拋出 ProductWriteError，讓 checkpoint 保留這批商品而不是標記為已寫入
+        """
+        product_with_categories = beautifulsoup_to_product_with_categories(batch, SOURCE_URL)
+        result = bulk_upsert_products_mongodb(product_with_categories, run_id=handle.record["_id"])
+        if result.errors:
+            error = f"{result.errors} of {len(batch)} products not written: {'; '.join(result.error_messages[:3])}"
+            self._emit(handle, {"event": "write_error", "products": len(batch), "error": error})
+            raise ProductWriteError(error)
+        self._emit(handle, {"event": "products", "products": product_with_categories})
+        return result.written
+
+    # ---- 提交 / 取消 / 查詢 ----
+
+    def submit(
+        self,
+        search_terms: List[str],
+        fetch_details: bool,
+        max_products: int,
+        run_id: str,
+        resumes: int = 0,
+        listener: Optional[JobListener] = None,
+    ) -> str:
+        """提交任務，返回 run_id；排隊任務已滿時拋出 JobQueueFullError
+
+        相同關鍵詞集合和參數（fetch_details、max_products）的任務進行中時不提交新任務，返回進行中任務的 run_id（調用方據此附加等待）。
+        listener: 任務事件回調（在工作線程中調用）；註冊了監聽器的任務為流式任務
+        同步寫入任務記錄和租約（PyMongo），事件循環中通過 asyncio.to_thread 調用
+        """
+        if self._executor is None:
+            raise RuntimeError("scrape job manager is not started")
+
+        with self._lock:
+            queued = sum(1 for h in self._jobs.values() if h.record["status"] == QUEUED)
+            if queued >= settings.scrape_max_queued_jobs:
+                raise JobQueueFullError(f"too many queued scrape jobs ({queued})")
+
+        flight_key = single_flight_key(search_terms, fetch_details, max_products)
+        try:
+            holder = self.leases.acquire(flight_key, run_id)
+        except PyMongoError as e:
+            # 租約不可用時不去重，照常執行
+            print(f"[Scrape Jobs] 取得租約失敗: {e}")
+            holder = None
+        if holder is not None:
+            print(f"[Scrape Jobs] 相同關鍵詞和參數的任務 {holder} 進行中，附加到該任務")
+            return holder
+
+        record = {
+            "_id": run_id,
+            "status": QUEUED,
+            "search_terms": search_terms,
+            "query_keyword": search_terms[0] if search_terms else "unknown",
+            "fetch_details": fetch_details,
+            "max_products": max_products,
+            "terms": [{"term": term, "status": QUEUED, "products": 0} for term in search_terms],
+            "progress": {"terms_total": len(search_terms), "terms_done": 0, "current_term": None, "products_found": 0},
+            "products_count": 0,
+            "written": 0,
+            "message": "",
+            "error": None,
+            "cancel_requested": False,
+            "resumes": resumes,
+            "stream": listener is not None,
+            "flight_key": flight_key,
+            "created_at": datetime.utcnow(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        handle = _JobHandle(record)
+        if listener is not None:
+            handle.listeners.append(listener)
+        with self._lock:
+            self._jobs[run_id] = handle
+        self._persist(handle, {})
+        handle.future = self._executor.submit(self._run, handle)
+        print(f"[Scrape Jobs] 任務 {run_id} 已排隊，關鍵詞: {search_terms}")
+        return run_id
+
+    async def resume(self, run_id: str) -> str:
+        """恢復失敗或取消的任務（同一個 run_id，已完成的工作從 checkpoint 跳過）"""
+        with self._lock:
+            handle = self._jobs.get(run_id)
+            record = dict(handle.record) if handle is not None else None
+        if record is None:
+            job_repo = get_scrape_job_repository()
+            record = await job_repo.find_one({"_id": run_id}) if job_repo is not None else None
+        if record is None:
+            raise JobNotFoundError(run_id)
+        if record["status"] not in (FAILED, CANCELLED):
+            raise JobNotResumableError(f"scrape job {run_id} is {record['status']}")
+
+        print(f"[Scrape Jobs] 恢復任務 {run_id}")
+        holder = await asyncio.to_thread(
+            self.submit,
+            record["search_terms"],
+            record["fetch_details"],
+            record["max_products"],
+            run_id,
+            resumes=record.get("resumes", 0) + 1,
+        )
+        if holder != run_id:
+            raise JobNotResumableError(f"identical scrape job {holder} is in flight")
+        return run_id
+
+    def unsubscribe(self, run_id: str, listener: JobListener) -> None:
+        """移除監聽器（客戶端斷開時調用，任務繼續執行）"""
+        with self._lock:
+            handle = self._jobs.get(run_id)
+            if handle is not None and listener in handle.listeners:
+                handle.listeners.remove(listener)
+
+    async def wait(self, run_id: str) -> ScrapeJobOutcome:
+        """在事件循環中等待任務結束（不阻塞其他請求）"""
+        with self._lock:
+            handle = self._jobs.get(run_id)
+        if handle is None or handle.future is None:
+            raise JobNotFoundError(run_id)
+        try:
+            # shield：等待方（HTTP 請求）斷開時不連帶取消排隊中的任務
+            return await asyncio.shield(asyncio.wrap_future(handle.future))
+        except asyncio.CancelledError:
+            # 排隊中的任務被取消時 future 直接被取消
+            if handle.future.cancelled():
+                return ScrapeJobOutcome(run_id=run_id, status=CANCELLED, message="Scrape job cancelled")
+            raise
+
+    async def wait_finished(self, run_id: str) -> Dict[str, Any]:
+        """等待任務結束並返回任務狀態（附加到的任務可能在其他 worker 中執行）
+
+        其他 worker 的任務按 settings.scrape_attach_poll_seconds 輪詢 scrape_jobs；
+        租約失效（持有方崩潰）而任務仍未結束時標記為失敗。
+        """
+        with self._lock:
+            handle = self._jobs.get(run_id)
+        if handle is not None and handle.future is not None:
+            await self.wait(run_id)
+            with self._lock:
+                return _serialize(dict(handle.record))
+
+        while True:
+            status = await self.get_status(run_id)
+            if status is None:
+                raise JobNotFoundError(run_id)
+            if status["status"] in FINISHED_STATUSES:
+                return status
+            holder = await asyncio.to_thread(self.leases.holder, status.get("flight_key") or "")
+            if holder != run_id:
+                await asyncio.to_thread(self._mark_abandoned, run_id)
+                return await self.get_status(run_id)
+            await asyncio.sleep(settings.scrape_attach_poll_seconds)
+
+    def _mark_abandoned(self, run_id: str) -> None:
+        """租約已失效但記錄仍為進行中的任務（執行它的進程已退出）"""
+        db = mongodb.get_database()
+        if db is None:
+            return
+        db[JOB_COLLECTION].update_one(
+            {"_id": run_id, "status": {"$in": list(ACTIVE_STATUSES)}},
+            {"$set": {"status": FAILED, "error": "scrape lease expired", "finished_at": datetime.utcnow()}}
+        )
+
+    def _release_lease(self, handle: _JobHandle) -> None:
+        try:
+            self.leases.release(handle.record["flight_key"], handle.record["_id"])
+        except PyMongoError as e:
+            print(f"[Scrape Jobs] 釋放租約失敗: {e}")
+
+    def cancel(self, run_id: str) -> Dict[str, Any]:
+        """取消任務：排隊中的直接取消，運行中的在下一個請求前停止（同步寫入任務記錄，事件循環中通過 asyncio.to_thread 調用）"""
+        with self._lock:
+            handle = self._jobs.get(run_id)
+        if handle is None:
+            raise JobNotFoundError(run_id)
+
+        if handle.record["status"] in FINISHED_STATUSES:
+            return _serialize(handle.record)
+
+        handle.cancel_event.set()
+        if handle.future is not None and handle.future.cancel():
+            self._persist(handle, {
+                "status": CANCELLED,
+                "cancel_requested": True,
+                "message": "Cancelled before start",
+                "finished_at": datetime.utcnow(),
+            })
+            self._release_lease(handle)
+            self._emit(handle, {"event": "done", "outcome": ScrapeJobOutcome(
+                run_id=run_id, status=CANCELLED, message="Cancelled before start"
+            )})
+            self._forget(run_id)
+        else:
+            self._persist(handle, {"cancel_requested": True})
+        return _serialize(handle.record)
+
+    async def get_status(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """任務狀態：優先使用本進程的快照，否則讀取 scrape_jobs（其他進程 / 重啟前的任務）"""
+        with self._lock:
+            handle = self._jobs.get(run_id)
+            if handle is not None:
+                return _serialize(dict(handle.record))
+
+        job_repo = get_scrape_job_repository()
+        if job_repo is None:
+            return None
+        record = await job_repo.find_one({"_id": run_id})
+        return _serialize(record) if record else None
+
+    async def list_jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        job_repo = get_scrape_job_repository()
+        if job_repo is None:
+            with self._lock:
+                records = [dict(h.record) for h in self._jobs.values()]
+            records.sort(key=lambda r: r["created_at"], reverse=True)
+            return [_serialize(r) for r in records[:limit]]
+        records = await job_repo.find({}, sort=[("created_at", -1)], limit=limit)
+        return [_serialize(r) for r in records]
+
+    def _forget(self, run_id: str) -> None:
+        """已結束的任務只在進程內保留最近結束的若干個（更早的狀態以 scrape_jobs 為準）"""
+        with self._lock:
+            finished = sorted(
+                (h.record.get("finished_at") or datetime.min, rid)
+                for rid, h in self._jobs.items()
+                if h.record["status"] in FINISHED_STATUSES
+            )
+            for _, rid in finished[:-settings.scrape_max_queued_jobs]:
+                self._jobs.pop(rid, None)
+
+    # ---- 執行（工作線程） ----
+
+    def _run(self, handle: _JobHandle) -> ScrapeJobOutcome:
+        record = handle.record
+        run_id = record["_id"]
+        search_terms: List[str] = record["search_terms"]
+        stream = record["stream"]
+        self._persist(handle, {"status": RUNNING, "started_at": datetime.utcnow()})
+        self._emit(handle, {"event": "job", "run_id": run_id, "status": RUNNING})
+        print(f"[Scrape Jobs] 任務 {run_id} 開始執行")
+
+        try:
+            scraper = BeautifulSoupScraper()
+            checkpoint = CrawlCheckpoint(
+                run_id,
+                max_products=record["max_products"],
+                flush=lambda batch: self._flush_products(handle, batch),
+                # 流式任務：商品寫入後立即推送，推送後不再保留
+                batch_size=settings.scrape_stream_flush_batch_size if stream else None,
+                retain_flushed=not stream,
+            )
+            products_found = 0
+            term_products_keys: Dict[str, List[Dict[str, Any]]] = {}
+
+            for index, term in enumerate(search_terms):
+                if handle.cancel_event.is_set():
+                    break
+                if checkpoint.remaining <= 0 and checkpoint.term_state(term) is None:
+                    # 商品數已達上限，後面的關鍵詞不再爬取
+                    self._update_term(handle, index, status=SKIPPED)
+                    continue
+                self._update_term(handle, index, status=RUNNING)
+                self._persist(handle, {"progress": {**record["progress"], "current_term": term}})
+
+                term_products = scraper.scrape_products(
+                    search_terms=[term],
+                    fetch_details=record["fetch_details"],
+                    should_stop=handle.cancel_event.is_set,
+                    frontier=checkpoint,
+                    # 搜索結果翻頁到剩餘配額為止，超出的商品不會獲取詳情
+                    max_products_per_term=min(settings.max_products_per_search, checkpoint.remaining)
+                )
+                products_found += len(term_products)
+
+                term_status = CANCELLED if handle.cancel_event.is_set() else SUCCEEDED
+                if term_status == SUCCEEDED and term_products:
+                    term_products_keys[term] = _product_keys(term_products)
+                self._update_term(handle, index, status=term_status, products=len(term_products))
+                self._persist(handle, {"progress": {
+                    "terms_total": len(search_terms),
+                    "terms_done": index + 1,
+                    "current_term": None,
+                    "products_found": products_found,
+                }, "written": checkpoint.written})
+
+            # 寫入剩餘的已完成商品（取消時也保留已爬取的部分，可按 run_id 恢復）
+            checkpoint.flush()
+
+            if handle.cancel_event.is_set():
+                return self._finish(
+                    handle,
+                    CANCELLED,
+                    f"Scrape job cancelled, {checkpoint.written} products stored; resume with POST /api/scrape/resume/{run_id}",
+                    written=checkpoint.written,
+                )
+
+            # 流式任務的商品已經推送給客戶端，不再組裝完整結果
+            products = [] if stream else checkpoint.products(search_terms)
+            products_count = products_found if stream else len(products)
+            print(f"[Scrape Jobs] 任務 {run_id} 爬取到 {products_count} 個商品，寫入 {checkpoint.written} 個")
+            if not products_count:
+                return self._finish(handle, FAILED, "No products scraped")
+
+            self._save_history(record["query_keyword"], run_id, checkpoint.written, term_products_keys)
+
+            product_with_categories = beautifulsoup_to_product_with_categories(products, SOURCE_URL)
+            return self._finish(
+                handle,
+                SUCCEEDED,
+                f"Successfully scraped {products_count} products and stored to MongoDB",
+                products=product_with_categories,
+                products_count=products_count,
+                written=checkpoint.written,
+            )
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            return self._finish(handle, FAILED, f"Scraping failed: {e}", error=str(e))
+
+    def _save_history(
+        self,
+        query_keyword: str,
+        run_id: str,
+        product_count: int,
+        term_products: Dict[str, List[Dict[str, Any]]],
+    ) -> None:
+        """在 API 事件循環中保存查詢歷史（按關鍵詞記錄結果緩存；異步倉儲綁定該事件循環）"""
+        if self._loop is None or self._loop.is_closed():
+            print("[Scrape Jobs] 事件循環不可用，跳過查詢歷史記錄")
+            return
+
+        future = asyncio.run_coroutine_threadsafe(
+            save_query_history(query_keyword, run_id, product_count, term_products=term_products or None),
+            self._loop
+        )
+        try:
+            future.result(timeout=HISTORY_SAVE_TIMEOUT_SECONDS)
+        except (FutureTimeoutError, CancelledError):
+            future.cancel()
+            print(f"[Scrape Jobs] 保存查詢歷史超時或被取消（事件循環可能已停止），跳過任務 {run_id} 的查詢歷史")
+        except Exception as e:
+            print(f"[Scrape Jobs] 保存查詢歷史失敗: {e}")
+
+    def _finish(
+        self,
+        handle: _JobHandle,
+        status: str,
+        message: str,
+        error: Optional[str] = None,
+        products: Optional[List[ProductWithCategories]] = None,
+        products_count: Optional[int] = None,
+        written: int = 0,
+    ) -> ScrapeJobOutcome:
+        products = products or []
+        self._persist(handle, {
+            "status": status,
+            "message": message,
+            "error": error,
+            "products_count": len(products) if products_count is None else products_count,
+            "written": written,
+            "finished_at": datetime.utcnow(),
+        })
+        self._release_lease(handle)
+        print(f"[Scrape Jobs] 任務 {handle.record['_id']} 結束: {status}")
+        self._forget(handle.record["_id"])
+        outcome = ScrapeJobOutcome(
+            run_id=handle.record["_id"],
+            status=status,
+            message=message,
+            error=error,
+            written=written,
+            products=products,
+        )
+        self._emit(handle, {"event": "done", "outcome": outcome})
+        return outcome
+
+
+scrape_jobs = ScrapeJobManager()
@@ -0,0 +1,125 @@
+"""
+爬取任務的 single-flight 租約（MongoDB）
+同一組搜索關鍵詞和爬取參數（fetch_details、max_products）同時只有一個爬取任務：第一個請求取得租約並執行爬取，
+之後的相同請求（包括其他 uvicorn worker 收到的）附加到進行中的任務上等待結果。
+
+- scrape_leases：每組關鍵詞和參數一條（_id 為規範化後的關鍵詞集合加參數），記錄持有租約的 run_id 和進程
+- 持有方在任務執行期間定期續約；進程崩潰後租約在 settings.scrape_lease_seconds 後過期，
+  下一個請求接管（過期的記錄另由 TTL 索引清理）
+- MongoDB 未設定時退化為進程內的租約表
+"""
+
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+from app.config import settings
+from app.db.mongodb import mongodb
+from app.services.query_history import normalize_term
+
+
+LEASE_COLLECTION = "scrape_leases"
+
+
+def single_flight_key(search_terms: Iterable[str], fetch_details: bool, max_products: int) -> str:
+    """規範化的關鍵詞集合（與結果緩存相同的規範形式，忽略順序和重複）加上爬取參數
+
+    fetch_details / max_products 不同的請求結果不同，不能互相附加
+    """
+    terms = {normalize_term(term) for term in search_terms}
+    key = "\x1f".join(sorted(term for term in terms if term))
+    return f"{key}\x1e{int(fetch_details)}\x1e{max_products}"
+
+
+class ScrapeLeaseStore:
+    """按關鍵詞集合和爬取參數的租約表"""
+
+    def __init__(self, lease_seconds: Optional[float] = None, db=None):
+        self.lease_seconds = lease_seconds or settings.scrape_lease_seconds
+        self.owner = f"{socket.gethostname()}-{os.getpid()}"
+        self._db = db
+        self._lock = threading.Lock()
+        # MongoDB 未設定時使用：key -> (run_id, expires_at)
+        self._local: Dict[str, Tuple[str, datetime]] = {}
+
+    def _collection(self):
+        db = self._db if self._db is not None else mongodb.get_database()
+        return db[LEASE_COLLECTION] if db is not None else None
+
+    def _expires_at(self, now: datetime) -> datetime:
+        return now + timedelta(seconds=self.lease_seconds)
+
+    def acquire(self, key: str, run_id: str) -> Optional[str]:
+        """嘗試為 run_id 取得租約；成功返回 None，已被其他任務持有時返回持有方的 run_id"""
+        now = datetime.utcnow()
+        collection = self._collection()
+        if collection is None:
+            with self._lock:
+                holder = self._local.get(key)
+                if holder is not None and holder[1] > now and holder[0] != run_id:
+                    return holder[0]
+                self._local[key] = (run_id, self._expires_at(now))
+            return None
+
+        lease = {"run_id": run_id, "owner": self.owner, "acquired_at": now, "expires_at": self._expires_at(now)}
+        try:
+            collection.insert_one({"_id": key, **lease})
+            return None
+        except DuplicateKeyError:
+            pass
+
+        # 已有租約：過期的（持有方崩潰）或屬於同一 run_id 的（恢復任務）直接接管
+        taken = collection.find_one_and_update(
+            {"_id": key, "$or": [{"expires_at": {"$lte": now}}, {"run_id": run_id}]},
+            {"$set": lease},
+        )
+        if taken is not None:
+            if taken["run_id"] != run_id:
+                print(f"[Scrape Leases] 接管過期的租約 {key!r}（原任務 {taken['run_id']}）")
+            return None
+
+        current = collection.find_one({"_id": key})
+        if current is None:
+            # 持有方剛好釋放，重試一次
+            return self.acquire(key, run_id)
+        return current["run_id"]
+
+    def holder(self, key: str) -> Optional[str]:
+        """當前持有有效租約的 run_id"""
+        now = datetime.utcnow()
+        collection = self._collection()
+        if collection is None:
+            with self._lock:
+                holder = self._local.get(key)
+            return holder[0] if holder is not None and holder[1] > now else None
+        lease = collection.find_one({"_id": key, "expires_at": {"$gt": now}})
+        return lease["run_id"] if lease else None
+
+    def renew(self, leases: List[Tuple[str, str]]) -> None:
+        """延長本進程持有的租約（key, run_id）"""
+        if not leases:
+            return
+        expires_at = self._expires_at(datetime.utcnow())
+        collection = self._collection()
+        if collection is None:
+            with self._lock:
+                for key, run_id in leases:
+                    if self._local.get(key, (None,))[0] == run_id:
+                        self._local[key] = (run_id, expires_at)
+            return
+        for key, run_id in leases:
+            collection.update_one({"_id": key, "run_id": run_id}, {"$set": {"expires_at": expires_at}})
+
+    def release(self, key: str, run_id: str) -> None:
+        """任務結束時釋放租約（只刪除自己持有的）"""
+        collection = self._collection()
+        if collection is None:
+            with self._lock:
+                if self._local.get(key, (None,))[0] == run_id:
+                    del self._local[key]
+            return
+        collection.delete_one({"_id": key, "run_id": run_id})
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+回填舊產品文檔中寫入時才生成的字段
+用法:
+    python scripts/backfill_products.py          # 只處理缺少字段的產品
+    python scripts/backfill_products.py --force  # 重算所有產品（修改計算公式後使用）
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# 添加項目根目錄到 Python 路徑
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.db.mongodb import mongodb
+from app.services.mongodb_writer import backfill_derived_fields
+from app.services.analytics_rollups import rebuild_rollups
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="回填產品派生字段")
+    parser.add_argument("--force", action="store_true", help="重算所有產品")
+    args = parser.parse_args()
+
+    if mongodb.connect() is None:
+        print("MongoDB 未設定，無法回填")
+        return 1
+
+    try:
+        print("回填 price_value / review_count / margin_rate / competition_score / search_tokens...")
+        result = backfill_derived_fields(force=args.force)
+        if result.modified:
+            # 派生字段變化後重建分析匯總
+            rebuild_rollups()
+        return 1 if result.errors else 0
+    finally:
+        mongodb.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+HTML 解析後端基準測試
+對保存的 HTML 頁面分別用 BeautifulSoup 和 lxml 後端解析，輸出每個頁面的解析耗時，
+並檢查兩個後端提取的字段是否一致。
+
+頁面類型按文件名判斷（search_*.html / detail_*.html），否則按內容判斷。
+不指定路徑時使用 tests/fixtures/html 中的匿名化頁面。
+
+用法:
+    python scripts/benchmark_parsers.py
+    python scripts/benchmark_parsers.py saved_pages/
+    python scripts/benchmark_parsers.py page1.html page2.html --repeat 20
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+# 添加項目根目錄到 Python 路徑
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from bs4 import BeautifulSoup
+
+from app.scrapers import BeautifulSoupScraper
+from app.scrapers.html_parsers import LxmlPageParser
+
+
+def _collect_pages(paths: List[str]) -> List[Path]:
+    pages = []
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            pages.extend(sorted(p for p in path.iterdir() if p.suffix in (".html", ".htm")))
+        elif path.is_file():
+            pages.append(path)
+        else:
+            print(f"跳過不存在的路徑: {path}")
+    return pages
+
+
+def _page_kind(path: Path, content: bytes) -> str:
+    if path.name.startswith("search"):
+        return "search"
+    if path.name.startswith("detail"):
+        return "detail"
+    return "search" if b's-search-result' in content else "detail"
+
+
+def _time_ms(func: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比較 BeautifulSoup 與 lxml 解析後端的耗時")
+    parser.add_argument("paths", nargs="*", default=[str(project_root / "tests" / "fixtures" / "html")], help="HTML 文件或目錄")
+    parser.add_argument("--repeat", type=int, default=10, help="每個頁面重複解析次數（取中位數）")
+    args = parser.parse_args()
+
+    pages = _collect_pages(args.paths)
+    if not pages:
+        print("沒有找到 HTML 頁面")
+        return
+
+    scraper = BeautifulSoupScraper()
+    lxml_parser = LxmlPageParser()
+
+    def soup_search(content: bytes):
+        soup = BeautifulSoup(content, "html.parser")
+        containers = soup.select('[data-component-type="s-search-result"]') \
+            or soup.select('.s-result-item') or soup.select('[data-asin]')
+        return [scraper.extract_product_info(c) for c in containers]
+
+    def lxml_search(content: bytes):
+        products = lxml_parser.parse_search(content, None)
+        for product in products:
+            if "name" in product:
+                features = scraper.extract_product_features(product["name"])
+                product["description"] = scraper.create_description(product["name"], features)
+        return products
+
+    def soup_detail(content: bytes):
+        return scraper.parse_product_detail(BeautifulSoup(content, "html.parser"))
+
+    backends = {
+        "search": (soup_search, lxml_search),
+        "detail": (soup_detail, lxml_parser.parse_detail),
+    }
+
+    print(f"{'頁面':<40} {'類型':<8} {'BeautifulSoup(ms)':>18} {'lxml(ms)':>10} {'加速':>7}  一致")
+    totals = {"soup": 0.0, "lxml": 0.0}
+    mismatches = 0
+    for page in pages:
+        content = page.read_bytes()
+        kind = _page_kind(page, content)
+        soup_func, lxml_func = backends[kind]
+
+        soup_ms = _time_ms(lambda: soup_func(content), args.repeat)
+        lxml_ms = _time_ms(lambda: lxml_func(content), args.repeat)
+        same = soup_func(content) == lxml_func(content)
+        mismatches += 0 if same else 1
+        totals["soup"] += soup_ms
+        totals["lxml"] += lxml_ms
+
+        speedup = soup_ms / lxml_ms if lxml_ms else 0
+        print(f"{page.name[:40]:<40} {kind:<8} {soup_ms:>18.2f} {lxml_ms:>10.2f} {speedup:>6.1f}x  {'是' if same else '否'}")
+
+    count = len(pages)
+    print(f"\n共 {count} 個頁面，平均每頁: BeautifulSoup {totals['soup'] / count:.2f} ms, "
+          f"lxml {totals['lxml'] / count:.2f} ms")
+    if mismatches:
+        print(f"⚠️  {mismatches} 個頁面的提取結果不一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,17 @@
 #!/usr/bin/env python3
 """
 BeautifulSoup 爬蟲主腳本
+
+用法:
+    python scripts/crawl_beautifulsoup.py
+    python scripts/crawl_beautifulsoup.py --replay              # 對歸檔的 HTML 重新解析，不訪問網絡
+    python scripts/crawl_beautifulsoup.py --replay --since 2026-01-01 --workers 4
 """
 
+import argparse
+import asyncio
 import sys
+from datetime import datetime, timezone
 from pathlib import Path
 
 # 添加項目根目錄到 Python 路徑
@@ -13,11 +21,29 @@ sys.path.insert(0, str(project_root))
 from app.scrapers import BeautifulSoupScraper
 from app.pipelines.amazon_adapter import extract_products_with_categories
 from app.services.mongodb_writer import bulk_upsert_products_mongodb
-from app.services.query_history import save_query_history, cleanup_old_queries
+from app.services.query_history import save_query_history
+from app.services.retention import apply_retention
+
+
+async def _save_history(query_keyword: str, run_id: str, product_count: int):
+    """保存查詢歷史並按保留策略清理舊數據（異步客戶端綁定事件循環，需在同一個循環內完成）"""
+    await save_query_history(query_keyword, run_id, product_count)
+    await asyncio.to_thread(apply_retention)
+
+
+def _parse_date(value: str) -> datetime:
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
 
 
 def main():
     """主函數"""
+    parser = argparse.ArgumentParser(description="BeautifulSoup Amazon 爬蟲")
+    parser.add_argument("--replay", action="store_true", help="從 HTML 歸檔重新解析（不訪問網絡）")
+    parser.add_argument("--since", type=_parse_date, help="重放的抓取時間下限（YYYY-MM-DD）")
+    parser.add_argument("--until", type=_parse_date, help="重放的抓取時間上限（YYYY-MM-DD）")
+    parser.add_argument("--workers", type=int, help="重放時的解析進程數（預設為 CPU 核數）")
+    args = parser.parse_args()
+    
     print("=== BeautifulSoup Amazon 爬蟲 ===")
     
     # 初始化爬蟲
@@ -32,15 +58,21 @@ def main():
         "jacket"
     ]
     
-    # 爬取商品
-    print("開始爬取商品...")
-    products = scraper.scrape_products(search_terms)
-    print(f"爬取到 {len(products)} 個商品")
-    
-    # 爬取分類
-    print("開始爬取分類...")
-    categories = scraper.scrape_categories()
-    print(f"爬取到 {len(categories)} 個分類")
+    if args.replay:
+        print("開始重放歸檔...")
+        products = scraper.replay_archive(search_terms, since=args.since, until=args.until, workers=args.workers)
+        categories = scraper.replay_categories(since=args.since, until=args.until)
+        print(f"重放得到 {len(products)} 個商品, {len(categories)} 個分類")
+    else:
+        # 爬取商品
+        print("開始爬取商品...")
+        products = scraper.scrape_products(search_terms)
+        print(f"爬取到 {len(products)} 個商品")
+        
+        # 爬取分類
+        print("開始爬取分類...")
+        categories = scraper.scrape_categories()
+        print(f"爬取到 {len(categories)} 個分類")
     
     # 保存結果
     result_data = {
@@ -75,17 +107,19 @@ def main():
         # 生成 run_id
         import uuid
         from datetime import datetime
-        run_id = f"run-beautifulsoup-{uuid.uuid4().hex[:8]}-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        run_prefix = "run-replay" if args.replay else "run-beautifulsoup"
+        run_id = f"{run_prefix}-{uuid.uuid4().hex[:8]}-{datetime.now().strftime('%Y%m%d%H%M%S')}"
         
         # 寫入 MongoDB
-        mongo_affected = bulk_upsert_products_mongodb(data, run_id=run_id)
-        print(f"Upsert {mongo_affected} products to MongoDB")
+        write_result = bulk_upsert_products_mongodb(data, run_id=run_id)
+        mongo_affected = write_result.written
+        print(f"Upsert {mongo_affected} products to MongoDB "
+              f"(inserted={write_result.inserted}, modified={write_result.modified}, errors={write_result.errors})")
         
         # 保存查詢歷史（使用第一個搜索詞）
         if search_terms:
             query_keyword = search_terms[0]
-            save_query_history(query_keyword, run_id, mongo_affected)
-            cleanup_old_queries(keep_count=5)
+            asyncio.run(_save_history(query_keyword, run_id, mongo_affected))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+MongoDB 索引管理腳本
+用法:
+    python scripts/manage_indexes.py ensure   # 冪等創建缺失索引（默認）
+    python scripts/manage_indexes.py report   # 報告缺失 / 未使用 / 未聲明的索引
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# 添加項目根目錄到 Python 路徑
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.db.mongodb import mongodb
+from app.db.indexes import ensure_indexes, report_indexes, IndexBootstrapError
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="MongoDB 索引管理")
+    parser.add_argument("command", nargs="?", default="ensure", choices=["ensure", "report"])
+    args = parser.parse_args()
+
+    db = mongodb.connect()
+    if db is None:
+        print("MongoDB 未設定，無法管理索引")
+        return 1
+
+    try:
+        if args.command == "ensure":
+            created = ensure_indexes(db)
+            total = sum(len(names) for names in created.values())
+            print(f"索引初始化完成，新建 {total} 個索引")
+
+        report = report_indexes(db)
+        for collection_name, info in report.items():
+            print(f"\n[{collection_name}]")
+            print(f"  缺失: {', '.join(info['missing']) or '-'}")
+            print(f"  未使用: {', '.join(info['unused']) or '-'}")
+            print(f"  未聲明: {', '.join(info['undeclared']) or '-'}")
+        return 0
+    except IndexBootstrapError as e:
+        print(f"索引初始化失敗: {e}")
+        return 2
+    finally:
+        mongodb.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
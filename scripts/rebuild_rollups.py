@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+全量重建分析匯總表（analytics_rollups）
+用法:
+    python scripts/rebuild_rollups.py           # 重建所有匯總
+    python scripts/rebuild_rollups.py --status  # 只查看匯總狀態
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# 添加項目根目錄到 Python 路徑
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.db.mongodb import mongodb
+from app.services.analytics_rollups import get_rollup_status, rebuild_rollups
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="重建分析匯總表")
+    parser.add_argument("--status", action="store_true", help="只查看匯總狀態")
+    args = parser.parse_args()
+
+    db = mongodb.connect()
+    if db is None:
+        print("MongoDB 未設定，無法重建匯總")
+        return 1
+
+    try:
+        if args.status:
+            status = get_rollup_status(db)
+            if not status:
+                print("匯總表尚未建立")
+                return 0
+            print(f"最近全量重建: {status.get('last_rebuild_at')}")
+            print(f"最近增量更新: {status.get('last_refresh_at')}")
+            print(f"已過期: {bool(status.get('stale'))}")
+            if status.get("last_error"):
+                print(f"最近錯誤: {status['last_error']}")
+            return 0
+
+        counts = rebuild_rollups(db)
+        for kind, count in counts.items():
+            print(f"  {kind}: {count} 個分組")
+        return 0
+    finally:
+        mongodb.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,6 +9,7 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.db.mongodb import mongodb
+from app.services.analytics_rollups import rebuild_rollups
 from collections import defaultdict
 
 def remove_duplicate_products():
@@ -61,6 +62,8 @@ def remove_duplicate_products():
             # 删除重复产品
             result = products_collection.delete_many({"_id": {"$in": to_delete_ids}})
             print(f"成功刪除 {result.deleted_count} 個重複產品")
+            # 刪除後重建分析匯總（rebuild_rollups 會遞增數據版本，讓 API 響應緩存失效）
+            rebuild_rollups(db)
         else:
             print("沒有重複產品需要刪除")
         
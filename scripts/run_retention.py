@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+按保留策略清理舊的爬取批次（products + query_history）和詳情頁面緩存
+默認使用 RETENTION_* 環境變量中的策略，命令行參數可以覆蓋。
+
+用法:
+    python scripts/run_retention.py --dry-run              # 只列出將被刪除的批次
+    python scripts/run_retention.py --keep-runs 20
+    python scripts/run_retention.py --max-age-days 30 --max-products 50000
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# 添加項目根目錄到 Python 路徑
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.db.mongodb import mongodb
+from app.scrapers.http_cache import prune_detail_cache
+from app.services.retention import RetentionPolicy, apply_retention
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="清理舊的爬取批次")
+    parser.add_argument("--keep-runs", type=int, help="只保留最近 N 個批次（0 表示不限）")
+    parser.add_argument("--max-age-days", type=float, help="刪除早於 N 天的批次（0 表示不限）")
+    parser.add_argument("--max-products", type=int, help="products 總數預算（0 表示不限）")
+    parser.add_argument("--dry-run", action="store_true", help="只列出將被刪除的批次，不刪除")
+    args = parser.parse_args()
+
+    db = mongodb.connect()
+    if db is None:
+        print("MongoDB 未設定，無法清理")
+        return 1
+
+    policy = RetentionPolicy.from_settings()
+    if args.keep_runs is not None:
+        policy.keep_runs = args.keep_runs
+    if args.max_age_days is not None:
+        policy.max_age_seconds = int(args.max_age_days * 86400)
+    if args.max_products is not None:
+        policy.max_products = args.max_products
+    print(f"保留策略: 最近 {policy.keep_runs or '不限'} 個批次，"
+          f"最長 {policy.max_age_seconds or '不限'} 秒，產品預算 {policy.max_products or '不限'}")
+
+    try:
+        result = apply_retention(policy, db, dry_run=args.dry_run)
+        if args.dry_run:
+            print(f"將刪除 {len(result.run_ids)} 個批次:")
+            for run_id in result.run_ids:
+                print(f"  {run_id}")
+        else:
+            print(f"刪除 {len(result.run_ids)} 個批次，{result.products} 個產品，{result.history} 條查詢歷史")
+            print(f"刪除 {prune_detail_cache()} 個詳情頁面緩存")
+        return 0
+    finally:
+        mongodb.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
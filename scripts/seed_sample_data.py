@@ -209,8 +209,10 @@ def main():
     # 写入 MongoDB
     print("💾 写入 MongoDB...")
     try:
-        affected = bulk_upsert_products_mongodb(products_with_categories, run_id=run_id)
-        print(f"✅ 成功写入 {affected} 个产品到 MongoDB")
+        write_result = bulk_upsert_products_mongodb(products_with_categories, run_id=run_id)
+        print(f"✅ 成功写入 {write_result.written} 个产品到 MongoDB")
+        if write_result.errors:
+            print(f"⚠️ {write_result.errors} 个产品写入失败: {write_result.error_messages[:3]}")
         print(f"📝 Run ID: {run_id}")
         
         # 更新状态为 active
@@ -0,0 +1,21 @@
+"""
+測試共用設置
+測試不連接真實的 MongoDB，也不寫入 HTML 歸檔 / 詳情頁面緩存；
+需要數據庫的測試使用 mongomock（見 requirements-dev.txt）。
+"""
+
+import pytest
+
+from app.config import settings
+from app.db.mongodb import mongodb
+
+
+@pytest.fixture(autouse=True)
+def isolated_settings(monkeypatch):
+    """忽略 .env 中的 MongoDB 連線和本地緩存目錄"""
+    monkeypatch.setattr(settings, "mongodb_url", "")
+    monkeypatch.setattr(settings, "html_archive_enabled", False)
+    monkeypatch.setattr(settings, "detail_cache_enabled", False)
+    monkeypatch.setattr(mongodb, "database", None)
+    monkeypatch.setattr(mongodb, "async_database", None)
+    yield
@@ -0,0 +1,52 @@
+"""分析匯總：增量重算只寫回受影響的分組"""
+
+from datetime import datetime
+
+import mongomock
+import pytest
+
+from app.services.analytics_rollups import RollupScope, _refresh_pipeline, _rollup_stages, _scope_targets
+
+
+NOW = datetime(2026, 1, 31, 12, 0, 0)
+
+
+@pytest.fixture
+def products():
+    collection = mongomock.MongoClient()["rollup_test"]["products"]
+    at = datetime(2026, 1, 30)
+    collection.insert_many([
+        {"name": "mouse", "platform": "amazon", "categories": ["Mice", "Office"], "price_value": 10.0,
+         "run_id": "r2", "created_at": at, "updated_at": at},
+        {"name": "stapler", "platform": "amazon", "categories": ["Office"], "price_value": 30.0,
+         "run_id": "r1", "created_at": at, "updated_at": at},
+        {"name": "pad", "platform": "amazon", "categories": ["Mice"], "price_value": 20.0,
+         "run_id": "r2", "created_at": at, "updated_at": at},
+    ])
+    return collection
+
+
+def test_refresh_only_emits_scoped_category_groups(products):
+    # 本次只寫入了分類為 Mice 的產品；mouse 同時屬於 Office，但 Office 分組不受影響
+    scope = RollupScope()
+    scope.add_product(products.find_one({"name": "pad"}))
+    [(kind, product_match, ids)] = [t for t in _scope_targets(scope) if t[0] == "platform_category"]
+
+    rows = list(products.aggregate(_refresh_pipeline(kind, product_match, ids, NOW)))
+
+    assert [row["_id"] for row in rows] == ["platform_category:amazon|Mice"]
+    assert rows[0]["count"] == 2
+    assert rows[0]["price_sum"] == 30.0
+
+
+def test_refresh_matches_full_rebuild_for_scoped_groups(products):
+    scope = RollupScope()
+    for product in products.find({"run_id": "r2"}):
+        scope.add_product(product)
+
+    full = {row["_id"]: row for kind in ("platform", "platform_category", "run", "platform_day")
+            for row in products.aggregate(_rollup_stages(kind, NOW))}
+    for kind, product_match, ids in _scope_targets(scope):
+        for row in products.aggregate(_refresh_pipeline(kind, product_match, ids, NOW)):
+            assert row["_id"] in ids
+            assert row == full[row["_id"]]
@@ -0,0 +1,60 @@
+"""抓取並發上限：多個爬取任務（各自的線程和事件循環）共用同一個上限"""
+
+import asyncio
+import threading
+
+from app.scrapers.async_fetcher import AsyncFetcher, ConcurrencyLimiter, request_limiter
+
+
+def test_limit_is_shared_across_event_loops():
+    limiter = ConcurrencyLimiter(2)
+    state = {"running": 0, "peak": 0, "done": 0}
+    lock = threading.Lock()
+
+    async def request():
+        async with limiter:
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            await asyncio.sleep(0.01)
+            with lock:
+                state["running"] -= 1
+                state["done"] += 1
+
+    async def job():
+        await asyncio.gather(*[request() for _ in range(4)])
+
+    # 每個後台任務在自己的線程中 asyncio.run
+    threads = [threading.Thread(target=asyncio.run, args=(job(),)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert state["done"] == 12
+    assert state["peak"] == 2
+    assert limiter.active == 0
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    limiter = ConcurrencyLimiter(1)
+
+    async def run():
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        limiter.release()
+        await asyncio.sleep(0)
+        assert limiter.active == 0
+        # 名額仍然可用
+        await asyncio.wait_for(limiter.acquire(), timeout=1)
+        limiter.release()
+
+    asyncio.run(run())
+    assert limiter.active == 0
+
+
+def test_fetchers_share_the_process_limiter():
+    assert AsyncFetcher().concurrency is request_limiter
+    assert AsyncFetcher().concurrency is AsyncFetcher().concurrency
@@ -0,0 +1,52 @@
+"""批次分析：讀取 run 匯總，只為返回的批次取樣本名稱"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import mongomock
+
+from app.api import analysis
+
+
+class _Repository:
+    """用 mongomock collection 模擬異步倉儲的 aggregate"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.pipelines = []
+
+    async def aggregate(self, pipeline, **kwargs):
+        self.pipelines.append(pipeline)
+        return list(self.collection.aggregate(pipeline))
+
+
+def test_batch_analysis_reads_run_rollup_and_samples_limited_runs(monkeypatch):
+    products = mongomock.MongoClient()["batch_test"]["products"]
+    start = datetime(2026, 1, 1)
+    for run_index, run_id in enumerate(["old", "new"]):
+        for i in range(7):
+            products.insert_one({
+                "run_id": run_id,
+                "name": f"{run_id} product {i} " + "x" * 60,
+                "created_at": start + timedelta(days=run_index, minutes=i),
+            })
+    repository = _Repository(products)
+    rollup_calls = []
+
+    async def read_rollups(kind, sort=None, limit=0, **kwargs):
+        rollup_calls.append((kind, sort, limit))
+        return [{"run_id": "new", "count": 7, "first_created": start + timedelta(days=1), "last_updated": None}], {"source": "rollup"}
+
+    monkeypatch.setattr(analysis, "get_product_repository", lambda: repository)
+    monkeypatch.setattr(analysis, "read_rollups", read_rollups)
+
+    result = asyncio.run(analysis.get_batch_analysis(limit=1))
+
+    assert rollup_calls == [("run", [("first_created", -1)], 1)]
+    # 樣本查詢只匹配返回的批次
+    assert repository.pipelines[0][0] == {"$match": {"run_id": {"$in": ["new"]}}}
+    batch = result["batches"][0]
+    assert batch["run_id"] == "new" and batch["product_count"] == 7
+    assert len(batch["sample_products"]) == analysis.BATCH_SAMPLE_SIZE
+    assert batch["sample_products"][0].startswith("new product 6")
+    assert all(len(name) <= 50 for name in batch["sample_products"])
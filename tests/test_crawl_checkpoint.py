@@ -0,0 +1,78 @@
+"""爬取 checkpoint：寫入失敗的商品不會被標記為已寫入"""
+
+import mongomock
+import pytest
+
+from app.services import scrape_jobs as scrape_jobs_module
+from app.services.crawl_checkpoint import DONE, FLUSHED, FRONTIER_COLLECTION, CrawlCheckpoint
+from app.services.mongodb_writer import BulkUpsertResult
+from app.services.scrape_jobs import ProductWriteError, ScrapeJobManager, _JobHandle
+
+
+HITS = [
+    {"name": "Wireless Mouse", "price": "$19.99", "product_url": "https://www.amazon.com/dp/B000000001"},
+    {"name": "Mouse Pad", "price": "$5.99", "product_url": "https://www.amazon.com/dp/B000000002"},
+]
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient()["checkpoint_test"]
+
+
+def _statuses(db, run_id):
+    return [item["status"] for item in db[FRONTIER_COLLECTION].find({"run_id": run_id}).sort("index", 1)]
+
+
+def test_failed_flush_keeps_products_for_retry_and_resume(db):
+    def failing_flush(batch):
+        raise ProductWriteError("bulk write failed")
+
+    checkpoint = CrawlCheckpoint("run-fail", max_products=10, flush=failing_flush, batch_size=2, db=db)
+    # 寫入失敗不中斷爬取
+    checkpoint.record_search("mouse", [dict(hit) for hit in HITS], fetch_details=False)
+    checkpoint.term_done("mouse")
+
+    with pytest.raises(ProductWriteError):
+        checkpoint.flush()
+    assert checkpoint.written == 0
+    assert checkpoint.products(["mouse"]) == []
+    assert _statuses(db, "run-fail") == [DONE, DONE]
+
+    # 恢復任務：整批商品重新寫入
+    written = []
+    resumed = CrawlCheckpoint(
+        "run-fail", max_products=10, flush=lambda batch: written.extend(batch) or len(batch), batch_size=2, db=db
+    )
+    assert resumed.flush() == 2
+    assert [p["name"] for p in written] == [hit["name"] for hit in HITS]
+    assert _statuses(db, "run-fail") == [FLUSHED, FLUSHED]
+
+
+def test_failed_flush_is_retried_with_the_next_batch(db):
+    attempts = []
+
+    def flaky_flush(batch):
+        attempts.append(len(batch))
+        if len(attempts) == 1:
+            raise ProductWriteError("network error")
+        return len(batch)
+
+    checkpoint = CrawlCheckpoint("run-retry", max_products=10, flush=flaky_flush, batch_size=1, db=db)
+    checkpoint.record_search("mouse", [dict(HITS[0])], fetch_details=False)
+    checkpoint.record_search("pad", [dict(HITS[1])], fetch_details=False)
+
+    assert attempts == [1, 2]
+    assert checkpoint.written == 2
+
+
+def test_flush_products_raises_when_the_writer_reports_errors(monkeypatch):
+    monkeypatch.setattr(
+        scrape_jobs_module, "bulk_upsert_products_mongodb",
+        lambda data, run_id=None: BulkUpsertResult(inserted=1, errors=1, error_messages=["E11000 duplicate key"]),
+    )
+    manager = ScrapeJobManager()
+    handle = _JobHandle({"_id": "run-errors"})
+
+    with pytest.raises(ProductWriteError, match="1 of 2 products not written"):
+        manager._flush_products(handle, [dict(hit) for hit in HITS])
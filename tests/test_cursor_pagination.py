@@ -0,0 +1,55 @@
+"""游標分頁：游標編解碼與 (created_at desc, _id desc) 上的 keyset 條件"""
+
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+from bson import ObjectId
+
+from app.services.mongodb_reader import _keyset_filter, decode_cursor, encode_cursor
+
+
+SORT = [("created_at", -1), ("_id", -1)]
+
+
+def test_cursor_round_trip():
+    doc = {"_id": ObjectId(), "created_at": datetime(2026, 1, 2, 3, 4, 5, 678000)}
+    cursor = encode_cursor(doc)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (doc["created_at"], doc["_id"])
+
+
+def test_cursor_without_created_at():
+    doc = {"_id": ObjectId()}
+
+    assert decode_cursor(encode_cursor(doc)) == (None, doc["_id"])
+
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", "eyJjIjpudWxsfQ", "eyJjIjpudWxsLCJpIjoieCJ9"])
+def test_invalid_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_keyset_pages_cover_every_document_once():
+    collection = mongomock.MongoClient()["cursor_test"]["products"]
+    base = datetime(2026, 1, 1)
+    # 同一 created_at 的多條記錄 + 沒有 created_at 的舊數據
+    for minutes in (0, 0, 0, 5, 5, 10):
+        collection.insert_one({"created_at": base + timedelta(minutes=minutes)})
+    for _ in range(3):
+        collection.insert_one({"created_at": None})
+
+    expected = [doc["_id"] for doc in collection.find({}, sort=SORT)]
+    seen = []
+    query = {}
+    while True:
+        page = list(collection.find(query, sort=SORT, limit=2))
+        if not page:
+            break
+        seen.extend(doc["_id"] for doc in page)
+        query = _keyset_filter(*decode_cursor(encode_cursor(page[-1])))
+
+    assert seen == expected
+    assert len(seen) == 9
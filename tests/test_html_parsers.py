@@ -0,0 +1,60 @@
+"""HTML 解析後端：lxml 與 BeautifulSoup 對同一頁面提取的字段必須一致
+
+頁面來自 tests/fixtures/html（匿名化的搜索頁 / 詳情頁；也是 scripts/benchmark_parsers.py 的默認輸入）
+"""
+
+from pathlib import Path
+
+import pytest
+from bs4 import BeautifulSoup
+
+from app.scrapers.beautifulsoup_scraper import BeautifulSoupScraper
+from app.scrapers.html_parsers import LxmlPageParser
+
+
+FIXTURES = Path(__file__).parent / "fixtures" / "html"
+SEARCH_PAGES = sorted(FIXTURES.glob("search_*.html"))
+DETAIL_PAGES = sorted(FIXTURES.glob("detail_*.html"))
+
+
+def _soup_search(scraper: BeautifulSoupScraper, content: bytes):
+    soup = BeautifulSoup(content, "html.parser")
+    return [scraper.extract_product_info(c) for c in scraper._find_product_containers(soup)]
+
+
+def _lxml_search(scraper: BeautifulSoupScraper, content: bytes):
+    # lxml 後端不生成描述，由爬蟲按名稱補上（與 _crawl_search_pages 相同）
+    products = LxmlPageParser().parse_search(content, None)
+    for product in products:
+        if "name" in product:
+            features = scraper.extract_product_features(product["name"])
+            product["description"] = scraper.create_description(product["name"], features)
+    return products
+
+
+def test_fixtures_present():
+    assert SEARCH_PAGES and DETAIL_PAGES
+
+
+@pytest.mark.parametrize("page", SEARCH_PAGES, ids=lambda p: p.name)
+def test_search_page_parity(page):
+    scraper = BeautifulSoupScraper()
+    content = page.read_bytes()
+
+    soup_products = _soup_search(scraper, content)
+    lxml_products = _lxml_search(scraper, content)
+
+    assert any(p.get("name") for p in soup_products)
+    assert lxml_products == soup_products
+
+
+@pytest.mark.parametrize("page", DETAIL_PAGES, ids=lambda p: p.name)
+def test_detail_page_parity(page):
+    scraper = BeautifulSoupScraper()
+    content = page.read_bytes()
+
+    soup_detail = scraper.parse_product_detail(BeautifulSoup(content, "html.parser"))
+    lxml_detail = LxmlPageParser().parse_detail(content)
+
+    assert soup_detail.get("name")
+    assert lxml_detail == soup_detail
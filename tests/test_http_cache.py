@@ -0,0 +1,81 @@
+"""詳情頁面緩存：按時間和總大小清理"""
+
+import os
+import time
+
+import pytest
+
+from app.config import settings
+from app.scrapers import http_cache
+from app.scrapers.http_cache import DetailPageCache
+
+
+NOW = 1_800_000_000.0
+DAY = 86400
+
+
+def _url(asin):
+    return f"https://www.amazon.com/dp/{asin}"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DetailPageCache(str(tmp_path / "http_cache"), max_age_seconds=DAY)
+
+
+def _put(cache, asin, days_ago, size=100, now=NOW):
+    cache.put(_url(asin), os.urandom(size), etag=None, last_modified=None)
+    updated_at = now - days_ago * DAY
+    for path in cache._paths(asin):
+        os.utime(path, (updated_at, updated_at))
+
+
+def test_prune_removes_entries_older_than_max_age(cache):
+    _put(cache, "B000000001", days_ago=10)
+    _put(cache, "B000000002", days_ago=1)
+
+    assert cache.prune(max_age_seconds=7 * DAY, max_bytes=0, now=NOW) == 1
+
+    assert cache.get(_url("B000000001")) is None
+    assert cache.get(_url("B000000002")) is not None
+    assert not any(path.exists() for path in cache._paths("B000000001"))
+
+
+def test_prune_evicts_oldest_until_under_max_bytes(cache):
+    for days_ago, asin in enumerate(["B000000003", "B000000002", "B000000001"]):
+        _put(cache, asin, days_ago=3 - days_ago, size=1000)
+    total = sum(path.stat().st_size for path in cache.root.glob("*/*") if path.is_file())
+
+    # 只超出 1 字節：刪除最舊的一個條目即可
+    assert cache.prune(max_age_seconds=0, max_bytes=total - 1, now=NOW) == 1
+
+    assert cache.get(_url("B000000003")) is None
+    assert cache.get(_url("B000000002")) is not None
+    assert cache.get(_url("B000000001")) is not None
+
+
+def test_revalidated_entry_is_kept(cache):
+    _put(cache, "B000000001", days_ago=10)
+    page = cache.get(_url("B000000001"))
+
+    cache.revalidated(page, etag='"v2"', last_modified=None)
+
+    assert cache.prune(max_age_seconds=7 * DAY, max_bytes=0) == 0
+    assert cache.get(_url("B000000001")).etag == '"v2"'
+
+
+def test_prune_detail_cache_uses_settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "detail_cache_enabled", True)
+    monkeypatch.setattr(settings, "detail_cache_retention_seconds", 7 * DAY)
+    monkeypatch.setattr(settings, "detail_cache_max_bytes", 0)
+    monkeypatch.setattr(http_cache, "_cache", DetailPageCache(str(tmp_path), max_age_seconds=DAY))
+    cache = http_cache.get_detail_page_cache()
+    _put(cache, "B000000001", days_ago=10, now=time.time())
+    _put(cache, "B000000002", days_ago=1, now=time.time())
+
+    assert http_cache.prune_detail_cache() == 1
+    assert cache.get(_url("B000000002")) is not None
+
+
+def test_prune_detail_cache_skips_when_disabled():
+    assert http_cache.prune_detail_cache() == 0
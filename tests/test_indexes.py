@@ -0,0 +1,54 @@
+"""索引初始化：已存在的 TTL 索引按設定更新過期時間"""
+
+import mongomock
+import pytest
+from pymongo import ASCENDING
+
+from app.config import settings
+from app.db import indexes
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = mongomock.MongoClient()["index_test"]
+    commands = []
+
+    # mongomock 不支持 collMod，只記錄命令
+    def command(name, value=None, **kwargs):
+        commands.append((name, value, kwargs))
+        return {"ok": 1}
+
+    monkeypatch.setattr(db, "command", command)
+    db.commands = commands
+    return db
+
+
+def _checkpoint_ttl_commands(db):
+    return [
+        (value, kwargs["index"]) for name, value, kwargs in db.commands
+        if name == "collMod" and value in ("crawl_checkpoints", "crawl_frontier")
+    ]
+
+
+def test_changed_checkpoint_ttl_updates_existing_indexes(db):
+    ttl = settings.crawl_checkpoint_ttl_seconds
+    # 以舊的 CRAWL_CHECKPOINT_TTL_SECONDS 創建的索引（名稱不同也按 key 匹配）
+    db["crawl_checkpoints"].create_index([("updated_at", ASCENDING)], name="updated_at_ttl", expireAfterSeconds=60)
+    db["crawl_frontier"].create_index([("updated_at", ASCENDING)], name="legacy_ttl", expireAfterSeconds=60)
+
+    created = indexes.ensure_indexes(db)
+
+    assert "updated_at_ttl" not in created["crawl_checkpoints"]
+    assert _checkpoint_ttl_commands(db) == [
+        ("crawl_checkpoints", {"name": "updated_at_ttl", "expireAfterSeconds": ttl}),
+        ("crawl_frontier", {"name": "legacy_ttl", "expireAfterSeconds": ttl}),
+    ]
+
+
+def test_unchanged_ttl_is_left_alone(db):
+    indexes.ensure_indexes(db)
+    db.commands.clear()
+
+    indexes.ensure_indexes(db)
+
+    assert db.commands == []
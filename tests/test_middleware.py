@@ -0,0 +1,150 @@
+"""只讀端點的響應緩存與條件 GET（ETag）中間件"""
+
+import itertools
+
+import pytest
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pymongo.errors import ServerSelectionTimeoutError
+
+from app.api import middleware, products
+from app.api.middleware import ConditionalGetMiddleware, ResponseCacheMiddleware, _etag_matches, build_etag
+from app.services import mongodb_reader
+from app.services.data_version import data_version
+from app.services.response_cache import ResponseCache
+
+
+@pytest.fixture
+def version(monkeypatch):
+    """可控的數據版本號"""
+    state = {"value": 1}
+
+    async def current():
+        return state["value"]
+
+    monkeypatch.setattr(data_version, "current", current)
+    return state
+
+
+@pytest.fixture
+def client(monkeypatch, version):
+    monkeypatch.setattr(middleware, "response_cache", ResponseCache())
+    counter = itertools.count(1)
+    app = FastAPI()
+
+    @app.get("/api/products/")
+    async def products(page: int = 1):
+        return {"page": page, "call": next(counter)}
+
+    @app.get("/api/analysis/ai-insights")
+    async def ai_insights():
+        return {"insight": next(counter)}
+
+    @app.get("/api/scrape/jobs")
+    async def jobs():
+        return {"call": next(counter)}
+
+    app.add_middleware(ResponseCacheMiddleware)
+    app.add_middleware(ConditionalGetMiddleware)
+    return TestClient(app)
+
+
+def test_repeated_get_is_served_from_cache(client):
+    first = client.get("/api/products/?page=2")
+    second = client.get("/api/products/?page=2")
+
+    assert first.headers["x-cache"] == "MISS"
+    assert second.headers["x-cache"] == "HIT"
+    assert second.json() == first.json()
+
+
+def test_version_bump_invalidates_cache(client, version):
+    first = client.get("/api/products/")
+    version["value"] += 1
+    second = client.get("/api/products/")
+
+    assert second.headers["x-cache"] == "MISS"
+    assert second.json()["call"] != first.json()["call"]
+
+
+def test_no_cache_request_bypasses_cache(client):
+    client.get("/api/products/")
+    response = client.get("/api/products/", headers={"Cache-Control": "no-cache"})
+
+    assert "x-cache" not in response.headers
+
+
+def test_ai_insights_are_neither_cached_nor_etagged(client):
+    first = client.get("/api/analysis/ai-insights")
+    second = client.get("/api/analysis/ai-insights")
+
+    assert second.json() != first.json()
+    assert "x-cache" not in second.headers
+    assert "etag" not in second.headers
+
+
+def test_other_prefixes_are_untouched(client):
+    response = client.get("/api/scrape/jobs")
+
+    assert "x-cache" not in response.headers
+    assert "etag" not in response.headers
+
+
+def test_if_none_match_returns_304_until_version_changes(client, version):
+    etag = client.get("/api/products/").headers["etag"]
+
+    not_modified = client.get("/api/products/", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    version["value"] += 1
+    modified = client.get("/api/products/", headers={"If-None-Match": etag})
+    assert modified.status_code == 200
+    assert modified.headers["etag"] != etag
+
+
+def test_etag_ignores_query_parameter_order():
+    assert build_etag("/api/products/", "b=1&a=2", 3) == build_etag("/api/products/", "a=2&b=1&c=", 3)
+    assert build_etag("/api/products/", "a=1", 3) != build_etag("/api/products/", "a=1", 4)
+
+
+def test_if_none_match_uses_weak_comparison():
+    etag = '"abc"'
+    assert _etag_matches(b'W/"abc"', etag)
+    assert _etag_matches(b'"x", "abc"', etag)
+    assert _etag_matches(b"*", etag)
+    assert not _etag_matches(b'"abd"', etag)
+
+
+class _FlakyRepository:
+    """第一次查詢時數據庫不可用"""
+
+    def __init__(self):
+        self.available = False
+
+    async def find(self, query, **kwargs):
+        if not self.available:
+            raise ServerSelectionTimeoutError("mongodb:27017: connection refused")
+        return [{"_id": ObjectId(), "name": "Wireless Mouse", "price": "$19.99", "platform": "amazon"}]
+
+
+def test_reader_failure_is_not_cached(monkeypatch, version):
+    monkeypatch.setattr(middleware, "response_cache", ResponseCache())
+    repo = _FlakyRepository()
+    monkeypatch.setattr(mongodb_reader, "get_product_repository", lambda: repo)
+    app = FastAPI()
+    app.include_router(products.router)
+    app.add_middleware(ResponseCacheMiddleware)
+    app.add_middleware(ConditionalGetMiddleware)
+    client = TestClient(app)
+
+    failed = client.get("/api/products/")
+    assert failed.status_code == 500
+    assert "etag" not in failed.headers
+
+    repo.available = True
+    recovered = client.get("/api/products/")
+    assert recovered.status_code == 200
+    assert recovered.headers["x-cache"] == "MISS"
+    assert [p["title"] for p in recovered.json()] == ["Wireless Mouse"]
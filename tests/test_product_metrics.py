@@ -0,0 +1,49 @@
+"""寫入時計算的派生字段"""
+
+import pytest
+
+from app.services.product_metrics import compute_derived_fields
+
+
+def test_compute_derived_fields():
+    fields = compute_derived_fields("$1,250.00", None, "(12,345)", 4.6)
+
+    assert fields == {
+        "price_value": 1250.0,
+        "review_count": 12345,
+        "margin_rate": 66.67,
+        "competition_score": 100.0,
+        "competition_level": "high",
+    }
+
+
+def test_explicit_review_count_wins_over_text():
+    fields = compute_derived_fields(10, 2000, "(99)", None)
+
+    assert fields["review_count"] == 2000
+    assert fields["competition_score"] == 60.0
+    assert fields["competition_level"] == "high"
+
+
+@pytest.mark.parametrize("price", [None, "", "N/A", "$0.00", 0])
+def test_missing_price(price):
+    fields = compute_derived_fields(price, None, None, None)
+
+    assert fields["price_value"] is None
+    assert fields["margin_rate"] == 0.0
+    assert fields["review_count"] is None
+    assert fields["competition_score"] == 50.0
+    assert fields["competition_level"] == "medium"
+
+
+@pytest.mark.parametrize("review_count, rating, score, level", [
+    (500, 3.5, 50.0, "medium"),
+    (1500, 4.0, 70.0, "high"),
+    (6000, None, 70.0, "high"),
+    (None, 4.5, 70.0, "high"),
+])
+def test_competition_score(review_count, rating, score, level):
+    fields = compute_derived_fields("$20", review_count, None, rating)
+
+    assert fields["competition_score"] == score
+    assert fields["competition_level"] == level
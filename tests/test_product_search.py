@@ -0,0 +1,49 @@
+"""搜索詞解析與查詢條件"""
+
+import pytest
+
+from app.services.product_search import (
+    MAX_QUERY_TERMS,
+    build_search_filter,
+    build_search_tokens,
+    parse_search_query,
+)
+
+
+@pytest.mark.parametrize("search, expected", [
+    ("wireless mouse", (["wireless", "mouse"], [])),
+    ("Wireless MOUSE", (["wireless", "mouse"], [])),
+    ("shi*", ([], ["shi"])),
+    ("t-shi*", (["t"], ["shi"])),
+    ("usb-c hub", (["usb", "c", "hub"], [])),
+    ("mouse shi* ca*", (["mouse"], ["shi", "ca"])),
+    ("*** !!", ([], [])),
+    ("", ([], [])),
+])
+def test_parse_search_query(search, expected):
+    assert parse_search_query(search) == expected
+
+
+def test_parse_search_query_limits_terms():
+    terms, prefixes = parse_search_query(" ".join(f"w{i}" for i in range(MAX_QUERY_TERMS + 5)))
+
+    assert len(terms) == MAX_QUERY_TERMS
+    assert prefixes == []
+
+
+def test_prefix_keeps_only_token_characters():
+    query, text_ranked = build_search_filter("a.b*")
+
+    assert query == {"$and": [{"$text": {"$search": "a"}}, {"search_tokens": {"$regex": "^b"}}]}
+    assert text_ranked is True
+
+
+def test_build_search_filter():
+    assert build_search_filter(None) == ({}, False)
+    assert build_search_filter("mouse") == ({"$text": {"$search": "mouse"}}, True)
+    assert build_search_filter("mou*") == ({"search_tokens": {"$regex": "^mou"}}, False)
+    assert build_search_filter("!!") == ({"search_tokens": {"$in": []}}, False)
+
+
+def test_build_search_tokens_deduplicates_in_order():
+    assert build_search_tokens("Wireless Mouse", "mouse pad, WIRELESS") == ["wireless", "mouse", "pad"]
@@ -0,0 +1,29 @@
+"""響應緩存：查詢參數規範化與 LRU"""
+
+from app.services.response_cache import LRUCache, cache_key, normalize_query
+
+
+def test_normalize_query_sorts_by_key_and_drops_blanks():
+    assert normalize_query("b=1&a=2&c=") == "a=2&b=1"
+
+
+def test_normalize_query_keeps_order_of_repeated_parameters():
+    assert normalize_query("a=2&a=1") == "a=2&a=1"
+    assert normalize_query("b=x&a=2&a=1") == "a=2&a=1&b=x"
+    assert cache_key("/api/products/", "a=2&a=1", 1) != cache_key("/api/products/", "a=1&a=2", 1)
+
+
+def test_cache_key_includes_version():
+    assert cache_key("/api/products/", "a=1", 1) != cache_key("/api/products/", "a=1", 2)
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.evictions == 1
@@ -0,0 +1,77 @@
+"""數據保留：按策略選出過期的批次"""
+
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+from app.services.retention import RetentionPolicy, apply_retention, select_expired_runs
+
+
+NOW = datetime(2026, 1, 31, 12, 0, 0)
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient()["retention_test"]
+
+
+def _add_run(db, run_id, days_ago, products=1, history=True):
+    at = NOW - timedelta(days=days_ago)
+    if history:
+        db["query_history"].insert_one({"run_id": run_id, "query_keyword": run_id, "created_at": at})
+    db["products"].insert_many([
+        {"name": f"{run_id}-{i}", "run_id": run_id, "created_at": at, "updated_at": at}
+        for i in range(products)
+    ])
+
+
+def test_keep_runs_expires_oldest_first(db):
+    for run_id, days_ago in [("r1", 4), ("r2", 3), ("r3", 2), ("r4", 1)]:
+        _add_run(db, run_id, days_ago)
+
+    assert select_expired_runs(db, RetentionPolicy(keep_runs=2), now=NOW) == ["r1", "r2"]
+
+
+def test_max_age_expires_old_runs(db):
+    for run_id, days_ago in [("old", 10), ("recent", 1)]:
+        _add_run(db, run_id, days_ago)
+
+    policy = RetentionPolicy(max_age_seconds=5 * 24 * 3600)
+    assert select_expired_runs(db, policy, now=NOW) == ["old"]
+
+
+def test_product_budget_deletes_oldest_kept_runs(db):
+    _add_run(db, "r1", 3, products=3)
+    _add_run(db, "r2", 2, products=3)
+    _add_run(db, "r3", 1, products=3)
+
+    assert select_expired_runs(db, RetentionPolicy(max_products=4), now=NOW) == ["r1", "r2"]
+
+
+def test_runs_without_history_are_selected(db):
+    # 失敗 / 取消的任務：產品已分批寫入，但沒有查詢歷史
+    _add_run(db, "failed", 5, history=False)
+    _add_run(db, "r1", 3)
+    _add_run(db, "r2", 1)
+
+    assert select_expired_runs(db, RetentionPolicy(keep_runs=2), now=NOW) == ["failed"]
+    assert select_expired_runs(db, RetentionPolicy(max_age_seconds=4 * 24 * 3600), now=NOW) == ["failed"]
+
+
+def test_active_jobs_are_never_selected(db):
+    _add_run(db, "running", 9, history=False)
+    db["scrape_jobs"].insert_one({"_id": "running", "status": "running"})
+    _add_run(db, "r1", 1)
+
+    assert select_expired_runs(db, RetentionPolicy(max_age_seconds=2 * 24 * 3600), now=NOW) == []
+
+
+def test_dry_run_does_not_delete(db):
+    for run_id, days_ago in [("r1", 2), ("r2", 1)]:
+        _add_run(db, run_id, days_ago)
+
+    result = apply_retention(RetentionPolicy(keep_runs=1), db=db, dry_run=True)
+
+    assert result.dry_run and result.run_ids == ["r1"]
+    assert db["products"].count_documents({}) == 2
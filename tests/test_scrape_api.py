@@ -0,0 +1,49 @@
+"""爬取 API：同步的任務提交 / 取消不在事件循環中執行、請求參數校驗"""
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import scrape as scrape_api
+from app.api.scrape import ScrapeRequest
+
+
+def _assert_off_loop():
+    with pytest.raises(RuntimeError):
+        asyncio.get_running_loop()
+
+
+def test_submit_job_runs_off_the_event_loop(monkeypatch):
+    calls = []
+
+    def submit(**kwargs):
+        _assert_off_loop()
+        calls.append(kwargs)
+        return kwargs["run_id"]
+
+    monkeypatch.setattr(scrape_api.scrape_jobs, "submit", submit)
+
+    run_id, attached = asyncio.run(scrape_api._submit_job(ScrapeRequest(search_terms=["mouse"]), ["mouse"], 20))
+
+    assert not attached and calls[0]["run_id"] == run_id
+
+
+def test_cancel_runs_off_the_event_loop(monkeypatch):
+    def cancel(run_id):
+        _assert_off_loop()
+        return {"run_id": run_id, "status": "cancelled"}
+
+    monkeypatch.setattr(scrape_api.scrape_jobs, "cancel", cancel)
+
+    assert asyncio.run(scrape_api.cancel_scrape("run-1"))["status"] == "cancelled"
+
+
+@pytest.mark.parametrize("max_products", [0, -5])
+def test_max_products_must_be_positive(max_products):
+    app = FastAPI()
+    app.include_router(scrape_api.router)
+    response = TestClient(app).post("/api/scrape/", json={"search_terms": ["mouse"], "max_products": max_products})
+
+    assert response.status_code == 422
@@ -0,0 +1,76 @@
+"""後台爬取任務管理：查詢歷史保存超時、已結束任務的淘汰順序、相同請求的附加"""
+
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.config import settings
+from app.scrapers.beautifulsoup_scraper import BeautifulSoupScraper
+from app.services import scrape_jobs as scrape_jobs_module
+from app.services.scrape_jobs import FAILED, SUCCEEDED, ScrapeJobManager, _JobHandle
+
+
+# 事件循環沒有運行，提交的協程不會被執行
+@pytest.mark.filterwarnings("ignore:coroutine 'save_query_history' was never awaited")
+def test_save_history_gives_up_when_loop_is_not_running(monkeypatch):
+    monkeypatch.setattr(scrape_jobs_module, "HISTORY_SAVE_TIMEOUT_SECONDS", 0.1)
+    manager = ScrapeJobManager()
+    # 關閉應用時：事件循環仍未關閉，但不再執行提交的協程
+    loop = asyncio.new_event_loop()
+    manager._loop = loop
+    try:
+        started = time.monotonic()
+        manager._save_history("mouse", "run-1", 1, {})
+        assert time.monotonic() - started < 5
+    finally:
+        loop.close()
+
+
+def test_forget_evicts_by_finished_at(monkeypatch):
+    monkeypatch.setattr(settings, "scrape_max_queued_jobs", 2)
+    manager = ScrapeJobManager()
+    base = datetime(2026, 1, 1)
+    # 提交順序：long 最早提交但最後結束
+    for run_id, finished_minutes in [("long", 30), ("short-1", 1), ("short-2", 2)]:
+        manager._jobs[run_id] = _JobHandle({
+            "_id": run_id,
+            "status": SUCCEEDED if run_id != "short-1" else FAILED,
+            "finished_at": base + timedelta(minutes=finished_minutes),
+        })
+
+    manager._forget("long")
+
+    assert set(manager._jobs) == {"long", "short-2"}
+
+
+def test_submit_attaches_only_to_runs_with_the_same_parameters(monkeypatch):
+    release = threading.Event()
+
+    def scrape_products(self, search_terms, fetch_details=False, frontier=None, **kwargs):
+        release.wait(5)
+        return []
+
+    monkeypatch.setattr(BeautifulSoupScraper, "scrape_products", scrape_products)
+
+    async def run():
+        manager = ScrapeJobManager()
+        manager.start(asyncio.get_running_loop())
+        try:
+            first = manager.submit(["mouse"], False, 10, "run-1")
+            submitted = [
+                manager.submit(["Mouse"], False, 10, "run-2"),
+                manager.submit(["mouse"], True, 10, "run-3"),
+                manager.submit(["mouse"], False, 20, "run-4"),
+            ]
+            release.set()
+            for run_id in {first, *submitted}:
+                await manager.wait(run_id)
+        finally:
+            manager.shutdown()
+        return submitted
+
+    # 只有關鍵詞相同、參數也相同的請求附加到 run-1
+    assert asyncio.run(run()) == ["run-1", "run-3", "run-4"]
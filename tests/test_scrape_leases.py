@@ -0,0 +1,79 @@
+"""single-flight 租約：取得、附加、過期接管與釋放"""
+
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+from app.services.scrape_leases import LEASE_COLLECTION, ScrapeLeaseStore, single_flight_key
+
+
+@pytest.fixture(params=["mongodb", "local"])
+def store(request):
+    # local：MongoDB 未設定時的進程內租約表（conftest 已清空 mongodb.database）
+    db = mongomock.MongoClient()["lease_test"] if request.param == "mongodb" else None
+    return ScrapeLeaseStore(lease_seconds=60, db=db)
+
+
+def _expire(store, key):
+    past = datetime.utcnow() - timedelta(seconds=1)
+    if store._db is not None:
+        store._db[LEASE_COLLECTION].update_one({"_id": key}, {"$set": {"expires_at": past}})
+    else:
+        run_id, _ = store._local[key]
+        store._local[key] = (run_id, past)
+
+
+def test_single_flight_key_ignores_order_case_and_duplicates():
+    key = single_flight_key(["Mouse", " usb  hub "], False, 10)
+    assert key == single_flight_key(["usb hub", "mouse", "MOUSE"], False, 10)
+    assert single_flight_key(["mouse", ""], False, 10) == single_flight_key(["mouse"], False, 10)
+    assert single_flight_key(["mouse"], False, 10) != single_flight_key(["mouse pad"], False, 10)
+
+
+def test_single_flight_key_includes_scrape_parameters():
+    key = single_flight_key(["mouse"], False, 10)
+
+    assert single_flight_key(["mouse"], True, 10) != key
+    assert single_flight_key(["mouse"], False, 20) != key
+
+
+def test_first_run_acquires_and_second_attaches(store):
+    assert store.acquire("k", "run-1") is None
+    assert store.acquire("k", "run-2") == "run-1"
+    assert store.holder("k") == "run-1"
+
+
+def test_same_run_can_reacquire(store):
+    store.acquire("k", "run-1")
+
+    assert store.acquire("k", "run-1") is None
+    assert store.holder("k") == "run-1"
+
+
+def test_expired_lease_is_taken_over(store):
+    store.acquire("k", "run-1")
+    _expire(store, "k")
+
+    assert store.holder("k") is None
+    assert store.acquire("k", "run-2") is None
+    assert store.holder("k") == "run-2"
+
+
+def test_renew_keeps_lease_alive(store):
+    store.acquire("k", "run-1")
+    _expire(store, "k")
+    store.renew([("k", "run-1")])
+
+    assert store.acquire("k", "run-2") == "run-1"
+
+
+def test_release_only_deletes_own_lease(store):
+    store.acquire("k", "run-1")
+
+    store.release("k", "run-2")
+    assert store.holder("k") == "run-1"
+
+    store.release("k", "run-1")
+    assert store.holder("k") is None
+    assert store.acquire("k", "run-2") is None
@@ -0,0 +1,101 @@
+"""流式爬取任務：寫入後釋放商品內容不影響爬蟲繼續處理"""
+
+import asyncio
+
+from app.config import settings
+from app.scrapers.beautifulsoup_scraper import BeautifulSoupScraper
+from app.services import scrape_jobs as scrape_jobs_module
+from app.services.crawl_checkpoint import CrawlCheckpoint
+from app.services.mongodb_writer import BulkUpsertResult
+from app.services.scrape_jobs import FAILED, SUCCEEDED, ScrapeJobManager
+
+
+SEARCH_HITS = [
+    {"name": "Sponsored bundle without link", "price": "$9.99", "product_url": None},
+    {"name": "Wireless Mouse", "price": "$19.99", "product_url": "https://www.amazon.com/dp/B000000001"},
+]
+
+
+def _stub_scraper(monkeypatch):
+    async def crawl_search_pages(self, fetcher, search_term, quota, should_stop):
+        return [dict(hit) for hit in SEARCH_HITS][:quota]
+
+    async def fetch_detail(self, fetcher, product_info, should_stop):
+        product_info["rating"] = 4.5
+        return True
+
+    monkeypatch.setattr(BeautifulSoupScraper, "_crawl_search_pages", crawl_search_pages)
+    monkeypatch.setattr(BeautifulSoupScraper, "_fetch_detail", fetch_detail)
+
+
+def test_checkpoint_without_retained_products_keeps_scraper_list(monkeypatch):
+    _stub_scraper(monkeypatch)
+    flushed = []
+    checkpoint = CrawlCheckpoint(
+        "run-stream", max_products=10, flush=lambda batch: flushed.extend(batch) or len(batch),
+        batch_size=1, retain_flushed=False,
+    )
+
+    products = BeautifulSoupScraper().scrape_products(["mouse"], fetch_details=True, frontier=checkpoint)
+
+    assert [p["name"] for p in products] == [hit["name"] for hit in SEARCH_HITS]
+    assert sorted(p["name"] for p in flushed) == sorted(hit["name"] for hit in SEARCH_HITS)
+    assert products[1]["rating"] == 4.5
+    assert checkpoint.written == 2
+    # checkpoint 不再保留已寫入的商品
+    assert checkpoint.products(["mouse"]) == []
+
+
+def test_streaming_job_with_details_and_hit_without_url(monkeypatch):
+    _stub_scraper(monkeypatch)
+    monkeypatch.setattr(settings, "scrape_stream_flush_batch_size", 1)
+    monkeypatch.setattr(
+        scrape_jobs_module, "bulk_upsert_products_mongodb",
+        lambda data, run_id=None: BulkUpsertResult(inserted=len(data)),
+    )
+
+    async def run():
+        manager = ScrapeJobManager()
+        manager.start(asyncio.get_running_loop())
+        events = []
+        try:
+            run_id = manager.submit(["mouse"], True, 10, "run-stream-job", listener=events.append)
+            outcome = await manager.wait(run_id)
+        finally:
+            manager.shutdown()
+        return outcome, events
+
+    outcome, events = asyncio.run(run())
+
+    assert outcome.status == SUCCEEDED, outcome.error
+    assert outcome.written == 2
+    streamed = [item.product.name for event in events if event["event"] == "products" for item in event["products"]]
+    assert sorted(streamed) == sorted(hit["name"] for hit in SEARCH_HITS)
+    assert events[-1]["event"] == "done"
+
+
+def test_streaming_job_does_not_push_unwritten_products(monkeypatch):
+    _stub_scraper(monkeypatch)
+    monkeypatch.setattr(settings, "scrape_stream_flush_batch_size", 1)
+    monkeypatch.setattr(
+        scrape_jobs_module, "bulk_upsert_products_mongodb",
+        lambda data, run_id=None: BulkUpsertResult(errors=len(data), error_messages=["connection refused"]),
+    )
+
+    async def run():
+        manager = ScrapeJobManager()
+        manager.start(asyncio.get_running_loop())
+        events = []
+        try:
+            run_id = manager.submit(["mouse"], True, 10, "run-stream-fail", listener=events.append)
+            outcome = await manager.wait(run_id)
+        finally:
+            manager.shutdown()
+        return outcome, events
+
+    outcome, events = asyncio.run(run())
+
+    assert outcome.status == FAILED
+    assert outcome.written == 0
+    assert not [event for event in events if event["event"] == "products"]
+    assert [event for event in events if event["event"] == "write_error"]